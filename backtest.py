@@ -0,0 +1,286 @@
+import argparse
+from collections import namedtuple
+from decimal import Decimal
+import numpy as np
+from instrument import Instrument
+from market_data import normalize_ms
+from strategy import exit_levels, reentry_price, TP_REENTRY_FACTOR, SL_REENTRY_FACTOR, MAX_LOSS_COUNT, LIMIT_FILL_TIMEOUT
+
+# Eşik aramaları küçük pencerelerle başlar ve pencere her seferinde büyür; böylece kısa süren
+# pozisyonlar tüm diziyi taramaz, uzun süren pozisyonlar da Python döngüsüne düşmez.
+SEARCH_CHUNK = 4096
+MAX_SEARCH_CHUNK = 1 << 22
+# Özkaynak eğrisi bu büyüklükte parçalar halinde hesaplanır (bellek sınırı)
+EQUITY_CHUNK = 1 << 20
+
+Trade = namedtuple('Trade', ['index', 'side', 'reason', 'price', 'qty', 'fee'])
+BacktestResult = namedtuple('BacktestResult', [
+    'trades', 'final_equity', 'pnl', 'pnl_percentage', 'max_drawdown',
+    'trade_count', 'wins', 'losses', 'fees', 'stop_reason',
+])
+
+def _to_decimal(value):
+    return Decimal(repr(float(value)))
+
+# start konumundan itibaren maskenin ilk doğru olduğu indeks, yoksa -1
+def _first_index(n, start, mask_fn):
+    size = SEARCH_CHUNK
+    i = start
+    while i < n:
+        end = min(i + size, n)
+        hits = np.flatnonzero(mask_fn(i, end))
+        if hits.size:
+            return i + int(hits[0])
+        i = end
+        size = min(size * 2, MAX_SEARCH_CHUNK)
+    return -1
+
+def first_exit(highs, lows, start, take_profit, stop_loss):
+    return _first_index(len(highs), start, lambda a, b: (highs[a:b] >= take_profit) | (lows[a:b] <= stop_loss))
+
+def first_fill(lows, start, limit_price, strict=False):
+    if strict:
+        return _first_index(len(lows), start, lambda a, b: lows[a:b] < limit_price)
+    return _first_index(len(lows), start, lambda a, b: lows[a:b] <= limit_price)
+
+# İşlemler arasında varlıklar sabit olduğundan özkaynak parça parça hesaplanır
+def max_drawdown(closes, segments, initial_equity):
+    peak = initial_equity
+    worst = 0.0
+    for start, end, base, quote in segments:
+        if end <= start:
+            continue
+        if base == 0:
+            peak = max(peak, quote)
+            worst = max(worst, 1 - quote / peak if peak > 0 else 0.0)
+            continue
+        for a in range(start, end, EQUITY_CHUNK):
+            b = min(a + EQUITY_CHUNK, end)
+            equity = quote + base * closes[a:b]
+            running_peak = np.maximum(np.maximum.accumulate(equity), peak)
+            worst = max(worst, float((1 - equity / running_peak).max()))
+            peak = float(running_peak[-1])
+    return worst
+
+# main() içindeki TP/SL + yeniden alım durum makinesini geçmiş veri üzerinde oynatır.
+# prices: işlem fiyatları (aggTrade) veya mum kapanışları. Mum verisinde highs/lows/opens verilir;
+# aynı mumda hem TP hem SL görülürse kötümser davranılıp SL kabul edilir.
+# Yüzdeler main() ile aynıdır: profit_percentage=0.3 -> %0.3, allocation_percentage=100 -> tüm bakiye.
+# fill_timeout timestamps ile aynı birimdedir (Binance verisinde milisaniye).
+def run_backtest(prices, profit_percentage, loss_percentage, step_size, tick_size,
+                 allocation_percentage=100, initial_balance=1000, min_qty=0, min_notional=10,
+                 taker_fee=0.001, maker_fee=0.001,
+                 tp_reentry_factor=TP_REENTRY_FACTOR, sl_reentry_factor=SL_REENTRY_FACTOR,
+                 max_loss_count=MAX_LOSS_COUNT, highs=None, lows=None, opens=None,
+                 limit_price=None, timestamps=None, fill_timeout=None, strict_limit_fills=False):
+    closes = np.asarray(prices, dtype=np.float64)
+    highs = closes if highs is None else np.asarray(highs, dtype=np.float64)
+    lows = closes if lows is None else np.asarray(lows, dtype=np.float64)
+    opens = None if opens is None else np.asarray(opens, dtype=np.float64)
+    n = len(closes)
+
+    profit_percentage = Decimal(str(profit_percentage))
+    loss_percentage = Decimal(str(loss_percentage))
+    allocation = Decimal(str(allocation_percentage)) / Decimal('100')
+    tp_reentry_factor = Decimal(str(tp_reentry_factor))
+    sl_reentry_factor = Decimal(str(sl_reentry_factor))
+    min_qty = Decimal(str(min_qty))
+    min_notional = Decimal(str(min_notional))
+    taker_fee = Decimal(str(taker_fee))
+    maker_fee = Decimal(str(maker_fee))
+    instrument = Instrument(Decimal(str(step_size)), Decimal(str(tick_size)), min_notional)
+    tick_size = instrument.tick_size
+
+    quote = Decimal(str(initial_balance))
+    base = Decimal('0')
+    fees = Decimal('0')
+    trades = []
+    segments = []
+    last_index = 0
+
+    def record(index):
+        nonlocal last_index
+        segments.append((last_index, index, float(base), float(quote)))
+        last_index = index
+
+    def buy(index, price, budget, fee_rate, reason):
+        nonlocal quote, base, fees
+        qty = instrument.round_quantity(budget / price)
+        if qty < min_qty or price * qty < min_notional:
+            return False
+        record(index)
+        fee = qty * fee_rate
+        quote -= price * qty
+        base += qty - fee
+        fees += fee * price
+        trades.append(Trade(index, 'BUY', reason, price, qty, fee))
+        return True
+
+    def sell(index, price, reason):
+        nonlocal quote, base, fees
+        qty = instrument.round_quantity(base)
+        record(index)
+        proceeds = price * qty
+        fee = proceeds * taker_fee
+        quote += proceeds - fee
+        base -= qty
+        fees += fee
+        trades.append(Trade(index, 'SELL', reason, price, qty, fee))
+
+    stop_reason = 'end_of_data'
+    wins = losses = 0
+    loss_count = 0
+
+    # Başlangıç alımı: piyasa emri ilk fiyattan, limit emri fiyat limite inince
+    if n == 0:
+        stop_reason = 'no_data'
+        entry_index = -1
+    elif limit_price is None:
+        entry_index = 0
+        entry_price = _to_decimal(opens[0] if opens is not None else closes[0])
+        if not buy(0, entry_price, quote * allocation, taker_fee, 'ENTRY'):
+            stop_reason = 'insufficient_balance'
+            entry_index = -1
+    else:
+        limit_price = instrument.round_price(Decimal(str(limit_price)))
+        entry_index = first_fill(lows, 0, float(limit_price), strict_limit_fills)
+        if entry_index >= 0:
+            entry_price = limit_price
+            if opens is not None and opens[entry_index] < float(limit_price):
+                entry_price = _to_decimal(opens[entry_index])
+            if not buy(entry_index, entry_price, quote * allocation, maker_fee, 'ENTRY'):
+                stop_reason = 'insufficient_balance'
+                entry_index = -1
+
+    i = entry_index
+    while i >= 0 and loss_count < max_loss_count:
+        take_profit_price, stop_loss_price = exit_levels(entry_price, profit_percentage, loss_percentage, tick_size)
+        j = first_exit(highs, lows, i + 1, float(take_profit_price), float(stop_loss_price))
+        if j < 0:
+            break
+
+        hit_stop = lows[j] <= float(stop_loss_price)
+        if opens is None:
+            sell_price = _to_decimal(closes[j])
+        elif hit_stop:
+            sell_price = min(stop_loss_price, _to_decimal(opens[j]))
+        else:
+            sell_price = max(take_profit_price, _to_decimal(opens[j]))
+        sell(j, sell_price, 'STOP_LOSS' if hit_stop else 'TAKE_PROFIT')
+        if sell_price > entry_price:
+            wins += 1
+        else:
+            losses += 1
+
+        buy_price = reentry_price(sell_price, sl_reentry_factor if hit_stop else tp_reentry_factor, tick_size)
+        k = first_fill(lows, j + 1, float(buy_price), strict_limit_fills)
+        if k < 0:
+            break
+        if fill_timeout is not None and timestamps is not None and timestamps[k] - timestamps[j] > fill_timeout:
+            # Canlı bot bu durumda emri iptal eder ve pozisyonsuz kalır
+            stop_reason = 'reentry_timeout'
+            i = -1
+            break
+        if opens is not None and opens[k] < float(buy_price):
+            buy_price = _to_decimal(opens[k])
+        if not buy(k, buy_price, quote * allocation, maker_fee, 'REENTRY'):
+            stop_reason = 'insufficient_balance'
+            i = -1
+            break
+
+        entry_price = buy_price
+        loss_count = loss_count + 1 if hit_stop else 0
+        i = k
+
+    if loss_count >= max_loss_count:
+        stop_reason = 'max_losses'
+    record(n)
+
+    last_price = _to_decimal(closes[-1]) if n else Decimal('0')
+    final_equity = quote + base * last_price
+    initial = Decimal(str(initial_balance))
+    pnl = final_equity - initial
+    return BacktestResult(
+        trades=trades,
+        final_equity=final_equity,
+        pnl=pnl,
+        pnl_percentage=pnl / initial * 100 if initial else Decimal('0'),
+        max_drawdown=max_drawdown(closes, segments, float(initial)),
+        trade_count=wins + losses,
+        wins=wins,
+        losses=losses,
+        fees=fees,
+        stop_reason=stop_reason,
+    )
+
+def _skip_header(path):
+    with open(path, encoding='utf-8') as f:
+        first = f.readline().split(',')[0]
+    try:
+        float(first)
+        return 0
+    except ValueError:
+        return 1
+
+# Binance public veri dökümleri (data.binance.vision) biçimindeki CSV dosyaları
+def load_klines_csv(path):
+    data = np.loadtxt(path, delimiter=',', usecols=(0, 1, 2, 3, 4), skiprows=_skip_header(path), ndmin=2)
+    return {
+        'timestamps': normalize_ms(data[:, 0].astype(np.int64)),
+        'opens': data[:, 1],
+        'highs': data[:, 2],
+        'lows': data[:, 3],
+        'prices': data[:, 4],
+    }
+
+def load_aggtrades_csv(path):
+    data = np.loadtxt(path, delimiter=',', usecols=(1, 5), skiprows=_skip_header(path), ndmin=2)
+    return {
+        'timestamps': normalize_ms(data[:, 1].astype(np.int64)),
+        'prices': data[:, 0],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="TP/SL yeniden alım stratejisi için geçmiş veri testi")
+    parser.add_argument('csv', nargs='?', help="Kline veya aggTrades CSV dosyası")
+    parser.add_argument('--symbol', help="Yerel piyasa verisi deposundan okunacak sembol")
+    parser.add_argument('--dataset', help="Depodaki veri seti (aggtrades veya klines_<interval>)")
+    parser.add_argument('--kind', choices=['klines', 'aggtrades'], default='klines')
+    parser.add_argument('--profit', type=Decimal, required=True, help="Kar hedefi yüzdesi (örn. 0.3)")
+    parser.add_argument('--loss', type=Decimal, required=True, help="Zarar durdurma yüzdesi (örn. 1)")
+    parser.add_argument('--allocation', type=Decimal, default=Decimal('100'), help="Bakiyenin kullanılacak yüzdesi")
+    parser.add_argument('--step-size', type=Decimal, required=True)
+    parser.add_argument('--tick-size', type=Decimal, required=True)
+    parser.add_argument('--min-qty', type=Decimal, default=Decimal('0'))
+    parser.add_argument('--min-notional', type=Decimal, default=Decimal('10'))
+    parser.add_argument('--balance', type=Decimal, default=Decimal('1000'))
+    parser.add_argument('--taker-fee', type=Decimal, default=Decimal('0.001'))
+    parser.add_argument('--maker-fee', type=Decimal, default=Decimal('0.001'))
+    parser.add_argument('--limit-price', type=Decimal, default=None)
+    parser.add_argument('--fill-timeout', type=float, default=LIMIT_FILL_TIMEOUT,
+                        help="Yeniden alım limit emrinin iptal süresi (saniye)")
+    args = parser.parse_args()
+
+    if args.dataset:
+        from market_data import load_backtest_arrays
+        data = load_backtest_arrays(args.symbol, args.dataset)
+    elif args.csv:
+        data = load_klines_csv(args.csv) if args.kind == 'klines' else load_aggtrades_csv(args.csv)
+    else:
+        parser.error("CSV dosyası veya --symbol/--dataset belirtilmeli")
+    result = run_backtest(
+        data['prices'], args.profit, args.loss, args.step_size, args.tick_size,
+        allocation_percentage=args.allocation, initial_balance=args.balance,
+        min_qty=args.min_qty, min_notional=args.min_notional,
+        taker_fee=args.taker_fee, maker_fee=args.maker_fee,
+        highs=data.get('highs'), lows=data.get('lows'), opens=data.get('opens'),
+        limit_price=args.limit_price, timestamps=data['timestamps'],
+        fill_timeout=args.fill_timeout * 1000,
+    )
+    print(f"Son bakiye: {result.final_equity:.8f}, Kar/Zarar: {result.pnl:.8f} (%{result.pnl_percentage:.2f})")
+    print(f"İşlem sayısı: {result.trade_count}, Karlı: {result.wins}, Zararlı: {result.losses}")
+    print(f"Maksimum düşüş: %{result.max_drawdown * 100:.2f}, Ödenen komisyon: {result.fees:.8f}")
+    print(f"Durma nedeni: {result.stop_reason}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import logging
+import threading
+from decimal import Decimal
+from binance.exceptions import BinanceAPIException
+
+ZERO = Decimal('0')
+
+# Hesap bakiyelerini bellekte tutar: bir kez get_account ile yüklenir, sonra
+# outboundAccountPosition/balanceUpdate olaylarıyla güncellenir. Her varlık için
+# sorgu O(1)'dir. Belirli aralıklarla REST ile karşılaştırılarak sapma düzeltilir.
+class BalanceCache:
+    def __init__(self, client, user_stream=None, reconcile_interval=300):
+        self.client = client
+        self.reconcile_interval = reconcile_interval
+        self._free = {}
+        self._locked = {}
+        self._updated = {}
+        self._version = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        if user_stream is not None:
+            user_stream.subscribe('outboundAccountPosition', self._on_account_position)
+            user_stream.subscribe('balanceUpdate', self._on_balance_update)
+
+    def start(self):
+        self.load()
+        if self.reconcile_interval:
+            self._thread = threading.Thread(target=self._reconcile_loop, name="balance-reconcile", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @property
+    def version(self):
+        with self._cond:
+            return self._version
+
+    def free(self, asset):
+        with self._cond:
+            return self._free.get(asset, ZERO)
+
+    def locked(self, asset):
+        with self._cond:
+            return self._locked.get(asset, ZERO)
+
+    def total(self, asset):
+        with self._cond:
+            return self._free.get(asset, ZERO) + self._locked.get(asset, ZERO)
+
+    # REST anlık görüntüsünü yükler ve önceki değerlerden sapmaları döner
+    def load(self):
+        return self.apply_snapshot(self.client.get_account())
+
+    def apply_snapshot(self, account_info):
+        update_time = account_info.get('updateTime', 0)
+        drift = {}
+        with self._cond:
+            for balance in account_info['balances']:
+                asset = balance['asset']
+                # Anlık görüntüden daha yeni bir olay zaten uygulandıysa onu koru
+                if self._updated.get(asset, 0) > update_time:
+                    continue
+                free = Decimal(balance['free'])
+                locked = Decimal(balance['locked'])
+                if asset in self._free and (self._free[asset] != free or self._locked[asset] != locked):
+                    drift[asset] = (self._free[asset], free)
+                self._free[asset] = free
+                self._locked[asset] = locked
+                self._updated[asset] = update_time
+            self._version += 1
+            self._cond.notify_all()
+        return drift
+
+    # Bir sonraki bakiye güncellemesini bekler; gelmezse REST ile yeniler
+    def wait_for_update(self, version, timeout=2):
+        with self._cond:
+            if self._cond.wait_for(lambda: self._version != version, timeout):
+                return
+        try:
+            self.load()
+        except BinanceAPIException as e:
+            logging.error(f"Binance API hatası: {e}")
+
+    def _on_account_position(self, msg):
+        update_time = msg.get('u', msg.get('E', 0))
+        with self._cond:
+            for balance in msg['B']:
+                asset = balance['a']
+                self._free[asset] = Decimal(balance['f'])
+                self._locked[asset] = Decimal(balance['l'])
+                self._updated[asset] = max(self._updated.get(asset, 0), update_time)
+            self._version += 1
+            self._cond.notify_all()
+
+    def _on_balance_update(self, msg):
+        asset = msg['a']
+        event_time = msg.get('T', msg.get('E', 0))
+        with self._cond:
+            # Anlık görüntüye zaten dahil olan hareketi iki kez sayma
+            if self._updated.get(asset, 0) >= event_time:
+                return
+            self._free[asset] = self._free.get(asset, ZERO) + Decimal(msg['d'])
+            self._updated[asset] = event_time
+            self._version += 1
+            self._cond.notify_all()
+
+    def _reconcile_loop(self):
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._stopped, self.reconcile_interval):
+                    return
+            try:
+                drift = self.load()
+            except BinanceAPIException as e:
+                logging.error(f"Binance API hatası: {e}")
+                continue
+            except Exception as e:
+                logging.error(f"Hata: {e}")
+                continue
+            for asset, (cached, actual) in drift.items():
+                logging.warning(f"Bakiye sapması düzeltildi: {asset} önbellek={cached}, gerçek={actual}")
@@ -0,0 +1,434 @@
+import os
+import re
+import sys
+import json
+import time
+import logging
+import timeit
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from decimal import Decimal
+from datetime import datetime
+from binance.exceptions import BinanceAPIException
+from engine import PriceFeed, SymbolStrategy
+from exchange_info import SymbolRegistry, build_symbol_filters, compact_symbol
+from instrument import Instrument
+from strategy import exit_levels, reentry_price, make_exit, TP_REENTRY_FACTOR
+from indicators import IndicatorEngine
+from price_stream import PriceStream
+from fills import summarize_order
+from metrics import METRICS
+from balance_cache import BalanceCache
+from user_stream import UserDataStream, AsyncFillTracker
+from ledger import Ledger
+from log_pipeline import setup_logging, log_tick
+from mock_exchange import MockExchange, make_symbol, symbol_info, random_walk
+
+# Emir yolu ve tik döngüsü için performans ölçümleri. Mikro ölçümler filtre ayrıştırma, yuvarlama,
+# emir hazırlama ve tik başına yapılan işlerin çağrı başına süresini timeit ile ölçer. Makro ölçüm
+# N sembol × M tiki SymbolStrategy'nin kar/zarar durum makinesinden, süreç içi sahte borsaya karşı
+# geçirir. Sonuçlar JSON olarak saklanır; iki sonuç dosyası karşılaştırılarak gerileme aranır.
+#
+#   python benchmarks.py run --symbols 20 --ticks 2000
+#   python benchmarks.py compare benchmark_results/eski.json benchmark_results/yeni.json --threshold 10
+
+RESULTS_DIR = 'benchmark_results'
+# Karşılaştırmada bu yüzdenin üzerindeki yavaşlama gerileme sayılır
+REGRESSION_THRESHOLD = 10
+
+
+# Makro koşu iş yapmadıysa (emir yok ya da strateji hata verdi) süre ölçümü anlamsızdır
+class BenchmarkError(Exception):
+    pass
+
+
+# Makro koşu sırasında loglanan hataları toplar
+class ErrorCollector(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+SAMPLE_FILLS = [
+    {'price': '43210.98', 'qty': '0.05000', 'commission': '0.00005000', 'commissionAsset': 'BTC', 'tradeId': 1},
+    {'price': '43211.00', 'qty': '0.05000', 'commission': '0.00005000', 'commissionAsset': 'BTC', 'tradeId': 2},
+    {'price': '43211.02', 'qty': '0.02345', 'commission': '0.00002345', 'commissionAsset': 'BTC', 'tradeId': 3},
+]
+SAMPLE_ORDER = {'orderId': 1, 'status': 'FILLED', 'executedQty': '0.12345', 'cummulativeQuoteQty': '5334.39',
+                'fills': SAMPLE_FILLS}
+
+# Süreç içi sahte borsada motorun kullandığı istemci metotlarının karşılığı: (HTTP metodu, uç, sabit parametreler)
+LOCAL_ROUTES = {
+    'order_market_buy': ('POST', 'order', {'side': 'BUY', 'type': 'MARKET'}),
+    'order_market_sell': ('POST', 'order', {'side': 'SELL', 'type': 'MARKET'}),
+    'order_limit_buy': ('POST', 'order', {'side': 'BUY', 'type': 'LIMIT', 'timeInForce': 'GTC'}),
+    'get_order': ('GET', 'order', {}),
+    'get_my_trades': ('GET', 'myTrades', {}),
+    'cancel_order': ('DELETE', 'order', {}),
+    'get_account': ('GET', 'account', {}),
+    'get_exchange_info': ('GET', 'exchangeInfo', {}),
+}
+
+
+# Emir parametrelerini kaydedip hazır yanıt dönen istemci; ağ olmadan emir hazırlama maliyeti ölçülür
+class RecordingClient:
+    def __init__(self):
+        self.last = None
+
+    def order_market_buy(self, **params):
+        self.last = params
+        return SAMPLE_ORDER
+
+    def order_market_sell(self, **params):
+        self.last = params
+        return SAMPLE_ORDER
+
+    def order_limit_sell(self, **params):
+        self.last = params
+        return {'orderId': 2, 'status': 'NEW'}
+
+    def create_oco_order(self, **params):
+        self.last = params
+        return {'orderReports': [{'orderId': 3, 'type': 'STOP_LOSS_LIMIT'}, {'orderId': 4, 'type': 'LIMIT_MAKER'}]}
+
+
+def micro_benchmarks():
+    # binance_bot içe aktarılırken log kurulumu yapar; ölçümün log kurulumundan sonra yüklenmeli
+    import binance_bot
+
+    spec = make_symbol('BTCUSDT', '0.01', '0.00001', min_notional='5')
+    info = symbol_info(spec)
+    filters = build_symbol_filters(compact_symbol(info))
+    instrument = Instrument.from_filters(filters)
+    step, tick, min_notional = filters.step_size, filters.tick_size, filters.min_notional
+    quantity = Decimal('0.123456789')
+    price = Decimal('43210.987654')
+    profit, loss = Decimal('1'), Decimal('2')
+    take_profit, stop_loss = exit_levels(price, profit, loss, tick)
+    client = RecordingClient()
+    stream = PriceStream(None, 'BTCUSDT', None)
+    message = {'u': 1, 's': 'BTCUSDT', 'b': '43210.98', 'B': '1.50000', 'a': '43211.00', 'A': '2.00000'}
+
+    # main() döngüsünün tik başına yaptığı iş: akış mesajı, son fiyat, örneklenen log ve TP/SL karşılaştırması
+    def tick_step():
+        stream._on_message(message)
+        current = stream.last_price()
+        log_tick('BTCUSDT', current)
+        return current >= take_profit or current <= stop_loss
+
+    # Göstergeler ve iz süren stop her tikte aynı fiyatla değil, küçük bir salınımla beslenir
+    indicators = IndicatorEngine()
+    trailing = make_exit('IZSUREN', price, profit, loss, tick)
+    swing = [float(price) * (1 + i / 10000) for i in range(-5, 6)]
+    # İz süren stop kar hedefinin üstünde etkin tutulur ki her tik stop yükseltme yolundan geçsin
+    trailing_swing = [float(take_profit) * (1 + i / 10000) for i in range(-5, 6)]
+    trailing.update(trailing_swing[-1])
+    counter = [0]
+
+    def indicator_step():
+        counter[0] += 1
+        indicators.update(swing[counter[0] % len(swing)], 1.0, counter[0] * 0.1)
+
+    def trailing_step():
+        counter[0] += 1
+        return trailing.update(trailing_swing[counter[0] % len(trailing_swing)])
+
+    return [
+        ('filters.build_symbol_filters', lambda: build_symbol_filters(compact_symbol(info))),
+        ('filters.extract_filters', lambda: binance_bot.extract_filters(info)),
+        ('rounding.round_quantity', lambda: binance_bot.round_quantity(quantity, step)),
+        ('rounding.round_price', lambda: binance_bot.round_price(price, tick)),
+        ('instrument.round_quantity', lambda: instrument.round_quantity(quantity)),
+        ('instrument.round_price', lambda: instrument.round_price(price)),
+        ('instrument.format_quantity', lambda: instrument.format_quantity(quantity)),
+        ('instrument.format_price', lambda: instrument.format_price(price)),
+        ('instrument.notional_ok', lambda: instrument.notional_ok(price, quantity)),
+        ('strategy.exit_levels', lambda: exit_levels(price, profit, loss, tick)),
+        ('strategy.reentry_price', lambda: reentry_price(price, TP_REENTRY_FACTOR, tick)),
+        ('order.place_market_buy', lambda: binance_bot.place_order(client, 'MARKET', 'BTCUSDT', quantity, step, tick,
+                                                                   min_notional=min_notional)),
+        ('order.sell_market', lambda: binance_bot.sell_order(client, 'BTCUSDT', quantity, step, tick,
+                                                             min_notional=min_notional)),
+        ('order.sell_limit', lambda: binance_bot.sell_order(client, 'BTCUSDT', quantity, step, tick, price=take_profit,
+                                                            min_notional=min_notional)),
+        ('order.oco_bracket', lambda: binance_bot.place_oco_bracket(client, 'BTCUSDT', quantity, take_profit, stop_loss,
+                                                                    step, tick, min_notional=min_notional)),
+        ('fills.summarize_order', lambda: summarize_order(SAMPLE_ORDER)),
+        ('tick.price_stream', lambda: stream._on_message(message)),
+        ('tick.log_tick', lambda: log_tick('BTCUSDT', price)),
+        ('tick.main_loop', tick_step),
+        ('indicators.update', indicator_step),
+        ('exits.trailing_update', trailing_step),
+        ('metrics.observe', lambda: METRICS.observe('stage_seconds', 0.0012, stage='benchmark')),
+    ]
+
+# En az 0.2 sn süren çağrı sayısı bulunur, `repeat` kez ölçülür; en iyi süre karşılaştırmada kullanılır
+def measure(func, repeat=5):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {'ns_per_call': min(runs) * 1e9, 'median_ns': statistics.median(runs) * 1e9, 'calls': number,
+            'repeat': repeat}
+
+
+# Sahte borsanın kullanıcı olaylarını kullanıcı akışı dağıtıcısına iletir
+class LocalUserConnection:
+    combined = False
+
+    def __init__(self, user_stream):
+        self.user_stream = user_stream
+
+    def send_json(self, message):
+        self.user_stream._on_message(message)
+
+
+class LocalMarketData:
+    def __init__(self):
+        self.feeds = {}
+
+    def subscribe(self, symbol):
+        return self.feeds.setdefault(symbol, PriceFeed(symbol))
+
+
+# SymbolStrategy'nin beklediği motor arayüzü; istekler HTTP olmadan doğrudan sahte borsada işlenir.
+# Borsada geçen süre ayrıca toplanır ki stratejinin kendi maliyeti ayrılabilsin.
+class LocalEngine:
+    def __init__(self, exchange, workdir):
+        self.exchange = exchange
+        self.market_data = LocalMarketData()
+        self.user_stream = UserDataStream(None)
+        self.fills = AsyncFillTracker(self.user_stream)
+        self.balances = BalanceCache(None, self.user_stream, reconcile_interval=0)
+        self.registry = SymbolRegistry(None, path=os.path.join(workdir, 'exchange_info.json'), refresh_interval=0)
+        # Gerçek motordaki gibi dolumlar deftere yazılır; her koşu boş bir defterle başlar
+        ledger_path = os.path.join(workdir, 'trading_ledger.db')
+        if os.path.exists(ledger_path):
+            os.remove(ledger_path)
+        self.ledger = Ledger(ledger_path).attach(self.user_stream)
+        self.exchange_seconds = 0.0
+        self.orders = 0
+        exchange.add_user_connection(LocalUserConnection(self.user_stream))
+        self.registry.apply_exchange_info(self.request('get_exchange_info'))
+        self.balances.apply_snapshot(self.request('get_account'))
+
+    def request(self, method, **params):
+        http_method, route, fixed = LOCAL_ROUTES[method]
+        start = time.perf_counter()
+        status, body, _ = self.exchange.handle_request(http_method, f"/api/v3/{route}", {**fixed, **params})
+        self.exchange_seconds += time.perf_counter() - start
+        if http_method == 'POST':
+            self.orders += 1
+        if status != 200:
+            raise BinanceAPIException(None, status, json.dumps(body))
+        return body
+
+    async def call(self, method, **params):
+        return self.request(method, **params)
+
+    async def wait_for_balance(self, version, timeout=2):
+        if self.balances.version == version:
+            self.balances.apply_snapshot(await self.call('get_account'))
+
+
+async def _drive(exchange, engine, strategies, settle):
+    feeds = list(engine.market_data.feeds.values())
+
+    def publish():
+        for feed in feeds:
+            feed.publish(exchange.last_price(feed.symbol))
+
+    publish()
+    tasks = [asyncio.create_task(strategy.run()) for strategy in strategies]
+    ticks = 0
+    start = time.perf_counter()
+    while True:
+        # Uyanan stratejilerin karar verip bir sonraki fiyatı beklemeye dönmesi için döngüye sıra ver
+        for _ in range(settle):
+            await asyncio.sleep(0)
+        step_start = time.perf_counter()
+        advanced = exchange.step()
+        engine.exchange_seconds += time.perf_counter() - step_start
+        if not advanced:
+            break
+        publish()
+        ticks += 1
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return elapsed, ticks
+
+# N sembol × M tik; her sembol kendi rastgele yürüyüşünde, hepsi aynı USDT bakiyesini paylaşır
+def run_macro(workdir, symbol_count, tick_count, profit_percentage=0.5, loss_percentage=1, volatility=0.002,
+              settle=5, seed=1):
+    specs = [make_symbol(f"SYM{i}USDT", '0.01', '0.001', min_notional='5') for i in range(symbol_count)]
+    prices = {spec.symbol: random_walk(100, tick_count + 1, volatility, seed=seed + i) for i, spec in enumerate(specs)}
+    exchange = MockExchange(specs, prices, balances={'USDT': Decimal(1000 * symbol_count)}, depth_levels=5,
+                            weight_limit=10 ** 12, order_limit=10 ** 12, tick_interval=0, seed=seed)
+    engine = LocalEngine(exchange, workdir)
+    engine.ledger.start()
+    allocation = 100 / symbol_count
+    strategies = [SymbolStrategy(engine, {'symbol': spec.symbol, 'profit_percentage': profit_percentage,
+                                          'loss_percentage': loss_percentage, 'allocation_percentage': allocation,
+                                          'fill_timeout': None})
+                  for spec in specs]
+    errors = ErrorCollector()
+    logging.getLogger().addHandler(errors)
+    try:
+        elapsed, ticks = asyncio.run(_drive(exchange, engine, strategies, settle))
+    finally:
+        logging.getLogger().removeHandler(errors)
+        engine.ledger.stop()
+    if errors.messages:
+        raise BenchmarkError(f"Makro ölçümde {len(errors.messages)} hata loglandı, ilki: {errors.messages[0]}")
+    if engine.orders == 0:
+        raise BenchmarkError("Makro ölçümde hiç emir verilmedi; stratejiler çalışmadı.")
+    symbol_ticks = max(ticks * symbol_count, 1)
+    return {
+        'symbols': symbol_count,
+        'ticks': ticks,
+        'seconds': elapsed,
+        'exchange_seconds': engine.exchange_seconds,
+        'orders': engine.orders,
+        'us_per_tick': elapsed / symbol_ticks * 1e6,
+        'strategy_us_per_tick': (elapsed - engine.exchange_seconds) / symbol_ticks * 1e6,
+    }
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def run_suite(args):
+    workdir = tempfile.mkdtemp(prefix='benchmarks-')
+    # Loglar gerçek bottaki gibi kuyruk üzerinden dosyaya yazılır; ekran çıktısı ölçüme karışmaz
+    pipeline = setup_logging(log_file=os.path.join(workdir, 'trading_bot.log'),
+                             event_file=os.path.join(workdir, 'trading_events.jsonl'), console=False)
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'label': args.label,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'micro': {},
+        'macro': {},
+    }
+    pattern = re.compile(args.filter) if args.filter else None
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            if not args.skip_micro:
+                for name, func in micro_benchmarks():
+                    if pattern and not pattern.search(name):
+                        continue
+                    with contextlib.redirect_stdout(devnull):
+                        result = measure(func, args.repeat)
+                    results['micro'][name] = result
+                    print(f"{name:32} {result['ns_per_call'] / 1000:10.2f} µs/çağrı  (medyan {result['median_ns'] / 1000:.2f})")
+
+            if not args.skip_macro:
+                runs = []
+                for _ in range(args.macro_repeat):
+                    with contextlib.redirect_stdout(devnull):
+                        runs.append(run_macro(workdir, args.symbols, args.ticks, seed=args.seed))
+                best = min(runs, key=lambda r: r['strategy_us_per_tick'])
+                name = f"engine.{args.symbols}x{args.ticks}"
+                results['macro'][name] = best
+                print(f"{name:32} {best['strategy_us_per_tick']:10.2f} µs/tik strateji, "
+                      f"{best['us_per_tick']:.2f} µs/tik toplam, {best['orders']} emir, {best['seconds']:.2f} sn")
+    finally:
+        pipeline.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(args.out, f"{args.label or results['meta']['commit'] or 'sonuc'}-{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Sonuçlar kaydedildi: {path}")
+    return path
+
+# (ad, eski, yeni, birim) satırları; yalnızca iki dosyada da bulunan ölçümler karşılaştırılır
+def compare_results(base, current):
+    rows = []
+    for name, result in current.get('micro', {}).items():
+        old = base.get('micro', {}).get(name)
+        if old is not None:
+            rows.append((name, old['ns_per_call'] / 1000, result['ns_per_call'] / 1000, 'µs/çağrı'))
+    for name, result in current.get('macro', {}).items():
+        old = base.get('macro', {}).get(name)
+        if old is not None:
+            rows.append((name, old['strategy_us_per_tick'], result['strategy_us_per_tick'], 'µs/tik'))
+    return rows
+
+def compare(base_path, current_path, threshold=REGRESSION_THRESHOLD):
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)
+    print(f"Eski: {base['meta'].get('label') or base['meta'].get('commit')} ({base['meta'].get('time')}), "
+          f"Yeni: {current['meta'].get('label') or current['meta'].get('commit')} ({current['meta'].get('time')})")
+    regressions = []
+    for name, old, new, unit in compare_results(base, current):
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  <-- GERİLEME'
+        print(f"{name:32} {old:10.2f} -> {new:10.2f} {unit}  {change:+7.1f}%{flag}")
+    if regressions:
+        print(f"{len(regressions)} ölçümde %{threshold} üzerinde yavaşlama var.")
+    else:
+        print("Gerileme bulunmadı.")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Emir yolu ve tik döngüsü performans ölçümleri")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Ölçümleri çalıştır ve sonucu kaydet")
+    run_parser.add_argument('--symbols', type=int, default=10, help="Makro ölçümde sembol sayısı")
+    run_parser.add_argument('--ticks', type=int, default=1000, help="Makro ölçümde sembol başına tik sayısı")
+    run_parser.add_argument('--repeat', type=int, default=5, help="Mikro ölçüm tekrar sayısı")
+    run_parser.add_argument('--macro-repeat', type=int, default=3, help="Makro ölçüm tekrar sayısı")
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--filter', help="Yalnızca adı bu düzenli ifadeye uyan mikro ölçümler")
+    run_parser.add_argument('--skip-micro', action='store_true')
+    run_parser.add_argument('--skip-macro', action='store_true')
+    run_parser.add_argument('--label', help="Sonuç dosyasının adı (varsayılan: git commit)")
+    run_parser.add_argument('--out', default=RESULTS_DIR, help="Sonuç klasörü")
+    run_parser.add_argument('--baseline', help="Çalıştırma sonrası karşılaştırılacak eski sonuç dosyası")
+    run_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+
+    compare_parser = commands.add_parser('compare', help="İki sonuç dosyasını karşılaştır")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                                help="Gerileme sayılacak yavaşlama yüzdesi")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        try:
+            path = run_suite(args)
+        except BenchmarkError as e:
+            print(f"Ölçüm geçersiz: {e}")
+            sys.exit(1)
+        if args.baseline and compare(args.baseline, path, args.threshold):
+            sys.exit(1)
+    elif compare(args.base, args.current, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
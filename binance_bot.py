@@ -1,30 +1,71 @@
+import os
 import time
 from binance.client import Client
+from binance import ThreadedWebsocketManager
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 import logging
-from decimal import Decimal, ROUND_DOWN, getcontext
+from decimal import Decimal, getcontext
+from price_stream import PriceStream
+from user_stream import UserDataStream, FillTracker, FINAL_ORDER_STATUSES
+from balance_cache import BalanceCache
+from exchange_info import SymbolRegistry, build_symbol_filters, compact_symbol
+from instrument import get_instrument, floor_to_step
+from log_pipeline import setup_logging, log_tick, log_status
+from clock_sync import ClockSync, tune_session, warm_up
+from metrics import METRICS, InstrumentedClient, MetricsReporter
+from fills import summarize_order, summarize_state, fetch_order_fills
+from order_amend import RestingOrder, UNKNOWN_ORDER_CODE
+from order_book import OrderBook
+from rate_limiter import WeightScheduler, ScheduledClient
+from endpoints import FailoverClient, EndpointPool
+from strategy import exit_levels, reentry_price, make_exit, TP_REENTRY_FACTOR, SL_REENTRY_FACTOR, MAX_LOSS_COUNT, LIMIT_FILL_TIMEOUT
+from indicators import IndicatorEngine
+from journal import StateJournal, RESUME_PHASES, journal_buy_order, journal_position
+from ledger import Ledger
 
 # Decimal hassasiyetini artır
 getcontext().prec = 28
 
-# Logging yapılandırması
-logging.basicConfig(
-    filename='trading_bot.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Kullanıcı veri akışı açıkken kaçırılan olaylar için REST kontrol aralığı (saniye)
+FILL_CHECK_INTERVAL = 30
+# Yeniden alım emri dolum süresi bu kadar parçaya bölünür; her parçanın sonunda dolmamışsa emir en iyi
+# alış fiyatına taşınır (en fazla ilk fiyatın REENTRY_MAX_CHASE oranı kadar üstüne), son parçada iptal edilir
+REENTRY_REPRICE_LIMIT = 1
+REENTRY_MAX_CHASE = Decimal('0.002')
+# OCO zarar bacağında limit fiyatı, tetik fiyatının bu oran kadar altına konur; hızlı düşüşte
+# stop-limit emrinin dolmadan kalmasını önler
+OCO_STOP_LIMIT_OFFSET = Decimal('0.005')
+# Defterden hesaplanan beklenen kayma bu oranı aşarsa giriş piyasa yerine limit emirle yapılır
+MAX_MARKET_SLIPPAGE = 0.002
+# ATR modunda mum aralığı ve ATR periyodu; başlangıçta bu kadar kapanmış mum REST'ten yüklenir
+CANDLE_INTERVAL = 60
+CANDLE_INTERVAL_NAME = '1m'
+ATR_PERIOD = 14
+
+# Logging yapılandırması: kayıtlar kuyruk üzerinden ayrı iş parçacığında yazılır,
+# trading_bot.log boyuta göre döndürülür, olaylar ayrıca trading_events.jsonl'e gider
+setup_logging()
 
 def get_api_credentials():
-    api_key = input("API Anahtarınızı Girin: ")
-    api_secret = input("API Gizli Anahtarınızı Girin: ")
+    # Ortam değişkenleri tanımlıysa sorulmaz; çökme sonrası yeniden başlatma girdi beklemeden devam eder
+    api_key = os.environ.get('BINANCE_API_KEY') or input("API Anahtarınızı Girin: ")
+    api_secret = os.environ.get('BINANCE_API_SECRET') or input("API Gizli Anahtarınızı Girin: ")
     return api_key, api_secret
 
 def connect_client(api_key, api_secret):
-    client = Client(api_key, api_secret)
+    # Tüm REST çağrıları istek ağırlığı/emir limitlerine göre sıraya alınır; istekler api, api1-api4
+    # uç noktalarından en sağlıklısına gider, okuma istekleri yavaşlarsa ikinci uç noktaya da gönderilir
+    scheduler = WeightScheduler()
+    client = ScheduledClient(InstrumentedClient(FailoverClient(Client(api_key, api_secret, ping=False), EndpointPool(),
+                                                               scheduler=scheduler)), scheduler)
     try:
-        server_time = client.get_server_time()
-        logging.info(f"Bağlantı başarılı. Sunucu zamanı: {server_time}")
-        print(f"Bağlantı başarılı. Sunucu zamanı: {server_time}")
+        # Kalıcı bağlantı havuzu önceden açılır, saat farkı arka planda ölçülüp imzalı isteklere uygulanır
+        tune_session(client)
+        warm_up(client)
+        clock = ClockSync(client).start()
+        client.attach_clock(clock)
+        logging.info(f"Bağlantı başarılı. Sunucu saat farkı: {clock.offset_ms:.1f} ms, gidiş-dönüş: {clock.rtt_ms:.1f} ms")
+        print(f"Bağlantı başarılı. Sunucu saat farkı: {clock.offset_ms:.1f} ms, gidiş-dönüş: {clock.rtt_ms:.1f} ms")
         return client
     except BinanceAPIException as e:
         logging.error(f"Binance API hatası: {e}")
@@ -50,29 +91,37 @@ def get_symbol_info(client, symbol):
         print(f"Hata: {e}")
         exit()
 
+def get_symbol_filters(registry, symbol):
+    symbol_filters = registry.get(symbol)
+    if symbol_filters is None:
+        logging.error(f"Hata: Symbol bilgisi bulunamadı: {symbol}")
+        print(f"Hata: Symbol bilgisi bulunamadı: {symbol}")
+        exit()
+    return symbol_filters
+
 def extract_filters(symbol_info):
-    lot_size_filter = next(filter(lambda f: f['filterType'] == 'LOT_SIZE', symbol_info['filters']), None)
-    if lot_size_filter:
-        min_qty = Decimal(lot_size_filter['minQty'])
-        max_qty = Decimal(lot_size_filter['maxQty'])
-        step_size = Decimal(lot_size_filter['stepSize'])
+    return unpack_filters(build_symbol_filters(compact_symbol(symbol_info)))
+
+def unpack_filters(symbol_filters):
+    if symbol_filters.step_size is not None:
+        min_qty = symbol_filters.min_qty
+        max_qty = symbol_filters.max_qty
+        step_size = symbol_filters.step_size
         print(f"Min miktar: {min_qty}, Max miktar: {max_qty}, Adım boyutu: {step_size}")
         logging.info(f"Min miktar: {min_qty}, Max miktar: {max_qty}, Adım boyutu: {step_size}")
     else:
-        raise Exception(f"LOT_SIZE filtresi bulunamadı: {symbol_info['symbol']}")
+        raise Exception(f"LOT_SIZE filtresi bulunamadı: {symbol_filters.symbol}")
 
-    price_filter = next(filter(lambda f: f['filterType'] == 'PRICE_FILTER', symbol_info['filters']), None)
-    if price_filter:
-        min_price = Decimal(price_filter['minPrice'])
-        tick_size = Decimal(price_filter['tickSize'])
+    if symbol_filters.tick_size is not None:
+        min_price = symbol_filters.min_price
+        tick_size = symbol_filters.tick_size
         print(f"Minimum fiyat adımı: {tick_size}")
         logging.info(f"Minimum fiyat adımı: {tick_size}")
     else:
-        raise Exception(f"PRICE_FILTER bulunamadı: {symbol_info['symbol']}")
+        raise Exception(f"PRICE_FILTER bulunamadı: {symbol_filters.symbol}")
 
-    min_notional_filter = next(filter(lambda f: f['filterType'] == 'MIN_NOTIONAL', symbol_info['filters']), None)
-    if min_notional_filter:
-        min_notional = Decimal(min_notional_filter['minNotional'])
+    if symbol_filters.min_notional is not None:
+        min_notional = symbol_filters.min_notional
         print(f"Minimum notional değeri: {min_notional}")
         logging.info(f"Minimum notional değeri: {min_notional}")
     else:
@@ -83,11 +132,10 @@ def extract_filters(symbol_info):
     return min_qty, max_qty, step_size, min_price, tick_size, min_notional
 
 def round_quantity(quantity, step_size):
-    return (quantity / step_size).to_integral_value(rounding=ROUND_DOWN) * step_size
+    return floor_to_step(quantity, step_size)
 
 def round_price(price, tick_size):
-    tick_decimals = abs(tick_size.as_tuple().exponent)
-    return price.quantize(Decimal('1.' + '0' * tick_decimals), rounding=ROUND_DOWN)
+    return floor_to_step(price, tick_size)
 
 def get_usdt_balance(client):
     try:
@@ -113,19 +161,147 @@ def get_usdt_balance(client):
         print(f"Hata: {e}")
         exit()
 
-def place_order(client, order_type, symbol, quantity, step_size, tick_size, price=None, min_notional=Decimal('10')):
+def get_asset_balance(balances, asset):
+    free = balances.free(asset)
+    locked = balances.locked(asset)
+    print(f"Mevcut {asset} bakiyesi (Free): {free}, (Locked): {locked}, Toplam: {free + locked}")
+    logging.info(f"Mevcut {asset} bakiyesi (Free): {free}, (Locked): {locked}, Toplam: {free + locked}")
+    return free
+
+# Emrin tüm dolumları üzerinden ortalama fiyat (yalnızca bu emrin işlemleri sorgulanır)
+def get_order_fill_price(client, symbol, order_id):
+    summary = fetch_order_fills(client, symbol, order_id)
+    if summary.vwap is not None:
+        logging.info(f"Emir {order_id}: {summary.qty} adet, ortalama fiyat {summary.vwap}, komisyon {summary.commissions}")
+        return summary.vwap
+    logging.error("Trade bilgisi alınamadı.")
+    print("Trade bilgisi alınamadı.")
+    return None
+
+def state_fill_price(client, symbol, state):
+    summary = summarize_state(state)
+    if summary is None or summary.vwap is None:
+        return get_order_fill_price(client, symbol, state.order_id)
+    return summary.vwap
+
+# Emir dolana kadar bekle. Kullanıcı veri akışı varsa executionReport gelir gelmez uyanılır,
+# akış olayı kaçırılırsa diye seyrek REST kontrolü yapılır; akış yoksa eski yoklama kullanılır.
+# Süre dolarsa emir iptal edilir; kısmen dolmuş emirde gerçekleşen kısmın fiyatı döner.
+# cancel_on_timeout=False: süre dolunca emir iptal edilmeden None döner, emir açık kalır
+def wait_for_order_fill(client, symbol, order_id, fill_tracker=None, timeout=None, cancel_on_timeout=True):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    interval = FILL_CHECK_INTERVAL if fill_tracker is not None else 2
+    keep_state = False
+    try:
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            wait = interval if remaining is None else min(interval, remaining)
+
+            if fill_tracker is not None:
+                state = fill_tracker.wait(order_id, wait)
+                if state is not None:
+                    if state.status == 'FILLED':
+                        logging.info("Limit emri gerçekleşti.")
+                        print("Limit emri gerçekleşti.")
+                        return state_fill_price(client, symbol, state)
+                    logging.error(f"Emir sonuçlandı ancak dolmadı: {state.status}")
+                    print(f"Emir sonuçlandı ancak dolmadı: {state.status}")
+                    return state_fill_price(client, symbol, state) if state.executed_qty > 0 else None
+            else:
+                time.sleep(wait)
+
+            order_status = client.get_order(symbol=symbol, orderId=order_id)
+            if order_status['status'] == 'FILLED':
+                logging.info("Limit emri gerçekleşti.")
+                print("Limit emri gerçekleşti.")
+                return get_order_fill_price(client, symbol, order_id)
+            if order_status['status'] in FINAL_ORDER_STATUSES:
+                logging.error(f"Emir sonuçlandı ancak dolmadı: {order_status['status']}")
+                print(f"Emir sonuçlandı ancak dolmadı: {order_status['status']}")
+                return get_order_fill_price(client, symbol, order_id) if Decimal(order_status['executedQty']) > 0 else None
+            logging.info("Limit emri henüz dolmadı, bekleniyor...")
+            print("Limit emri henüz dolmadı, bekleniyor...")
+
+        if not cancel_on_timeout:
+            # Emir açık kalıyor; akıştan gelmiş kısmi dolumlar silinmesin
+            keep_state = True
+            return None
+        logging.warning(f"Limit emri {timeout} saniye içinde dolmadı, iptal ediliyor: {order_id}")
+        print(f"Limit emri {timeout} saniye içinde dolmadı, iptal ediliyor...")
+        try:
+            client.cancel_order(symbol=symbol, orderId=order_id)
+        except BinanceAPIException as e:
+            # İptal ile dolum yarışmış olabilir, durumu aşağıda kontrol et
+            logging.error(f"Emir iptal edilemedi: {e}")
+        order_status = client.get_order(symbol=symbol, orderId=order_id)
+        if order_status['status'] == 'FILLED' or Decimal(order_status['executedQty']) > 0:
+            logging.info(f"Emir kısmen/tamamen gerçekleşti: {order_status['executedQty']}")
+            print(f"Emir kısmen/tamamen gerçekleşti: {order_status['executedQty']}")
+            return get_order_fill_price(client, symbol, order_id)
+        return None
+    finally:
+        if fill_tracker is not None and not keep_state:
+            fill_tracker.forget(order_id)
+
+# Süresi dolan yeniden alım emrini en iyi alış fiyatına taşır; fiyat ceiling'i geçmez. Bakiye ilk
+# fiyata göre ayrıldığından kalan miktar fiyat oranında küçültülür. Emir açık kalıyorsa True döner.
+# Yeni numara istek öncesi günlüğe eklenir; önceki numaralar da günlükte kaldığından değişiklik
+# başarısız olsa bile resume_buy_order gerçek emri bulur.
+def reprice_buy_order(client, order, ceiling, on_submit=None):
+    best_bid = Decimal(client.get_orderbook_ticker(symbol=order.symbol)['bidPrice'])
+    price = order.instrument.round_price(min(best_bid, ceiling))
+    if price <= order.price:
+        return True
+    quantity = order.executed_qty + order.remaining_qty * order.price / price
+    logging.info(f"Alım emri {order.price} -> {price} fiyatına taşınıyor: {order.order_id}")
+    print(f"Alım emri {price} fiyatına taşınıyor...")
+    return order.amend(price=price, quantity=quantity,
+                       client_order_id=on_submit() if on_submit is not None else None)
+
+# Piyasa emrinin defterdeki derinliğe göre beklenen ortalama fiyatı ve kayması
+def estimate_market_fill(order_book, side, quantity):
+    if order_book is None or not order_book.is_synced():
+        return None
+    estimate = order_book.estimate(side, quantity)
+    if estimate.vwap is not None:
+        logging.info(f"Beklenen ortalama fiyat ({side} {quantity}): {estimate.vwap:.8f}, kayma: %{estimate.slippage * 100:.4f}, karşılanan: {estimate.filled_qty}")
+        print(f"Beklenen ortalama fiyat: {estimate.vwap:.8f}, kayma: %{estimate.slippage * 100:.4f}")
+    return estimate
+
+# Kayma eşiği aşılıyor ya da defter miktarı karşılamıyorsa en iyi karşı fiyattan limit emir öner
+def choose_order_type(order_book, side, quantity, max_slippage=MAX_MARKET_SLIPPAGE):
+    estimate = estimate_market_fill(order_book, side, quantity)
+    if estimate is None or estimate.vwap is None:
+        return "MARKET", None
+    if estimate.filled_qty < float(quantity) or estimate.slippage > max_slippage:
+        best = order_book.best_ask() if side == 'BUY' else order_book.best_bid()
+        logging.warning(f"Beklenen kayma yüksek, {best} fiyatından limit emir kullanılacak.")
+        print(f"Beklenen kayma yüksek, {best} fiyatından limit emir kullanılacak.")
+        return "LIMIT", Decimal(str(best))
+    return "MARKET", None
+
+def place_order(client, order_type, symbol, quantity, step_size, tick_size, price=None, min_notional=Decimal('10'),
+                fill_tracker=None, fill_timeout=None, on_submit=None):
     try:
-        quantity = round_quantity(quantity, step_size)
+        instrument = get_instrument(step_size, tick_size, min_notional)
+        quantity = instrument.round_quantity(quantity)
         if price is not None:
-            price = round_price(price, tick_size)
+            price = instrument.round_price(price)
 
         if order_type == "MARKET":
             logging.info(f"Piyasa emriyle alım yapılıyor: {quantity} {symbol}")
             print("Piyasa emriyle alım yapılıyor...")
-            order = client.order_market_buy(symbol=symbol, quantity=str(quantity))
-            if 'fills' in order and len(order['fills']) > 0:
-                entry_price = Decimal(order['fills'][0]['price'])
-                notional = entry_price * quantity
+            # on_submit emir gönderilmeden önce günlüğe yazar ve istemci emir numarasını döner
+            client_ids = {} if on_submit is None else {'newClientOrderId': on_submit()}
+            order = client.order_market_buy(symbol=symbol, quantity=instrument.format_quantity(quantity),
+                                            newOrderRespType='FULL', **client_ids)
+            # Birden fazla seviyede dolan emirde giriş fiyatı tüm dolumların ortalamasıdır
+            fill = summarize_order(order)
+            if fill.vwap is not None:
+                entry_price = fill.vwap
+                notional = fill.quote
                 if notional < min_notional:
                     logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
                     print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
@@ -141,42 +317,31 @@ def place_order(client, order_type, symbol, quantity, step_size, tick_size, pric
         elif order_type == "LIMIT":
             if price is None:
                 raise Exception("Limit fiyatı belirtilmedi.")
-            notional = price * quantity
-            if notional < min_notional:
+            if not instrument.notional_ok(price, quantity):
+                notional = price * quantity
                 logging.error(f"Limit alım notional değeri minimumun altında: {notional} < {min_notional}")
                 print(f"Limit alım notional değeri minimumun altında: {notional} < {min_notional}")
                 return None
             logging.info(f"Limit emriyle alım yapılıyor: {quantity} {symbol} at {price}")
             print(f"Limit emriyle {price} fiyatından alım yapılıyor...")
 
-            tick_decimals = abs(tick_size.as_tuple().exponent)
-            price_str = format(price, f'.{tick_decimals}f')
-            order = client.order_limit_buy(symbol=symbol, quantity=str(quantity), price=price_str)
-
-            while True:
-                order_status = client.get_order(symbol=symbol, orderId=order['orderId'])
-                if order_status['status'] == 'FILLED':
-                    logging.info("Limit emri gerçekleşti.")
-                    print("Limit emri gerçekleşti.")
-                    fills = client.get_my_trades(symbol=symbol)
-                    if fills:
-                        entry_price = Decimal(fills[-1]['price'])
-                        notional = entry_price * quantity
-                        if notional < min_notional:
-                            logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
-                            print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
-                            return None
-                        logging.info(f"Limit emri başarılı: {entry_price} fiyatından alındı.")
-                        print(f"Limit emri başarılı: {entry_price} fiyatından alındı.")
-                        return entry_price
-                    else:
-                        logging.error("Trade bilgisi alınamadı.")
-                        print("Trade bilgisi alınamadı.")
-                        return None
-                else:
-                    logging.info("Limit emri henüz dolmadı, bekleniyor...")
-                    print("Limit emri henüz dolmadı, bekleniyor...")
-                    time.sleep(2)
+            client_ids = {} if on_submit is None else {'newClientOrderId': on_submit()}
+            order = client.order_limit_buy(symbol=symbol, quantity=instrument.format_quantity(quantity),
+                                           price=instrument.format_price(price), **client_ids)
+
+            entry_price = wait_for_order_fill(client, symbol, order['orderId'], fill_tracker, fill_timeout)
+            if entry_price is None:
+                logging.error("Limit emri gerçekleşmedi.")
+                print("Limit emri gerçekleşmedi.")
+                return None
+            notional = entry_price * quantity
+            if notional < min_notional:
+                logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
+                print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
+                return None
+            logging.info(f"Limit emri başarılı: {entry_price} fiyatından alındı.")
+            print(f"Limit emri başarılı: {entry_price} fiyatından alındı.")
+            return entry_price
     except BinanceAPIException as e:
         logging.error(f"Binance API hatası: {e}")
         print(f"Binance API hatası: {e}")
@@ -192,26 +357,27 @@ def place_order(client, order_type, symbol, quantity, step_size, tick_size, pric
 
 def sell_order(client, symbol, quantity, step_size, tick_size, price=None, min_notional=Decimal('10')):
     try:
-        quantity = round_quantity(quantity, step_size)
+        instrument = get_instrument(step_size, tick_size, min_notional)
+        quantity = instrument.round_quantity(quantity)
         if price is not None:
-            price = round_price(price, tick_size)
+            price = instrument.round_price(price)
 
         if price:
-            notional = price * quantity
-            if notional < min_notional:
+            if not instrument.notional_ok(price, quantity):
+                notional = price * quantity
                 logging.error(f"Limit satış notional değeri minimumun altında: {notional} < {min_notional}")
                 print(f"Limit satış notional değeri minimumun altında: {notional} < {min_notional}")
                 return None
             logging.info(f"Limit emriyle satış yapılıyor: {quantity} {symbol} at {price}")
             print(f"Limit emriyle {price} fiyatından satış yapılıyor...")
 
-            tick_decimals = abs(tick_size.as_tuple().exponent)
-            price_str = format(price, f'.{tick_decimals}f')
-            order = client.order_limit_sell(symbol=symbol, quantity=str(quantity), price=price_str)
+            order = client.order_limit_sell(symbol=symbol, quantity=instrument.format_quantity(quantity),
+                                            price=instrument.format_price(price))
         else:
             logging.info(f"Piyasa emriyle satış yapılıyor: {quantity} {symbol}")
             print(f"Piyasa emriyle satış yapılıyor: {quantity} {symbol}")
-            order = client.order_market_sell(symbol=symbol, quantity=str(quantity))
+            order = client.order_market_sell(symbol=symbol, quantity=instrument.format_quantity(quantity),
+                                             newOrderRespType='FULL')
 
         return order
     except BinanceAPIException as e:
@@ -227,14 +393,17 @@ def sell_order(client, symbol, quantity, step_size, tick_size, price=None, min_n
         print(f"Hata: {e}")
         return None
 
-def place_buy_order(client, symbol, quantity, step_size, tick_size, min_notional=Decimal('10'), buy_price=None):
+def place_buy_order(client, symbol, quantity, step_size, tick_size, min_notional=Decimal('10'), buy_price=None,
+                    fill_tracker=None, fill_timeout=None, on_submit=None):
     try:
         if buy_price is None:
             raise Exception("Alım fiyatı belirtilmedi.")
 
-        buy_price = round_price(buy_price, tick_size)
-        notional = buy_price * quantity
-        if notional < min_notional:
+        instrument = get_instrument(step_size, tick_size, min_notional)
+        quantity = instrument.round_quantity(quantity)
+        buy_price = instrument.round_price(buy_price)
+        if not instrument.notional_ok(buy_price, quantity):
+            notional = buy_price * quantity
             logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
             print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
             return False
@@ -242,35 +411,42 @@ def place_buy_order(client, symbol, quantity, step_size, tick_size, min_notional
         logging.info(f"Limit emriyle alım yapılıyor: {quantity} {symbol} at {buy_price}")
         print(f"Limit emriyle {buy_price} fiyatından alım yapılıyor...")
 
-        tick_decimals = abs(tick_size.as_tuple().exponent)
-        buy_price_str = format(buy_price, f'.{tick_decimals}f')
-
-        order = client.order_limit_buy(symbol=symbol, quantity=str(quantity), price=buy_price_str)
-
-        while True:
-            order_status = client.get_order(symbol=symbol, orderId=order['orderId'])
-            if order_status['status'] == 'FILLED':
-                logging.info("Alış emri gerçekleşti.")
-                print("Alış emri gerçekleşti.")
-                fills = client.get_my_trades(symbol=symbol)
-                if fills:
-                    entry_price = Decimal(fills[-1]['price'])
-                    notional = entry_price * quantity
-                    if notional < min_notional:
-                        logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
-                        print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
-                        return False
-                    logging.info(f"Alım işlemi başarılı: {entry_price} fiyatından alındı.")
-                    print(f"Alım işlemi başarılı: {entry_price} fiyatından alındı.")
-                    return entry_price
-                else:
-                    logging.error("Trade bilgisi alınamadı.")
-                    print("Trade bilgisi alınamadı.")
-                    return False
-            else:
-                logging.info("Alış emri henüz dolmadı, bekleniyor...")
-                print("Alış emri henüz dolmadı, bekleniyor...")
-                time.sleep(2)
+        # Yeniden alım emri RestingOrder olarak tutulur; süre dolunca iptal yerine tek istekle yeni fiyata taşınır
+        order = RestingOrder.place(client, symbol, 'BUY', instrument, quantity, buy_price,
+                                   on_submit() if on_submit is not None else None)
+
+        windows = 1 if fill_timeout is None else REENTRY_REPRICE_LIMIT + 1
+        window = None if fill_timeout is None else fill_timeout / windows
+        ceiling = buy_price * (Decimal('1') + REENTRY_MAX_CHASE)
+        entry_price = None
+        for attempt in range(windows):
+            last = attempt == windows - 1
+            entry_price = wait_for_order_fill(client, symbol, order.order_id, fill_tracker, window,
+                                              cancel_on_timeout=last)
+            if entry_price is not None or last:
+                break
+            if order.refresh().status in FINAL_ORDER_STATUSES:
+                break
+            if not reprice_buy_order(client, order, ceiling, on_submit):
+                break
+        if fill_tracker is not None:
+            for order_id in order.replaced_ids + [order.order_id]:
+                fill_tracker.forget(order_id)
+        if order.replaced_ids or entry_price is None:
+            # Dolumlar birden çok emre dağılmış olabilir; ortalama tüm emirlerden hesaplanır
+            entry_price = order.refresh().avg_price
+        if entry_price is None:
+            logging.error("Alış emri gerçekleşmedi.")
+            print("Alış emri gerçekleşmedi.")
+            return False
+        notional = entry_price * quantity
+        if notional < min_notional:
+            logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
+            print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
+            return False
+        logging.info(f"Alım işlemi başarılı: {entry_price} fiyatından alındı.")
+        print(f"Alım işlemi başarılı: {entry_price} fiyatından alındı.")
+        return entry_price
     except BinanceAPIException as e:
         logging.error(f"Binance API hatası: {e}")
         print(f"Binance API hatası: {e}")
@@ -284,61 +460,288 @@ def place_buy_order(client, symbol, quantity, step_size, tick_size, min_notional
         print(f"Hata: {e}")
         return False
 
+# Giriş dolduktan sonra borsada duran kar (LIMIT_MAKER) + zarar (STOP_LOSS_LIMIT) satış çifti kurar.
+# Bacakların emir numaralarını {orderId: 'TP' | 'SL'} olarak döner.
+def place_oco_bracket(client, symbol, quantity, take_profit_price, stop_loss_price, step_size, tick_size,
+                      min_qty=Decimal('0'), min_notional=Decimal('10')):
+    try:
+        instrument = get_instrument(step_size, tick_size, min_notional)
+        quantity = instrument.round_quantity(quantity)
+        take_profit_price = instrument.round_price(take_profit_price)
+        stop_loss_price = instrument.round_price(stop_loss_price)
+        stop_limit_price = instrument.round_price(stop_loss_price * (Decimal('1') - OCO_STOP_LIMIT_OFFSET))
+
+        if quantity < min_qty:
+            logging.error(f"OCO miktarı minimum işlem miktarının altında: {quantity} < {min_qty}")
+            print(f"OCO miktarı minimum işlem miktarının altında: {quantity} < {min_qty}")
+            return None
+        if not instrument.notional_ok(stop_limit_price, quantity):
+            notional = stop_limit_price * quantity
+            logging.error(f"OCO notional değeri minimumun altında: {notional} < {min_notional}")
+            print(f"OCO notional değeri minimumun altında: {notional} < {min_notional}")
+            return None
+
+        logging.info(f"OCO satış emri veriliyor: {quantity} {symbol}, Kar: {take_profit_price}, Zarar: {stop_loss_price} (limit {stop_limit_price})")
+        print(f"OCO satış emri veriliyor: {quantity} {symbol}, Kar: {take_profit_price}, Zarar: {stop_loss_price}")
+        order_list = client.create_oco_order(symbol=symbol, side='SELL', quantity=instrument.format_quantity(quantity),
+                                             aboveType='LIMIT_MAKER', abovePrice=instrument.format_price(take_profit_price),
+                                             belowType='STOP_LOSS_LIMIT', belowStopPrice=instrument.format_price(stop_loss_price),
+                                             belowPrice=instrument.format_price(stop_limit_price), belowTimeInForce='GTC')
+        return {report['orderId']: 'TP' if report['type'] == 'LIMIT_MAKER' else 'SL'
+                for report in order_list['orderReports']}
+    except BinanceAPIException as e:
+        logging.error(f"Binance API hatası: {e}")
+        print(f"Binance API hatası: {e}")
+        return None
+    except BinanceOrderException as e:
+        logging.error(f"Emir işlemi hatası: {e}")
+        print(f"Emir işlemi hatası: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Hata: {e}")
+        print(f"Hata: {e}")
+        return None
+
+def oco_leg_result(client, symbol, order_id, state=None):
+    summary = summarize_state(state) if state is not None else None
+    if summary is None:
+        order = client.get_order(symbol=symbol, orderId=order_id)
+        summary = summarize_order(order)
+        return order['status'], summary.qty, summary.vwap
+    return state.status, summary.qty, summary.vwap
+
+# OCO bacaklarından biri dolana kadar executionReport olaylarını bekle; olay gelmezse seyrek REST
+# kontrolü yap. ('TP' | 'SL', ortalama satış fiyatı) döner, hiçbir bacak dolmadan biterse (None, None).
+# poll_first: bacaklar bot kapalıyken sonuçlanmış olabilir, ilk kontrol olay beklemeden REST ile yapılır.
+def wait_for_oco_exit(client, symbol, legs, fill_tracker, poll_first=False):
+    results = {order_id: (None, None, None) for order_id in legs}
+    try:
+        while True:
+            # Sonuçlanmış bacak tekrar beklenmez; biri kısmen dolunca diğeri hemen EXPIRED olur
+            pending = [order_id for order_id in legs if results[order_id][0] not in FINAL_ORDER_STATUSES]
+            poll, poll_first = poll_first, False
+            try:
+                if not poll and fill_tracker.wait_any(pending, FILL_CHECK_INTERVAL):
+                    for order_id in pending:
+                        state = fill_tracker.snapshot(order_id)
+                        if state is not None and state.done.is_set():
+                            results[order_id] = oco_leg_result(client, symbol, order_id, state)
+                else:
+                    for order_id in pending:
+                        results[order_id] = oco_leg_result(client, symbol, order_id)
+            except BinanceAPIException as e:
+                logging.error(f"Binance API hatası: {e}")
+                print(f"Binance API hatası: {e}")
+                continue
+
+            for order_id, (status, executed, price) in results.items():
+                if status == 'FILLED':
+                    return legs[order_id], price
+            if all(status in FINAL_ORDER_STATUSES for status, _, _ in results.values()):
+                # Kısmen dolup süresi biten bacak varsa satış o bacaktan sayılır
+                for order_id, (status, executed, price) in results.items():
+                    if executed:
+                        return legs[order_id], price
+                return None, None
+    finally:
+        for order_id in legs:
+            fill_tracker.forget(order_id)
+
+# Çökmeden önce gönderilen alım emirlerinin (yeni fiyata taşınanlar dahil) sonucu istemci emir
+# numaralarıyla sorgulanır. Borsada olmayan numara hiç ulaşmamıştır; açık emir varsa kalan süre
+# kadar dolumu beklenir. Tüm emirlerde gerçekleşen kısmın ortalama fiyatı döner.
+def resume_buy_order(client, symbol, saved, fill_tracker):
+    orders = []
+    for client_order_id in saved.get('client_order_ids') or [saved['client_order_id']]:
+        try:
+            orders.append(client.get_order(symbol=symbol, origClientOrderId=client_order_id))
+        except BinanceAPIException as e:
+            if e.code != UNKNOWN_ORDER_CODE:
+                raise
+    if not orders:
+        logging.error("Kayıtlı alım emri borsaya ulaşmamış.")
+        print("Kayıtlı alım emri borsaya ulaşmamış.")
+        return None
+    for i, order_status in enumerate(orders):
+        if order_status['status'] in FINAL_ORDER_STATUSES:
+            continue
+        order_id = order_status['orderId']
+        remaining = max(LIMIT_FILL_TIMEOUT - (time.time() - saved['placed_at']), 0)
+        logging.info(f"Kayıtlı alım emri hâlâ açık, dolum bekleniyor: {order_id}")
+        print(f"Kayıtlı alım emri hâlâ açık, dolum bekleniyor: {order_id}")
+        wait_for_order_fill(client, symbol, order_id, fill_tracker, remaining)
+        orders[i] = client.get_order(symbol=symbol, orderId=order_id)
+    executed = sum((Decimal(o['executedQty']) for o in orders), Decimal('0'))
+    if executed > 0:
+        return sum((Decimal(o['cummulativeQuoteQty']) for o in orders), Decimal('0')) / executed
+    logging.error(f"Kayıtlı alım emri dolmadan sonuçlanmış: {orders[-1]['status']}")
+    print(f"Kayıtlı alım emri dolmadan sonuçlanmış: {orders[-1]['status']}")
+    return None
+
 def main():
     api_key, api_secret = get_api_credentials()
     client = connect_client(api_key, api_secret)
-
-    symbol = input("İşlem çifti (örn. SUIUSDT): ").upper()
-
+    # İstek süreleri ve aşama gecikmeleri dakikada bir trading_bot.prom'a ve loga yazılır
+    metrics_reporter = MetricsReporter().start()
+
+    # Fiyat ve emir olayları tek bir WebSocket yöneticisi üzerinden gelir
+    twm = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret)
+    twm.daemon = True
+    twm.start()
+    user_stream = UserDataStream(twm)
+    fill_tracker = FillTracker(user_stream)
+    balances = BalanceCache(client, user_stream)
+    # Her dolum ve komisyon trading_ledger.db'ye yazılır; rapor için: python ledger.py report
+    ledger = Ledger().attach(user_stream).start()
+    user_stream.start()
     try:
-        profit_percentage = Decimal(input("Kar hedefi yüzdesi (örn. 0.3): "))
-        loss_percentage = Decimal(input("Zarar durdurma yüzdesi (örn. 1): "))
-    except:
-        logging.error("Geçersiz kar veya zarar yüzdesi girişi.")
-        print("Geçersiz kar veya zarar yüzdesi girişi.")
+        balances.start()
+    except BinanceAPIException as e:
+        logging.error(f"Binance API hatası: {e}")
+        print(f"Binance API hatası: {e}")
         exit()
 
-    order_type = input("Emir türü (MARKET veya LIMIT): ").upper()
-
-    symbol_info = get_symbol_info(client, symbol)
-
-    min_qty, max_qty, step_size, min_price, tick_size, min_notional = extract_filters(symbol_info)
+    # Durum geçişleri trading_state.jsonl'e yazılır; yarım kalmış bir işlem dizisi varsa sorular atlanıp
+    # kaldığı yerden devam edilir. Sıfırdan başlamak için trading_state* dosyaları silinmelidir.
+    journal = StateJournal()
+    recover_started = time.perf_counter()
+    saved = journal.recover()
+    journal.start()
+    resume = saved if saved.get('phase') in RESUME_PHASES else None
+    if resume is not None:
+        symbol = resume['symbol']
+        profit_percentage = Decimal(resume['profit_percentage'])
+        loss_percentage = Decimal(resume['loss_percentage'])
+        order_type = resume['order_type']
+        exit_mode = resume['exit_mode']
+        stop_mode = resume['stop_mode']
+        profit_multiple = Decimal(resume['profit_multiple']) if resume['profit_multiple'] is not None else None
+        loss_multiple = Decimal(resume['loss_multiple']) if resume['loss_multiple'] is not None else None
+        recover_ms = (time.perf_counter() - recover_started) * 1000
+        logging.info(f"Kayıtlı durum {recover_ms:.1f} ms içinde yüklendi: {symbol}, aşama: {resume['phase']}")
+        print(f"Kayıtlı durum {recover_ms:.1f} ms içinde yüklendi: {symbol}, aşama: {resume['phase']}")
+    else:
+        symbol = input("İşlem çifti (örn. SUIUSDT): ").upper()
 
-    usdt_balance = get_usdt_balance(client)
+        try:
+            profit_percentage = Decimal(input("Kar hedefi yüzdesi (örn. 0.3): "))
+            loss_percentage = Decimal(input("Zarar durdurma yüzdesi (örn. 1): "))
+        except:
+            logging.error("Geçersiz kar veya zarar yüzdesi girişi.")
+            print("Geçersiz kar veya zarar yüzdesi girişi.")
+            exit()
 
+        order_type = input("Emir türü (MARKET veya LIMIT): ").upper()
+        # OCO: kar/zarar satışları borsada bekler; IZLEME: fiyat istemcide izlenir, satış piyasa emriyle yapılır
+        exit_mode = input("Çıkış yöntemi (IZLEME veya OCO): ").upper()
+        # IZLEME modunda seviyeler: SABIT yüzdeler, IZSUREN (kar hedefinden sonra iz süren stop) veya ATR katları
+        stop_mode = 'SABIT'
+        profit_multiple = loss_multiple = None
+        if exit_mode != "OCO":
+            stop_mode = input("Çıkış seviyeleri (SABIT, IZSUREN veya ATR): ").upper() or 'SABIT'
+            if stop_mode not in ('SABIT', 'IZSUREN', 'ATR'):
+                logging.error(f"Geçersiz çıkış seviyesi modu: {stop_mode}")
+                print(f"Geçersiz çıkış seviyesi modu: {stop_mode}")
+                exit()
+            if stop_mode == 'ATR':
+                try:
+                    profit_multiple = Decimal(input("Kar hedefi ATR katı (örn. 3): "))
+                    loss_multiple = Decimal(input("Zarar durdurma ATR katı (örn. 2): "))
+                except:
+                    logging.error("Geçersiz ATR katı girişi.")
+                    print("Geçersiz ATR katı girişi.")
+                    exit()
+
+    # Sembol filtreleri diskteki exchangeInfo önbelleğinden gelir, gerekirse tek seferde yenilenir
     try:
-        allocation_percentage = Decimal(input("Toplam bakiyenin ne kadarıyla işlem yapılsın (%): ")) / Decimal('100')
-    except:
-        logging.error("Geçersiz alım yüzdesi girişi.")
-        print("Geçersiz alım yüzdesi girişi.")
+        registry = SymbolRegistry(client).start()
+    except BinanceAPIException as e:
+        logging.error(f"Binance API hatası: {e}")
+        print(f"Binance API hatası: {e}")
         exit()
+    symbol_filters = get_symbol_filters(registry, symbol)
+    # Piyasa emirlerinden önce kayma tahmini için yerel emir defteri
+    order_book = OrderBook(client, symbol, twm).start()
 
-    allocation_amount = usdt_balance * allocation_percentage
+    min_qty, max_qty, step_size, min_price, tick_size, min_notional = unpack_filters(symbol_filters)
 
-    if allocation_amount < min_notional:
-        logging.error(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
-        print(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
-        exit()
+    base_asset = symbol_filters.base_asset
+    quote_asset = symbol_filters.quote_asset
+    usdt_balance = get_asset_balance(balances, quote_asset)
 
-    limit_price = None
-    if order_type == "LIMIT":
-        limit_price_input = input(f"Limit fiyatını girin ({symbol}): ")
+    max_loss_count = MAX_LOSS_COUNT
+    state = "waiting_for_sell"
+    # İzleme modunda günlükteki (iz süren/ATR ile taşınmış) seviyelere dönülür
+    restore_levels = False
+    if resume is None:
         try:
-            limit_price = Decimal(limit_price_input)
-            if limit_price < min_price:
-                logging.error(f"Limit fiyatı minimum fiyatın altında: {limit_price} < {min_price}")
-                print(f"Limit fiyatı minimum fiyatın altında: {limit_price} < {min_price}")
-                exit()
+            allocation_percentage = Decimal(input("Toplam bakiyenin ne kadarıyla işlem yapılsın (%): ")) / Decimal('100')
         except:
-            logging.error("Geçersiz limit fiyatı girişi.")
-            print("Geçersiz limit fiyatı girişi.")
+            logging.error("Geçersiz alım yüzdesi girişi.")
+            print("Geçersiz alım yüzdesi girişi.")
             exit()
 
-    entry_price = None
-    if order_type == "MARKET":
-        try:
-            current_market_price = Decimal(client.get_symbol_ticker(symbol=symbol)['price'])
-            quantity = allocation_amount / current_market_price
+        allocation_amount = usdt_balance * allocation_percentage
+
+        if allocation_amount < min_notional:
+            logging.error(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
+            print(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
+            exit()
+
+        limit_price = None
+        if order_type == "LIMIT":
+            limit_price_input = input(f"Limit fiyatını girin ({symbol}): ")
+            try:
+                limit_price = Decimal(limit_price_input)
+                if limit_price < min_price:
+                    logging.error(f"Limit fiyatı minimum fiyatın altında: {limit_price} < {min_price}")
+                    print(f"Limit fiyatı minimum fiyatın altında: {limit_price} < {min_price}")
+                    exit()
+            except:
+                logging.error("Geçersiz limit fiyatı girişi.")
+                print("Geçersiz limit fiyatı girişi.")
+                exit()
+
+        # Yeni işlem dizisi: ayarlar günlüğe yazılır, yeniden başlatmada sorular tekrar sorulmaz
+        journal.reset(phase='entering', symbol=symbol, profit_percentage=profit_percentage, loss_percentage=loss_percentage,
+                      order_type=order_type, exit_mode=exit_mode, stop_mode=stop_mode, profit_multiple=profit_multiple,
+                      loss_multiple=loss_multiple, allocation_percentage=allocation_percentage)
+        ledger.begin(symbol)
+
+        entry_price = None
+        balance_version = balances.version
+        if order_type == "MARKET":
+            order_book.wait_ready(5)
+            try:
+                current_market_price = Decimal(client.get_symbol_ticker(symbol=symbol)['price'])
+                quantity = allocation_amount / current_market_price
+                quantity = round_quantity(quantity, step_size)
+
+                if quantity < min_qty:
+                    logging.error(f"Bakiyeniz, minimum işlem miktarının altında. Hesaplanan miktar: {quantity}, Min. miktar: {min_qty}")
+                    print(f"Bakiyeniz, minimum işlem miktarının altında. Hesaplanan miktar: {quantity}, Min. miktar: {min_qty}")
+                    exit()
+
+                notional = current_market_price * quantity
+                if notional < min_notional:
+                    logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
+                    print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
+                    exit()
+
+                entry_type, entry_limit_price = choose_order_type(order_book, 'BUY', quantity)
+                entry_price = place_order(client, entry_type, symbol, quantity, step_size, tick_size, entry_limit_price, min_notional=min_notional,
+                                          fill_tracker=fill_tracker, fill_timeout=LIMIT_FILL_TIMEOUT,
+                                          on_submit=journal_buy_order(journal, entry_limit_price))
+            except BinanceAPIException as e:
+                logging.error(f"Binance API hatası: {e}")
+                print(f"Binance API hatası: {e}")
+                exit()
+            except Exception as e:
+                logging.error(f"Hata: {e}")
+                print(f"Hata: {e}")
+                exit()
+        else:
+            quantity = allocation_amount / limit_price
             quantity = round_quantity(quantity, step_size)
 
             if quantity < min_qty:
@@ -346,187 +749,342 @@ def main():
                 print(f"Bakiyeniz, minimum işlem miktarının altında. Hesaplanan miktar: {quantity}, Min. miktar: {min_qty}")
                 exit()
 
-            notional = current_market_price * quantity
+            notional = limit_price * quantity
             if notional < min_notional:
-                logging.error(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
-                print(f"Alım notional değeri minimumun altında: {notional} < {min_notional}")
+                logging.error(f"Limit alım notional değeri minimumun altında: {notional} < {min_notional}")
+                print(f"Limit alım notional değeri minimumun altında: {notional} < {min_notional}")
                 exit()
 
-            entry_price = place_order(client, order_type, symbol, quantity, step_size, tick_size, min_notional=min_notional)
-        except BinanceAPIException as e:
-            logging.error(f"Binance API hatası: {e}")
-            print(f"Binance API hatası: {e}")
-            exit()
-        except Exception as e:
-            logging.error(f"Hata: {e}")
-            print(f"Hata: {e}")
-            exit()
-    else:
-        quantity = allocation_amount / limit_price
-        quantity = round_quantity(quantity, step_size)
+            entry_price = place_order(client, order_type, symbol, quantity, step_size, tick_size, limit_price, min_notional=min_notional,
+                                      fill_tracker=fill_tracker, fill_timeout=LIMIT_FILL_TIMEOUT,
+                                      on_submit=journal_buy_order(journal, limit_price))
 
-        if quantity < min_qty:
-            logging.error(f"Bakiyeniz, minimum işlem miktarının altında. Hesaplanan miktar: {quantity}, Min. miktar: {min_qty}")
-            print(f"Bakiyeniz, minimum işlem miktarının altında. Hesaplanan miktar: {quantity}, Min. miktar: {min_qty}")
+        if entry_price is None:
+            print("Başlangıç alım işlemi başarısız oldu, program durduruluyor.")
+            logging.info("Başlangıç alım işlemi başarısız oldu, program durduruluyor.")
+            journal.record('stopped', sync=True, phase='stopped')
             exit()
 
-        notional = limit_price * quantity
-        if notional < min_notional:
-            logging.error(f"Limit alım notional değeri minimumun altında: {notional} < {min_notional}")
-            print(f"Limit alım notional değeri minimumun altında: {notional} < {min_notional}")
-            exit()
+        take_profit_price, stop_loss_price = exit_levels(entry_price, profit_percentage, loss_percentage, tick_size)
 
-        entry_price = place_order(client, order_type, symbol, quantity, step_size, tick_size, limit_price, min_notional=min_notional)
+        print(f"Alış fiyatı: {entry_price}, Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
+        logging.info(f"Alış fiyatı: {entry_price}, Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
 
-    if entry_price is None:
-        print("Başlangıç alım işlemi başarısız oldu, program durduruluyor.")
-        logging.info("Başlangıç alım işlemi başarısız oldu, program durduruluyor.")
-        exit()
-
-    take_profit_price = entry_price * (Decimal('1') + profit_percentage / Decimal('100'))
-    stop_loss_price = entry_price * (Decimal('1') - loss_percentage / Decimal('100'))
-
-    take_profit_price = round_price(take_profit_price, tick_size)
-    stop_loss_price = round_price(stop_loss_price, tick_size)
-
-    print(f"Alış fiyatı: {entry_price}, Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
-    logging.info(f"Alış fiyatı: {entry_price}, Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
-
-    max_loss_count = 5
-    current_loss_count = 0
-    state = "waiting_for_sell"
+        current_loss_count = 0
+        legs = None
+        open_order_ids = set()
+    else:
+        allocation_percentage = Decimal(resume['allocation_percentage'])
+        current_loss_count = resume.get('current_loss_count') or 0
+        legs = None
+        # Bakiye BalanceCache açılışında yüklendi; borsayla tek uzlaştırma çağrısı açık emirler içindir
+        balance_version = None
+        try:
+            open_order_ids = {order['orderId'] for order in client.get_open_orders(symbol=symbol)}
+        except BinanceAPIException as e:
+            logging.error(f"Binance API hatası: {e}")
+            print(f"Binance API hatası: {e}")
+            exit()
 
-    while current_loss_count < max_loss_count:
+        phase = resume['phase']
+        if phase == 'holding':
+            entry_price = Decimal(resume['entry_price'])
+            take_profit_price = Decimal(resume['take_profit_price'])
+            stop_loss_price = Decimal(resume['stop_loss_price'])
+            restore_levels = True
+            if resume.get('legs'):
+                legs = {int(order_id): kind for order_id, kind in resume['legs'].items()}
+            elif balances.total(base_asset) < min_qty:
+                logging.error(f"Kayıtlı pozisyon bakiyede bulunamadı: {balances.total(base_asset)} {base_asset}")
+                print(f"Kayıtlı pozisyon bakiyede bulunamadı: {balances.total(base_asset)} {base_asset}")
+                journal.record('stopped', sync=True, phase='stopped')
+                exit()
+        else:
+            hit_stop = resume.get('hit_stop')
+            if phase == 'sold':
+                # Satış kaydedilmiş, yeniden alım emri verilmeden kapanmış
+                buy_price = reentry_price(Decimal(resume['sell_price']), SL_REENTRY_FACTOR if hit_stop else TP_REENTRY_FACTOR, tick_size)
+                allocation_amount = get_asset_balance(balances, quote_asset) * allocation_percentage
+                entry_price = None
+                if buy_price >= min_price:
+                    entry_price = place_buy_order(client, symbol, allocation_amount / buy_price, step_size, tick_size, min_notional=min_notional, buy_price=buy_price,
+                                                  fill_tracker=fill_tracker, fill_timeout=LIMIT_FILL_TIMEOUT,
+                                                  on_submit=journal_buy_order(journal, buy_price, hit_stop))
+            else:
+                try:
+                    entry_price = resume_buy_order(client, symbol, resume, fill_tracker)
+                except BinanceAPIException as e:
+                    logging.error(f"Binance API hatası: {e}")
+                    print(f"Binance API hatası: {e}")
+                    exit()
+            if not entry_price:
+                print("Kayıtlı alım gerçekleşmedi, program durduruluyor.")
+                logging.error("Kayıtlı alım gerçekleşmedi, program durduruluyor.")
+                journal.record('stopped', sync=True, phase='stopped')
+                exit()
+            if hit_stop:
+                current_loss_count += 1
+                print(f"Üst üste zarar sayısı: {current_loss_count}")
+                logging.warning(f"Üst üste zarar sayısı: {current_loss_count}")
+            else:
+                current_loss_count = 0
+            take_profit_price, stop_loss_price = exit_levels(entry_price, profit_percentage, loss_percentage, tick_size)
+
+        print(f"Alış fiyatı: {entry_price}, Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
+        logging.info(f"Alış fiyatı: {entry_price}, Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
+
+    journal_position(journal, entry_price, take_profit_price, stop_loss_price, current_loss_count, legs)
+
+    # OCO modunda döngü yalnızca bacakların executionReport sonuçlarına göre yeniden alım yapar
+    while exit_mode == "OCO" and current_loss_count < max_loss_count:
+        poll_first = False
+        if legs is None:
+            # Alınan miktarın bakiyeye yansımasını bekle
+            if balance_version is not None:
+                balances.wait_for_update(balance_version)
+            legs = place_oco_bracket(client, symbol, get_asset_balance(balances, base_asset), take_profit_price, stop_loss_price,
+                                     step_size, tick_size, min_qty=min_qty, min_notional=min_notional)
+            if legs is None:
+                print("OCO emri verilemedi, fiyat izleme moduna geçiliyor.")
+                logging.warning("OCO emri verilemedi, fiyat izleme moduna geçiliyor.")
+                exit_mode = "IZLEME"
+                journal.record('mode', exit_mode=exit_mode)
+                break
+            journal.record('oco', sync=True, legs=legs)
+        else:
+            # Günlükten gelen bacaklar borsada açık değilse bot kapalıyken sonuçlanmıştır
+            poll_first = not open_order_ids.intersection(legs)
+
+        balance_version = balances.version
+        exit_kind, sell_price = wait_for_oco_exit(client, symbol, legs, fill_tracker, poll_first)
+        legs = None
+        if exit_kind is None:
+            print("OCO emri dolmadan sonlandı, program durduruluyor.")
+            logging.error("OCO emri dolmadan sonlandı, program durduruluyor.")
+            break
+        hit_stop = exit_kind == 'SL'
+        print(f"{'Zarar' if hit_stop else 'Kar'} ile satış yapıldı: {sell_price}")
+        logging.info(f"{'Zarar' if hit_stop else 'Kar'} ile satış yapıldı: {sell_price}")
+        journal.record('sold', sync=True, phase='sold', sell_price=sell_price, hit_stop=hit_stop, legs=None)
+
+        buy_price = reentry_price(sell_price, SL_REENTRY_FACTOR if hit_stop else TP_REENTRY_FACTOR, tick_size)
+        if buy_price < min_price:
+            logging.error(f"Yeniden alım fiyatı minimum fiyatın altında: {buy_price} < {min_price}")
+            print(f"Yeniden alım fiyatı minimum fiyatın altında: {buy_price} < {min_price}")
+            break
+
+        balances.wait_for_update(balance_version)
+        allocation_amount = get_asset_balance(balances, quote_asset) * allocation_percentage
+        balance_version = balances.version
+        with METRICS.timer('stage_seconds', stage='reentry_fill'):
+            buy_entry_price = place_buy_order(client, symbol, allocation_amount / buy_price, step_size, tick_size, min_notional=min_notional, buy_price=buy_price,
+                                              fill_tracker=fill_tracker, fill_timeout=LIMIT_FILL_TIMEOUT,
+                                              on_submit=journal_buy_order(journal, buy_price, hit_stop))
+        if not buy_entry_price:
+            print("Yeniden alım gerçekleşmedi, program durduruluyor.")
+            logging.error("Yeniden alım gerçekleşmedi, program durduruluyor.")
+            break
+
+        entry_price = buy_entry_price
+        take_profit_price, stop_loss_price = exit_levels(buy_entry_price, profit_percentage, loss_percentage, tick_size)
+        print(f"Yeni alış fiyatı: {buy_entry_price}, Yeni Kar hedefi: {take_profit_price}, Yeni Zarar durdurma: {stop_loss_price}")
+        logging.info(f"Yeni alış fiyatı: {buy_entry_price}, Yeni Kar hedefi: {take_profit_price}, Yeni Zarar durdurma: {stop_loss_price}")
+        if hit_stop:
+            current_loss_count += 1
+            print(f"Üst üste zarar sayısı: {current_loss_count}")
+            logging.warning(f"Üst üste zarar sayısı: {current_loss_count}")
+        else:
+            current_loss_count = 0
+        restore_levels = False
+        journal_position(journal, entry_price, take_profit_price, stop_loss_price, current_loss_count)
+
+    # Fiyatlar WebSocket üzerinden gelir; akış kesilirse REST yoklamaya geri dönülür
+    price_stream = None
+    indicators = None
+    if exit_mode != "OCO":
+        price_stream = PriceStream(client, symbol, twm).start()
+        if stop_mode == 'ATR':
+            # Göstergeler tik başına O(1) güncellenir; ATR son kapanmış mumlarla önceden ısıtılır
+            indicators = IndicatorEngine(atr_period=ATR_PERIOD, candle_interval=CANDLE_INTERVAL)
+            try:
+                klines = client.get_klines(symbol=symbol, interval=CANDLE_INTERVAL_NAME, limit=ATR_PERIOD + 2)
+                indicators.seed_klines(klines[:-1])
+            except BinanceAPIException as e:
+                logging.warning(f"Mum geçmişi alınamadı, ATR canlı mumlarla hesaplanacak: {e}")
+                print(f"Mum geçmişi alınamadı, ATR canlı mumlarla hesaplanacak: {e}")
+        exits = make_exit(stop_mode, entry_price, profit_percentage, loss_percentage, tick_size, indicators,
+                          profit_multiple, loss_multiple)
+        if restore_levels:
+            exits.restore(take_profit_price, stop_loss_price)
+        take_profit_price, stop_loss_price = exits.take_profit_price, exits.stop_loss_price
+        if stop_mode != 'SABIT':
+            print(f"Çıkış modu {stop_mode}: Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
+            logging.info(f"Çıkış modu {stop_mode}: Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
+    last_tick_time = None
+
+    while exit_mode != "OCO" and current_loss_count < max_loss_count:
         try:
-            time.sleep(2)
-            current_price = Decimal(client.get_symbol_ticker(symbol=symbol)['price'])
-            print(f"Güncel fiyat: {current_price}")
-            logging.info(f"Güncel fiyat: {current_price}")
+            current_price = price_stream.next_price()
+            log_tick(symbol, current_price)
+            # Zaman aşımında aynı fiyat tekrar döner; göstergelere yalnızca yeni tikler yazılır
+            tick_time = price_stream.last_price_time()
+            if indicators is not None and tick_time != last_tick_time:
+                last_tick_time = tick_time
+                indicators.update(current_price)
+            if exits.update(current_price):
+                take_profit_price, stop_loss_price = exits.take_profit_price, exits.stop_loss_price
+                journal.record('levels', take_profit_price=take_profit_price, stop_loss_price=stop_loss_price)
 
             if state == "waiting_for_sell":
                 if current_price >= take_profit_price:
-                    print(f"Kar hedefi aşıldı, {take_profit_price} fiyatından satış yapılıyor...")
-                    logging.info(f"Kar hedefi aşıldı, {take_profit_price} fiyatından satış yapılıyor...")
+                    log_status(logging.INFO, "Kar hedefi aşıldı, %s fiyatından satış yapılıyor...", take_profit_price)
+                    METRICS.observe('stage_seconds', time.monotonic() - price_stream.last_price_time(), stage='tick_to_decision')
 
-                    current_symbol_balance = get_usdt_balance(client)
+                    current_symbol_balance = get_asset_balance(balances, base_asset)
                     if current_symbol_balance < min_qty:
-                        logging.error(f"Satış için yeterli {symbol} bakiyesi yok: {current_symbol_balance}")
-                        print(f"Satış için yeterli {symbol} bakiyesi yok: {current_symbol_balance}")
+                        log_status(logging.ERROR, "Satış için yeterli %s bakiyesi yok: %s", symbol, current_symbol_balance)
                         continue
 
-                    sell_order_response = sell_order(client, symbol, current_symbol_balance, step_size, tick_size, min_notional=min_notional)
+                    balance_version = balances.version
+                    estimate_market_fill(order_book, 'SELL', current_symbol_balance)
+                    with METRICS.timer('stage_seconds', stage='decision_to_ack'):
+                        sell_order_response = sell_order(client, symbol, current_symbol_balance, step_size, tick_size, min_notional=min_notional)
                     if sell_order_response is None:
-                        print("Satış işlemi başarısız oldu, tekrar deniyor...")
-                        logging.info("Satış işlemi başarısız oldu, tekrar deniyor...")
+                        log_status(logging.INFO, "Satış işlemi başarısız oldu, tekrar deniyor...")
                         continue
 
-                    if 'fills' in sell_order_response and len(sell_order_response['fills']) > 0:
-                        sell_price = Decimal(sell_order_response['fills'][0]['price'])
-                    else:
-                        sell_price = Decimal(client.get_symbol_ticker(symbol=symbol)['price'])
-                    print(f"Kar ile satış yapıldı: {sell_price}")
-                    logging.info(f"Kar ile satış yapıldı: {sell_price}")
+                    sell_price = summarize_order(sell_order_response).vwap
+                    if sell_price is None:
+                        sell_price = price_stream.last_price()
+                    log_status(logging.INFO, "Kar ile satış yapıldı: %s", sell_price)
+                    journal.record('sold', sync=True, phase='sold', sell_price=sell_price, hit_stop=False)
 
-                    buy_price = sell_price * Decimal('0.997')
-                    buy_price = round_price(buy_price, tick_size)
+                    buy_price = reentry_price(sell_price, TP_REENTRY_FACTOR, tick_size)
 
                     if buy_price < min_price:
-                        logging.error(f"Yeniden alım fiyatı minimum fiyatın altında: {buy_price} < {min_price}")
-                        print(f"Yeniden alım fiyatı minimum fiyatın altında: {buy_price} < {min_price}")
-                        continue
+                        log_status(logging.ERROR, "Yeniden alım fiyatı minimum fiyatın altında: %s < %s", buy_price, min_price)
+                        break
 
-                    allocation_amount = get_usdt_balance(client) * allocation_percentage
+                    # Satış gelirinin bakiyeye yansımasını bekle
+                    balances.wait_for_update(balance_version)
+                    allocation_amount = get_asset_balance(balances, quote_asset) * allocation_percentage
                     if allocation_amount < min_notional:
-                        logging.error(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
-                        print(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
-                        continue
+                        log_status(logging.ERROR, "Alım için ayrılan miktar notional minimumun altında: %s < %s", allocation_amount, min_notional)
+                        break
 
-                    buy_entry_price = place_buy_order(client, symbol, allocation_amount / buy_price, step_size, tick_size, min_notional=min_notional, buy_price=buy_price)
+                    with METRICS.timer('stage_seconds', stage='reentry_fill'):
+                        buy_entry_price = place_buy_order(client, symbol, allocation_amount / buy_price, step_size, tick_size, min_notional=min_notional, buy_price=buy_price,
+                                                          fill_tracker=fill_tracker, fill_timeout=LIMIT_FILL_TIMEOUT,
+                                                          on_submit=journal_buy_order(journal, buy_price, False))
                     if buy_entry_price:
-                        take_profit_price = buy_entry_price * (Decimal('1') + profit_percentage / Decimal('100'))
-                        stop_loss_price = buy_entry_price * (Decimal('1') - loss_percentage / Decimal('100'))
+                        exits = make_exit(stop_mode, buy_entry_price, profit_percentage, loss_percentage, tick_size, indicators,
+                                          profit_multiple, loss_multiple)
+                        take_profit_price, stop_loss_price = exits.take_profit_price, exits.stop_loss_price
 
-                        take_profit_price = round_price(take_profit_price, tick_size)
-                        stop_loss_price = round_price(stop_loss_price, tick_size)
-
-                        print(f"Yeni alış fiyatı: {buy_entry_price}, Yeni Kar hedefi: {take_profit_price}, Yeni Zarar durdurma: {stop_loss_price}")
-                        logging.info(f"Yeni alış fiyatı: {buy_entry_price}, Yeni Kar hedefi: {take_profit_price}, Yeni Zarar durdurma: {stop_loss_price}")
+                        log_status(logging.INFO, "Yeni alış fiyatı: %s, Yeni Kar hedefi: %s, Yeni Zarar durdurma: %s", buy_entry_price, take_profit_price, stop_loss_price)
 
                         state = "waiting_for_sell"
                         current_loss_count = 0
+                        journal_position(journal, buy_entry_price, take_profit_price, stop_loss_price, current_loss_count)
                         continue
+                    else:
+                        # Pozisyon satıldı ve yeniden alınamadı; izlemeye devam etmek boşa döner
+                        log_status(logging.ERROR, "Yeniden alım gerçekleşmedi, program durduruluyor.")
+                        break
 
                 if current_price <= stop_loss_price:
-                    print(f"Zarar durdurma fiyatı aşıldı, {stop_loss_price} fiyatından satış yapılıyor...")
-                    logging.info(f"Zarar durdurma fiyatı aşıldı, {stop_loss_price} fiyatından satış yapılıyor...")
+                    # İz süren/ATR stop girişin üstüne çıktıysa bu çıkış kar sayılır
+                    locked_profit = exits.locks_profit()
+                    if locked_profit:
+                        log_status(logging.INFO, "İz süren stop tetiklendi, %s fiyatından satış yapılıyor...", stop_loss_price)
+                    else:
+                        log_status(logging.INFO, "Zarar durdurma fiyatı aşıldı, %s fiyatından satış yapılıyor...", stop_loss_price)
+                    METRICS.observe('stage_seconds', time.monotonic() - price_stream.last_price_time(), stage='tick_to_decision')
 
-                    current_symbol_balance = get_usdt_balance(client)
+                    current_symbol_balance = get_asset_balance(balances, base_asset)
                     if current_symbol_balance < min_qty:
-                        logging.error(f"Satış için yeterli {symbol} bakiyesi yok: {current_symbol_balance}")
-                        print(f"Satış için yeterli {symbol} bakiyesi yok: {current_symbol_balance}")
+                        log_status(logging.ERROR, "Satış için yeterli %s bakiyesi yok: %s", symbol, current_symbol_balance)
                         continue
 
-                    sell_order_response = sell_order(client, symbol, current_symbol_balance, step_size, tick_size, min_notional=min_notional)
+                    balance_version = balances.version
+                    estimate_market_fill(order_book, 'SELL', current_symbol_balance)
+                    with METRICS.timer('stage_seconds', stage='decision_to_ack'):
+                        sell_order_response = sell_order(client, symbol, current_symbol_balance, step_size, tick_size, min_notional=min_notional)
                     if sell_order_response is None:
-                        print("Satış işlemi başarısız oldu, tekrar deniyor...")
-                        logging.info("Satış işlemi başarısız oldu, tekrar deniyor...")
+                        log_status(logging.INFO, "Satış işlemi başarısız oldu, tekrar deniyor...")
                         continue
 
-                    if 'fills' in sell_order_response and len(sell_order_response['fills']) > 0:
-                        sell_price = Decimal(sell_order_response['fills'][0]['price'])
-                    else:
-                        sell_price = Decimal(client.get_symbol_ticker(symbol=symbol)['price'])
-                    print(f"Zarar ile satış yapıldı: {sell_price}")
-                    logging.info(f"Zarar ile satış yapıldı: {sell_price}")
+                    sell_price = summarize_order(sell_order_response).vwap
+                    if sell_price is None:
+                        sell_price = price_stream.last_price()
+                    log_status(logging.INFO, "%s ile satış yapıldı: %s", 'Kar' if locked_profit else 'Zarar', sell_price)
+                    journal.record('sold', sync=True, phase='sold', sell_price=sell_price, hit_stop=not locked_profit)
 
-                    buy_price = sell_price * Decimal('0.98')
-                    buy_price = round_price(buy_price, tick_size)
+                    buy_price = reentry_price(sell_price, TP_REENTRY_FACTOR if locked_profit else SL_REENTRY_FACTOR, tick_size)
 
                     if buy_price < min_price:
-                        logging.error(f"Yeniden alım fiyatı minimum fiyatın altında: {buy_price} < {min_price}")
-                        print(f"Yeniden alım fiyatı minimum fiyatın altında: {buy_price} < {min_price}")
-                        continue
+                        log_status(logging.ERROR, "Yeniden alım fiyatı minimum fiyatın altında: %s < %s", buy_price, min_price)
+                        break
 
-                    allocation_amount = get_usdt_balance(client) * allocation_percentage
+                    # Satış gelirinin bakiyeye yansımasını bekle
+                    balances.wait_for_update(balance_version)
+                    allocation_amount = get_asset_balance(balances, quote_asset) * allocation_percentage
                     if allocation_amount < min_notional:
-                        logging.error(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
-                        print(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
-                        continue
+                        log_status(logging.ERROR, "Alım için ayrılan miktar notional minimumun altında: %s < %s", allocation_amount, min_notional)
+                        break
 
-                    buy_entry_price = place_buy_order(client, symbol, allocation_amount / buy_price, step_size, tick_size, min_notional=min_notional, buy_price=buy_price)
+                    with METRICS.timer('stage_seconds', stage='reentry_fill'):
+                        buy_entry_price = place_buy_order(client, symbol, allocation_amount / buy_price, step_size, tick_size, min_notional=min_notional, buy_price=buy_price,
+                                                          fill_tracker=fill_tracker, fill_timeout=LIMIT_FILL_TIMEOUT,
+                                                          on_submit=journal_buy_order(journal, buy_price, not locked_profit))
                     if buy_entry_price:
-                        take_profit_price = buy_entry_price * (Decimal('1') + profit_percentage / Decimal('100'))
-                        stop_loss_price = buy_entry_price * (Decimal('1') - loss_percentage / Decimal('100'))
-
-                        take_profit_price = round_price(take_profit_price, tick_size)
-                        stop_loss_price = round_price(stop_loss_price, tick_size)
-
-                        print(f"Yeni alış fiyatı: {buy_entry_price}, Yeni Kar hedefi: {take_profit_price}, Yeni Zarar durdurma: {stop_loss_price}")
-                        logging.info(f"Yeni alış fiyatı: {buy_entry_price}, Yeni Kar hedefi: {take_profit_price}, Yeni Zarar durdurma: {stop_loss_price}")
-
-                        current_loss_count += 1
-                        print(f"Üst üste zarar sayısı: {current_loss_count}")
-                        logging.warning(f"Üst üste zarar sayısı: {current_loss_count}")
+                        exits = make_exit(stop_mode, buy_entry_price, profit_percentage, loss_percentage, tick_size, indicators,
+                                          profit_multiple, loss_multiple)
+                        take_profit_price, stop_loss_price = exits.take_profit_price, exits.stop_loss_price
+
+                        log_status(logging.INFO, "Yeni alış fiyatı: %s, Yeni Kar hedefi: %s, Yeni Zarar durdurma: %s", buy_entry_price, take_profit_price, stop_loss_price)
+
+                        if locked_profit:
+                            current_loss_count = 0
+                        else:
+                            current_loss_count += 1
+                            log_status(logging.WARNING, "Üst üste zarar sayısı: %s", current_loss_count)
+                        journal_position(journal, buy_entry_price, take_profit_price, stop_loss_price, current_loss_count)
                         continue
+                    else:
+                        # Pozisyon satıldı ve yeniden alınamadı; izlemeye devam etmek boşa döner
+                        log_status(logging.ERROR, "Yeniden alım gerçekleşmedi, program durduruluyor.")
+                        break
 
             elif state == "waiting_for_sell":
                 pass  # Diğer işlemler zaten yapılıyor
 
         except BinanceAPIException as e:
-            logging.error(f"Binance API hatası: {e}")
-            print(f"Binance API hatası: {e}")
+            log_status(logging.ERROR, "Binance API hatası: %s", e)
             continue
         except BinanceOrderException as e:
-            logging.error(f"Emir işlemi hatası: {e}")
-            print(f"Emir işlemi hatası: {e}")
+            log_status(logging.ERROR, "Emir işlemi hatası: %s", e)
             continue
         except Exception as e:
-            logging.error(f"Hata: {e}")
-            print(f"Hata: {e}")
+            log_status(logging.ERROR, "Hata: %s", e)
             continue
 
-    print("5 zarar sonrası işlemler durduruldu.")
-    logging.info("5 zarar sonrası işlemler durduruldu.")
+    # Dizi bitti; bir sonraki başlatma sorularla sıfırdan başlar
+    journal.record('stopped', sync=True, phase='stopped')
+    journal.stop()
+    if price_stream is not None:
+        price_stream.stop()
+    order_book.stop()
+    balances.stop()
+    registry.stop()
+    user_stream.stop()
+    twm.stop()
+    metrics_reporter.stop()
+    ledger.stop()
+
+    if current_loss_count >= max_loss_count:
+        print("5 zarar sonrası işlemler durduruldu.")
+        logging.info("5 zarar sonrası işlemler durduruldu.")
 
 if __name__ == "__main__":
     main()
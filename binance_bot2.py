@@ -1,19 +1,24 @@
 import time
 from binance.client import Client
+from binance import ThreadedWebsocketManager
 from binance.exceptions import BinanceAPIException, BinanceOrderException
+from price_stream import PriceStream
+from clock_sync import ClockSync, tune_session, warm_up
+from fills import summarize_order, fetch_order_fills
+from endpoints import FailoverClient, EndpointPool
 
 # Binance API ile bağlantı kurmak için API anahtarı ve gizli anahtarı kullanıcıdan al
 api_key = input("API Anahtarınızı Girin: ")
 api_secret = input("API Gizli Anahtarınızı Girin: ")
 
-# Binance API Client bağlantısı kur ve otomatik zaman senkronizasyonu etkinleştir
-client = Client(api_key, api_secret)
-client.API_URL = 'https://api.binance.com'
-client.ping()  # Bağlantı testi
+# Binance API Client bağlantısı kur; istekler api, api1-api4 uç noktaları arasında sağlık durumuna göre dağıtılır
+client = FailoverClient(Client(api_key, api_secret, ping=False), EndpointPool())
+tune_session(client)  # Kalıcı bağlantı havuzu
+warm_up(client)  # Bağlantı testi, havuzdaki bağlantılar önceden açılır
 
-# Sunucu zamanını senkronize et
-client.futures_time()  # Spot işlem zaman senkronizasyonu yapılır
-client.get_server_time()  # API talepleri için sunucu zamanı alınır
+# Sunucu saat farkını ölç ve imzalı isteklerin zaman damgasına uygula; arka planda güncellenir
+clock = ClockSync(client).start()
+print(f"Sunucu saat farkı: {clock.offset_ms:.1f} ms")
 
 # Kullanıcıdan işlem çiftini ve alım miktarını al
 symbol = input("İşlem çifti (örn. BTCUSDT): ").upper()  # Örneğin BTCUSDT
@@ -37,8 +42,8 @@ entry_price = None
 try:
     if order_type == "MARKET":
         print("Piyasa emriyle alım yapılıyor...")
-        order = client.order_market_buy(symbol=symbol, quantity=quantity)
-        entry_price = float(order['fills'][0]['price'])  # Gerçekleşen fiyat
+        order = client.order_market_buy(symbol=symbol, quantity=quantity, newOrderRespType='FULL')
+        entry_price = float(summarize_order(order).vwap)  # Tüm dolumların ortalama fiyatı
         print(f"Alım işlemi başarılı: {entry_price} fiyatından alındı.")
     
     elif order_type == "LIMIT":
@@ -50,8 +55,8 @@ try:
             order_status = client.get_order(symbol=symbol, orderId=order['orderId'])
             if order_status['status'] == 'FILLED':
                 print("Limit emri gerçekleşti.")
-                fills = client.get_my_trades(symbol=symbol)
-                entry_price = float(fills[-1]['price'])  # En son gerçekleşen fiyatı al
+                # Yalnızca bu emrin işlemleri alınır, ortalama fiyat hesaplanır
+                entry_price = float(fetch_order_fills(client, symbol, order['orderId']).vwap)
                 print(f"Limit emri başarılı: {entry_price} fiyatından alındı.")
                 break
             else:
@@ -70,11 +75,16 @@ if entry_price:  # entry_price tanımlanmışsa devam et
     target_profit_price = entry_price * (1 + profit_percentage)
     stop_loss_price = entry_price * (1 - loss_percentage)
 
+    # Fiyatları WebSocket üzerinden dinle, akış kesilirse REST yoklamaya dön
+    twm = ThreadedWebsocketManager(api_key=api_key, api_secret=api_secret)
+    twm.start()
+    price_stream = PriceStream(client, symbol, twm, poll_interval=5).start()
+
     # Döngüyle fiyatları izleme ve satış kararı verme
     while current_loss_count < max_loss_count:
         try:
-            # Mevcut fiyatı al
-            current_price = float(client.get_symbol_ticker(symbol=symbol)['price'])
+            # Yeni fiyatı bekle
+            current_price = float(price_stream.next_price())
             print(f"Mevcut fiyat: {current_price}")
 
             # Kar hedefi yakalandı mı?
@@ -94,18 +104,17 @@ if entry_price:  # entry_price tanımlanmışsa devam et
                 else:
                     print(f"Zararlı işlem. Toplam zarar sayısı: {current_loss_count}")
                     # Tekrar alım yap
-                    order = client.order_market_buy(symbol=symbol, quantity=quantity)
-                    entry_price = float(order['fills'][0]['price'])
+                    order = client.order_market_buy(symbol=symbol, quantity=quantity, newOrderRespType='FULL')
+                    entry_price = float(summarize_order(order).vwap)
                     target_profit_price = entry_price * (1 + profit_percentage)
                     stop_loss_price = entry_price * (1 - loss_percentage)
-
-            # Fiyatları kontrol etmek için belirli bir süre bekle
-            time.sleep(5)  # Her 5 saniyede bir fiyat kontrol edilir
         except BinanceAPIException as e:
             print(f"API hatası: {e}")
         except Exception as e:
             print(f"Hata: {e}")
 
+    price_stream.stop()
+    twm.stop()
     print("Bot işlemi sona erdi.")
 else:
     print("Alım emri gerçekleşmedi, işlem yapılamıyor.")
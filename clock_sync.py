@@ -0,0 +1,127 @@
+import time
+import socket
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from binance.exceptions import BinanceAPIException
+
+# İmzalı istekte zaman damgası sunucu saatinden ileri/geri kaydığında dönen hata
+TIMESTAMP_ERROR_CODE = -1021
+
+# İstemci saatinin Binance sunucu saatine göre farkını NTP'ye benzer şekilde ölçer:
+# offset = sunucu zamanı - (gönderim + alım) / 2. Her turda birkaç ölçüm alınır ve gidiş-dönüş
+# süresi en kısa olan (en az belirsiz) kullanılır; sonuç üstel ortalama ile yumuşatılır.
+# Büyük sıçramalarda (saat ayarlandıysa) ortalama beklenmeden yeni değere geçilir.
+# Sonuç client.timestamp_offset'e yazılır, python-binance tüm imzalı isteklerde bunu kullanır.
+class ClockSync:
+    def __init__(self, client, interval=30, samples=3, alpha=0.3, step_threshold_ms=500):
+        self.client = client
+        self.interval = interval
+        self.samples = samples
+        self.alpha = alpha
+        self.step_threshold_ms = step_threshold_ms
+        self.offset_ms = None
+        self.rtt_ms = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.sync(samples=max(self.samples, 5))
+        self._thread = threading.Thread(target=self._run, name='clock-sync', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _apply(self, best):
+        offset_ms, rtt_ms = best
+        with self._lock:
+            if self.offset_ms is None or abs(offset_ms - self.offset_ms) > self.step_threshold_ms:
+                self.offset_ms = offset_ms
+            else:
+                self.offset_ms += self.alpha * (offset_ms - self.offset_ms)
+            self.rtt_ms = rtt_ms
+            self.client.timestamp_offset = int(round(self.offset_ms))
+        return self.offset_ms
+
+    @staticmethod
+    def _sample(t0, server_ms, t1):
+        return server_ms - (t0 + t1) * 500.0, (t1 - t0) * 1000.0
+
+    def sync(self, samples=None):
+        measurements = []
+        for _ in range(samples or self.samples):
+            t0 = time.time()
+            server_ms = self.client.get_server_time()['serverTime']
+            t1 = time.time()
+            measurements.append(self._sample(t0, server_ms, t1))
+        return self._apply(min(measurements, key=lambda m: m[1]))
+
+    async def sync_async(self, samples=None):
+        measurements = []
+        for _ in range(samples or self.samples):
+            t0 = time.time()
+            server_ms = (await self.client.get_server_time())['serverTime']
+            t1 = time.time()
+            measurements.append(self._sample(t0, server_ms, t1))
+        return self._apply(min(measurements, key=lambda m: m[1]))
+
+    # -1021 alındığında bir sonraki turu beklemeden hemen yeniden ölç
+    def on_api_error(self, e):
+        if e.code != TIMESTAMP_ERROR_CODE:
+            return False
+        logging.warning(f"Zaman damgası reddedildi, saat farkı yeniden ölçülüyor: {e}")
+        self.sync()
+        return True
+
+    def _run(self):
+        # Periyodik time isteği aynı zamanda havuzdaki bağlantıyı sıcak tutar
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except BinanceAPIException as e:
+                logging.error(f"Binance API hatası: {e}")
+            except Exception as e:
+                logging.error(f"Saat senkronizasyonu başarısız: {e}")
+
+    async def run_async(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sync_async()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Saat senkronizasyonu başarısız: {e}")
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+        ]
+        super().init_poolmanager(*args, **kwargs)
+
+
+# requests oturumuna daha büyük, kalıcı (keep-alive) bir bağlantı havuzu takar. urllib3'ün
+# kendi tekrar denemeleri kapatılır: emir isteği sessizce iki kez gönderilmemeli.
+# `hosts` her uç nokta için ayrı tutulan havuz sayısıdır (api, api1-api4).
+def tune_session(client, pool_size=10, hosts=8):
+    adapter = KeepAliveAdapter(pool_connections=hosts, pool_maxsize=pool_size, max_retries=0)
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+    return adapter
+
+# Havuzda `connections` adet bağlantıyı önceden açar; ilk emir TCP/TLS el sıkışması beklemez
+def warm_up(client, connections=2):
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        for future in [pool.submit(client.ping) for _ in range(connections)]:
+            try:
+                future.result()
+            except Exception as e:
+                logging.warning(f"Bağlantı ısıtma başarısız: {e}")
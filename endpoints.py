@@ -0,0 +1,286 @@
+import copy
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.exceptions import RequestException
+from binance.exceptions import BinanceAPIException
+from metrics import Histogram
+from rate_limiter import WRAPPED_PREFIXES, request_cost
+
+BINANCE_ENDPOINTS = (
+    'https://api.binance.com/api',
+    'https://api1.binance.com/api',
+    'https://api2.binance.com/api',
+    'https://api3.binance.com/api',
+    'https://api4.binance.com/api',
+)
+# Tekrar gönderilmesi yan etki doğurmayan okuma istekleri; yalnızca bunlar hedge edilir
+HEDGED_METHODS = frozenset((
+    'ping', 'get_server_time', 'get_exchange_info', 'get_symbol_info', 'get_symbol_ticker',
+    'get_orderbook_ticker', 'get_ticker', 'get_avg_price', 'get_order_book', 'get_klines',
+    'get_aggregate_trades', 'get_recent_trades', 'get_order', 'get_open_orders', 'get_all_orders',
+    'get_account', 'get_asset_balance', 'get_my_trades',
+))
+
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+# Devre dışı uç noktaya başka bir deneme isteği sürerken ikincisi gönderilmez
+class ProbeInFlight(RequestException):
+    pass
+
+
+class Endpoint:
+    def __init__(self, url):
+        self.url = url
+        self.latency = Histogram()
+        self.ewma = None
+        self.failures = 0
+        self.penalty = 0.0
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        # HALF_OPEN denemesi bu ana kadar sonuçlanmazsa yeni deneme yapılabilir
+        self.probe_until = 0.0
+
+    # Düşük puan daha iyi: yumuşatılmış gecikme, son hatalar kadar cezalandırılır
+    def score(self):
+        return (self.ewma if self.ewma is not None else 0.0) * (1 + self.penalty)
+
+
+# Uç nokta havuzu: gecikme/hata puanı ve devre kesici. Art arda `failure_threshold` hata alan
+# uç nokta `cooldown` saniye devre dışı kalır (her açılışta süre ikiye katlanır); süre dolunca
+# okuma isteklerinden biri deneme olarak ilk ona gönderilir (HALF_OPEN), başarılıysa tekrar havuza
+# döner. Aynı anda tek deneme yapılır; `probe_timeout` içinde sonuçlanmayan deneme yenilenebilir.
+class EndpointPool:
+    def __init__(self, urls=None, failure_threshold=3, cooldown=30, max_cooldown=600,
+                 hedge_quantile=0.95, min_hedge_delay=0.05, max_hedge_delay=1.0, alpha=0.2,
+                 probe_timeout=10):
+        self.endpoints = [Endpoint(url) for url in (urls or BINANCE_ENDPOINTS)]
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.alpha = alpha
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+
+    def _probe_due(self, endpoint, now):
+        if endpoint.state == OPEN:
+            return now >= endpoint.open_until
+        return endpoint.state == HALF_OPEN and now >= endpoint.probe_until
+
+    # Durumu değiştirmez. probe=True ise denenme zamanı gelmiş bir uç nokta ilk sıraya konur.
+    def ranked(self, probe=False):
+        now = time.monotonic()
+        with self._lock:
+            usable = sorted((e for e in self.endpoints if e.state == CLOSED), key=Endpoint.score)
+            if probe:
+                usable = [e for e in self.endpoints if self._probe_due(e, now)][:1] + usable
+            if not usable:
+                # Hepsi devre dışıysa (sürmekte olan deneme dışında) en erken açılacak olanla devam et
+                waiting = [e for e in self.endpoints if e.state == OPEN] or self.endpoints
+                return [min(waiting, key=lambda e: e.open_until)]
+            return usable
+
+    # İstek gönderilmeden hemen önce çağrılır; deneme hakkı (HALF_OPEN) yalnızca burada alınır.
+    # Uç noktaya başka bir deneme sürüyorsa False döner.
+    def acquire(self, endpoint):
+        now = time.monotonic()
+        with self._lock:
+            if endpoint.state == CLOSED:
+                return True
+            if self._probe_due(endpoint, now):
+                endpoint.state = HALF_OPEN
+                endpoint.probe_until = now + self.probe_timeout
+                return True
+            return endpoint.state == OPEN
+
+    # Birincil isteğe bu kadar süre yanıt gelmezse ikinci uç noktaya da gönderilir
+    def hedge_delay(self, endpoint):
+        with self._lock:
+            if endpoint.latency.count < 20:
+                return self.max_hedge_delay
+            delay = endpoint.latency.quantile(self.hedge_quantile)
+        return min(max(delay, self.min_hedge_delay), self.max_hedge_delay)
+
+    def record_success(self, endpoint, seconds):
+        with self._lock:
+            endpoint.latency.record(seconds)
+            endpoint.ewma = seconds if endpoint.ewma is None else endpoint.ewma + self.alpha * (seconds - endpoint.ewma)
+            endpoint.failures = 0
+            endpoint.penalty *= 0.5
+            if endpoint.state != CLOSED:
+                logging.info(f"Uç nokta tekrar kullanımda: {endpoint.url}")
+            endpoint.state = CLOSED
+            endpoint.cooldown = 0.0
+
+    def record_failure(self, endpoint, error):
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.penalty += 1.0
+            if endpoint.state == HALF_OPEN or endpoint.failures >= self.failure_threshold:
+                endpoint.cooldown = min(self.max_cooldown, endpoint.cooldown * 2 or self.base_cooldown)
+                endpoint.state = OPEN
+                endpoint.open_until = time.monotonic() + endpoint.cooldown
+                logging.warning(f"Uç nokta {endpoint.cooldown:.0f} sn devre dışı: {endpoint.url} ({error})")
+
+    def status(self):
+        with self._lock:
+            return [(e.url, e.state, e.ewma, e.failures) for e in self.endpoints]
+
+
+# İstemciyi uç nokta havuzu üzerinden çalıştıran vekil. Her istek, API_URL'i seçilen uç noktaya
+# ayarlanmış sığ bir istemci kopyasıyla yapılır (oturum ve bağlantı havuzu ortaktır).
+# Okuma istekleri hedge edilir: birincil uç nokta p95 süresinde yanıt vermezse ikinci sıradakine de
+# gönderilir, ilk başarılı yanıt kullanılır. Emirler tek uç noktaya gönderilir ve tekrarlanmaz.
+# Uç noktalar aynı IP ağırlık limitini paylaşır: scheduler verilirse ilk denemeden sonraki her istek
+# ona yazılır, ağırlık payı azken kopya gönderilmez (ilk deneme sarmalayan ScheduledClient'tan geçer).
+class FailoverClient:
+    def __init__(self, client, pool=None, hedged_methods=HEDGED_METHODS, max_workers=8, scheduler=None):
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, 'pool', pool or EndpointPool())
+        object.__setattr__(self, 'scheduler', scheduler)
+        object.__setattr__(self, 'hedged_methods', hedged_methods)
+        object.__setattr__(self, '_executor', ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge'))
+
+    def __setattr__(self, name, value):
+        setattr(self._client, name, value)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not name.startswith(WRAPPED_PREFIXES):
+            return attr
+        if name in self.hedged_methods:
+            return lambda *args, **params: self._hedged(name, args, params)
+        return lambda *args, **params: self._single(name, args, params)
+
+    def _attempt(self, endpoint, name, args, params):
+        if not self.pool.acquire(endpoint):
+            raise ProbeInFlight(f"Uç noktada deneme sürüyor: {endpoint.url}")
+        client = copy.copy(self._client)
+        client.API_URL = endpoint.url
+        start = time.perf_counter()
+        try:
+            result = getattr(client, name)(*args, **params)
+        except BinanceAPIException as e:
+            # Sunucu yanıt verdi; 5xx dışındaki hatalar uç noktanın sağlığıyla ilgili değil
+            if e.status_code >= 500:
+                self.pool.record_failure(endpoint, e)
+            else:
+                self.pool.record_success(endpoint, time.perf_counter() - start)
+            self._client.response = client.response
+            raise
+        except RequestException as e:
+            self.pool.record_failure(endpoint, e)
+            raise
+        self.pool.record_success(endpoint, time.perf_counter() - start)
+        self._client.response = client.response
+        return result
+
+    def _single(self, name, args, params):
+        return self._attempt(self.pool.ranked()[0], name, args, params)
+
+    # Önceki istek hatayla bittiyse sıradaki deneme ağırlık için bekler; önceki sürerken gönderilen
+    # kopya ise yalnızca beklemeden geçebiliyorsa gönderilir
+    def _charge(self, name, params, hedge):
+        if self.scheduler is None:
+            return True
+        weight, _, priority = request_cost(name, params)
+        if hedge:
+            return self.scheduler.try_acquire(weight)
+        self.scheduler.acquire(weight, 0, priority)
+        return True
+
+    # Emirler denenme zamanı gelmiş uç noktaya gönderilmez; deneme okuma istekleriyle yapılır
+    def _hedged(self, name, args, params):
+        candidates = self.pool.ranked(probe=True)
+        pending = set()
+        last_error = None
+        for index, endpoint in enumerate(candidates):
+            more = index + 1 < len(candidates)
+            if index and not self._charge(name, params, hedge=bool(pending)):
+                # Ağırlık payı az: kopya gönderilmez, süren istek beklenir
+                more = False
+            else:
+                pending.add(self._executor.submit(self._attempt, endpoint, name, args, params))
+            timeout = self.pool.hedge_delay(endpoint) if more else None
+            while pending:
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    try:
+                        return future.result()
+                    except BinanceAPIException as e:
+                        if e.status_code < 500:
+                            raise
+                        last_error = e
+                    except RequestException as e:
+                        last_error = e
+                # Biten istek başarısızsa hemen sıradaki uç noktaya geç
+                if more:
+                    break
+            if not more:
+                break
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError("Uç nokta bulunamadı")
+
+
+# Yerel sahte sunucularla kendi kendine kontrol: biri yavaş, biri 500 dönen, biri hızlı.
+# python endpoints.py
+def _self_check():
+    import json
+    import random
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from binance.client import Client
+
+    def make_server(delay, fail_rate):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(delay() if callable(delay) else delay)
+                if random.random() < fail_rate:
+                    self.send_response(500)
+                    body = b'{"code":-1000,"msg":"internal"}'
+                else:
+                    self.send_response(200)
+                    body = json.dumps({'symbol': 'BTCUSDT', 'price': '1.0'}).encode()
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    servers = [
+        make_server(lambda: 0.3 if random.random() < 0.2 else 0.01, 0.0),  # ara sıra yavaş
+        make_server(0.005, 1.0),  # hep hata
+        make_server(lambda: 0.02 if random.random() < 0.1 else 0.008, 0.0),
+    ]
+    pool = EndpointPool([url for _, url in servers], cooldown=2, min_hedge_delay=0.02)
+    client = FailoverClient(Client('x', 'y', ping=False), pool)
+    latencies = []
+    for _ in range(200):
+        start = time.perf_counter()
+        client.get_symbol_ticker(symbol='BTCUSDT')
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"p50={latencies[100] * 1000:.1f}ms p95={latencies[190] * 1000:.1f}ms p99={latencies[198] * 1000:.1f}ms")
+    for url, state, ewma, failures in pool.status():
+        print(f"{url} {state} ewma={(ewma or 0) * 1000:.1f}ms hata={failures}")
+    for server, _ in servers:
+        server.shutdown()
+
+if __name__ == "__main__":
+    _self_check()
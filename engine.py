@@ -0,0 +1,475 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from decimal import Decimal
+from binance import AsyncClient, BinanceSocketManager
+from binance.exceptions import BinanceAPIException, BinanceOrderException
+from balance_cache import BalanceCache
+from exchange_info import SymbolRegistry
+from instrument import Instrument
+from clock_sync import ClockSync
+from log_pipeline import setup_logging
+from metrics import METRICS, AsyncInstrumentedClient, MetricsReporter
+from rate_limiter import WeightScheduler, AsyncScheduledClient
+from strategy import exit_levels, reentry_price, TP_REENTRY_FACTOR, SL_REENTRY_FACTOR, MAX_LOSS_COUNT, LIMIT_FILL_TIMEOUT
+from user_stream import AsyncUserDataStream, AsyncFillTracker, FINAL_ORDER_STATUSES
+from ledger import Ledger, LEDGER_FILE, connect, sequence_fills
+
+# Kullanıcı veri akışı olayları kaçırılırsa diye REST kontrol aralığı (saniye)
+FILL_CHECK_INTERVAL = 30
+# Başarısız emir denemeleri arasındaki bekleme (saniye)
+RETRY_DELAY = 2
+# Pozisyon yeniden kurulurken myTrades sayfa boyu
+MY_TRADES_LIMIT = 1000
+
+ZERO = Decimal('0')
+
+# Sembol başına son fiyat. Strateji meşgulken gelen ara fiyatlar birikmez, yalnızca en yenisi okunur.
+class PriceFeed:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.price = None
+        self.updated = 0.0
+        self._changed = asyncio.Event()
+
+    def publish(self, price):
+        self.price = price
+        self.updated = time.monotonic()
+        self._changed.set()
+
+    async def next_price(self):
+        await self._changed.wait()
+        self._changed.clear()
+        return self.price
+
+
+# Tüm sembollerin bookTicker akışları tek bir multiplex WebSocket bağlantısından okunur.
+# Çalışırken abone olunan sembol için bağlantı, bir sonraki mesajdan sonra yeni akış listesiyle
+# yeniden kurulur.
+class MarketDataMux:
+    def __init__(self, engine, reconnect_delay=5):
+        self.engine = engine
+        self.reconnect_delay = reconnect_delay
+        self.feeds = {}
+        self._resubscribe = asyncio.Event()
+
+    def subscribe(self, symbol):
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            feed = self.feeds[symbol] = PriceFeed(symbol)
+            self._resubscribe.set()
+        return feed
+
+    async def run(self):
+        while True:
+            if not self.feeds:
+                await self._resubscribe.wait()
+            self._resubscribe.clear()
+            streams = [f"{symbol.lower()}@bookTicker" for symbol in self.feeds]
+            try:
+                async with self.engine.bsm.multiplex_socket(streams) as stream:
+                    await self.fill_gaps()
+                    while not self._resubscribe.is_set():
+                        msg = await stream.recv()
+                        data = msg.get('data', msg)
+                        if data.get('e') == 'error':
+                            raise ConnectionError(data.get('m'))
+                        feed = self.feeds.get(data.get('s'))
+                        if feed is not None:
+                            feed.publish(Decimal(data['b']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Fiyat akışı koptu, yeniden bağlanılıyor: {e}")
+                print(f"Fiyat akışı koptu, yeniden bağlanılıyor: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+
+    # Bağlantı sonrası aradaki boşluğu tek bir toplu ticker isteğiyle doldur
+    async def fill_gaps(self):
+        try:
+            tickers = await self.engine.call('get_symbol_ticker')
+        except BinanceAPIException as e:
+            logging.error(f"Binance API hatası: {e}")
+            return
+        for ticker in tickers:
+            feed = self.feeds.get(ticker['symbol'])
+            if feed is not None:
+                feed.publish(Decimal(ticker['price']))
+
+
+class SymbolStrategy:
+    def __init__(self, engine, config):
+        self.engine = engine
+        self.symbol = config['symbol'].upper()
+        self.profit_percentage = Decimal(str(config['profit_percentage']))
+        self.loss_percentage = Decimal(str(config['loss_percentage']))
+        self.allocation = Decimal(str(config['allocation_percentage'])) / Decimal('100')
+        self.order_type = config.get('order_type', 'MARKET').upper()
+        self.limit_price = Decimal(str(config['limit_price'])) if config.get('limit_price') else None
+        self.fill_timeout = config.get('fill_timeout', LIMIT_FILL_TIMEOUT)
+        # Gözetmen çöken işçiyi yeniden başlatırken ya da sembolü taşırken verir: yeni girişten önce
+        # önceki çalışmanın emirleri ve pozisyonu toparlanır
+        self.recover = bool(config.get('recover'))
+        self.feed = engine.market_data.subscribe(self.symbol)
+        self.position = ZERO
+        self.filters = None
+        self.instrument = None
+
+    def info(self, message):
+        logging.info(f"[{self.symbol}] {message}")
+        print(f"[{self.symbol}] {message}")
+
+    def error(self, message):
+        logging.error(f"[{self.symbol}] {message}")
+        print(f"[{self.symbol}] {message}")
+
+    async def run(self):
+        try:
+            await self._run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error(f"Strateji hata ile durdu: {e}")
+
+    async def _run(self):
+        self.filters = self.engine.registry.get(self.symbol)
+        if self.filters is None:
+            self.error(f"Symbol bilgisi bulunamadı: {self.symbol}")
+            return
+        self.instrument = Instrument.from_filters(self.filters)
+        min_notional = self.filters.min_notional or Decimal('10')
+
+        entry_price = await self.reconcile() if self.recover else None
+        if entry_price is None:
+            budget = self.engine.balances.free(self.filters.quote_asset) * self.allocation
+            if budget < min_notional:
+                self.error(f"Alım için ayrılan miktar notional minimumun altında: {budget} < {min_notional}")
+                return
+            self.engine.ledger.begin(self.symbol)
+            if self.order_type == 'LIMIT':
+                entry_price = await self.buy_limit(self.limit_price, budget)
+            else:
+                entry_price = await self.buy_market(budget)
+            if entry_price is None:
+                self.error("Başlangıç alım işlemi başarısız oldu, strateji durduruluyor.")
+                return
+
+        loss_count = 0
+        while loss_count < MAX_LOSS_COUNT:
+            take_profit_price, stop_loss_price = exit_levels(entry_price, self.profit_percentage,
+                                                             self.loss_percentage, self.filters.tick_size)
+            self.info(f"Alış fiyatı: {entry_price}, Kar hedefi: {take_profit_price}, Zarar durdurma: {stop_loss_price}")
+
+            price = await self.feed.next_price()
+            while stop_loss_price < price < take_profit_price:
+                price = await self.feed.next_price()
+            hit_stop = price <= stop_loss_price
+            METRICS.observe('stage_seconds', time.monotonic() - self.feed.updated, stage='tick_to_decision', symbol=self.symbol)
+
+            balance_version = self.engine.balances.version
+            with METRICS.timer('stage_seconds', stage='decision_to_ack', symbol=self.symbol):
+                sell_price = await self.sell_market()
+            if sell_price is None:
+                self.error("Satılacak pozisyon kalmadı, strateji durduruluyor.")
+                return
+            self.info(f"{'Zarar' if hit_stop else 'Kar'} ile satış yapıldı: {sell_price}")
+
+            buy_price = reentry_price(sell_price, SL_REENTRY_FACTOR if hit_stop else TP_REENTRY_FACTOR,
+                                      self.filters.tick_size)
+            await self.engine.wait_for_balance(balance_version)
+            budget = self.engine.balances.free(self.filters.quote_asset) * self.allocation
+            if budget < min_notional:
+                self.error(f"Alım için ayrılan miktar notional minimumun altında: {budget} < {min_notional}")
+                return
+            entry_price = await self.buy_limit(buy_price, budget)
+            if entry_price is None:
+                self.error("Yeniden alım gerçekleşmedi, strateji durduruluyor.")
+                return
+
+            if hit_stop:
+                loss_count += 1
+                logging.warning(f"[{self.symbol}] Üst üste zarar sayısı: {loss_count}")
+            else:
+                loss_count = 0
+
+        self.info(f"{MAX_LOSS_COUNT} zarar sonrası işlemler durduruldu.")
+
+    # Önceki çalışmadan kalan alım emirleri iptal edilir; pozisyon, işlem defterine yazılmış son dizinin
+    # dolumları ve borsada bunlardan sonra gerçekleşen işlemlerle yeniden kurulur (defter yazılmadan
+    # çöken sürecin dolumları da böylece sayılır). Pozisyon varsa son alımların ortalama fiyatı döner,
+    # yoksa None: sembol düz, yeni giriş güvenle yapılabilir.
+    async def reconcile(self):
+        for order in await self.engine.call('get_open_orders', symbol=self.symbol):
+            if order['side'] != 'BUY':
+                continue
+            try:
+                await self.engine.call('cancel_order', symbol=self.symbol, orderId=order['orderId'])
+                self.info(f"Önceki çalışmadan kalan alım emri iptal edildi: {order['orderId']}")
+            except BinanceAPIException as e:
+                logging.error(f"[{self.symbol}] Emir iptal edilemedi: {e}")
+
+        db = connect(self.engine.ledger.path)
+        try:
+            started, rows = sequence_fills(db, self.symbol)
+        finally:
+            db.close()
+        if started is None:
+            return None
+        fills = {row['trade_id']: (row['side'], Decimal(row['price']), Decimal(row['qty']),
+                                   Decimal(row['commission']), row['commission_asset']) for row in rows}
+        params = {'fromId': max(fills) + 1} if fills else {'startTime': started}
+        while True:
+            trades = await self.engine.call('get_my_trades', symbol=self.symbol, limit=MY_TRADES_LIMIT, **params)
+            for t in trades:
+                fills[t['id']] = ('BUY' if t['isBuyer'] else 'SELL', Decimal(t['price']), Decimal(t['qty']),
+                                  Decimal(t['commission']), t['commissionAsset'])
+            if len(trades) < MY_TRADES_LIMIT:
+                break
+            params = {'fromId': trades[-1]['id'] + 1}
+
+        position, bought, cost, last_side = ZERO, ZERO, ZERO, None
+        for trade_id in sorted(fills):
+            side, price, qty, commission, asset = fills[trade_id]
+            if side == 'BUY':
+                if last_side == 'SELL':
+                    bought, cost = ZERO, ZERO
+                bought += qty
+                cost += price * qty
+                position += qty - (commission if asset == self.filters.base_asset else ZERO)
+            else:
+                position -= qty
+            last_side = side
+        position = min(max(position, ZERO), self.engine.balances.free(self.filters.base_asset))
+        if not bought or self.instrument.round_quantity(position) < self.filters.min_qty:
+            self.info("Önceki çalışmadan açık pozisyon kalmamış, yeni giriş yapılacak.")
+            return None
+        self.position = position
+        entry_price = cost / bought
+        self.info(f"Önceki çalışmanın pozisyonu devralındı: {position} @ {entry_price}")
+        return entry_price
+
+    def _add_fills(self, fills, side):
+        qty = sum((Decimal(f['qty']) for f in fills), ZERO)
+        base_fee = sum((Decimal(f['commission']) for f in fills if f['commissionAsset'] == self.filters.base_asset), ZERO)
+        if side == 'BUY':
+            self.position += qty - base_fee
+        else:
+            self.position -= qty
+        quote = sum((Decimal(f['price']) * Decimal(f['qty']) for f in fills), ZERO)
+        return quote / qty if qty else None
+
+    async def buy_market(self, budget):
+        price = self.feed.price
+        if price is None:
+            price = await self.feed.next_price()
+        quantity = self.instrument.round_quantity(budget / price)
+        if quantity < self.filters.min_qty or not self.instrument.notional_ok(price, quantity):
+            self.error(f"Bakiyeniz, minimum işlem miktarının altında. Hesaplanan miktar: {quantity}")
+            return None
+        self.info(f"Piyasa emriyle alım yapılıyor: {quantity}")
+        try:
+            order = await self.engine.call('order_market_buy', symbol=self.symbol,
+                                           quantity=self.instrument.format_quantity(quantity),
+                                           newOrderRespType='FULL')
+        except (BinanceAPIException, BinanceOrderException) as e:
+            self.error(f"Emir işlemi hatası: {e}")
+            return None
+        return self._add_fills(order.get('fills', []), 'BUY')
+
+    async def sell_market(self):
+        while True:
+            quantity = self.instrument.round_quantity(min(self.position, self.engine.balances.free(self.filters.base_asset)))
+            if quantity < self.filters.min_qty:
+                return None
+            try:
+                order = await self.engine.call('order_market_sell', symbol=self.symbol,
+                                               quantity=self.instrument.format_quantity(quantity),
+                                               newOrderRespType='FULL')
+            except (BinanceAPIException, BinanceOrderException) as e:
+                self.error(f"Satış işlemi başarısız oldu, tekrar deniyor: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            price = self._add_fills(order.get('fills', []), 'SELL')
+            return price if price is not None else self.feed.price
+
+    async def buy_limit(self, price, budget):
+        price = self.instrument.round_price(price)
+        quantity = self.instrument.round_quantity(budget / price)
+        if quantity < self.filters.min_qty or not self.instrument.notional_ok(price, quantity):
+            self.error(f"Limit alım miktarı minimumun altında: {quantity} @ {price}")
+            return None
+        self.info(f"Limit emriyle {price} fiyatından alım yapılıyor: {quantity}")
+        try:
+            order = await self.engine.call('order_limit_buy', symbol=self.symbol,
+                                           quantity=self.instrument.format_quantity(quantity),
+                                           price=self.instrument.format_price(price))
+        except (BinanceAPIException, BinanceOrderException) as e:
+            self.error(f"Emir işlemi hatası: {e}")
+            return None
+        return await self.wait_for_fill(order['orderId'])
+
+    # Emir sonuçlanana kadar diğer sembolleri bekletmeden bekle; süre dolarsa iptal et
+    async def wait_for_fill(self, order_id):
+        fills = self.engine.fills
+        deadline = None if self.fill_timeout is None else time.monotonic() + self.fill_timeout
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                wait = FILL_CHECK_INTERVAL if deadline is None else min(FILL_CHECK_INTERVAL, deadline - time.monotonic())
+                state = await fills.wait_async(order_id, wait)
+                if state is not None:
+                    return await self._fill_from_state(state)
+                order = await self.engine.call('get_order', symbol=self.symbol, orderId=order_id)
+                if order['status'] in FINAL_ORDER_STATUSES:
+                    return await self._fill_from_order(order)
+
+            self.error(f"Limit emri {self.fill_timeout} saniye içinde dolmadı, iptal ediliyor: {order_id}")
+            try:
+                await self.engine.call('cancel_order', symbol=self.symbol, orderId=order_id)
+            except BinanceAPIException as e:
+                logging.error(f"[{self.symbol}] Emir iptal edilemedi: {e}")
+            order = await self.engine.call('get_order', symbol=self.symbol, orderId=order_id)
+            return await self._fill_from_order(order)
+        finally:
+            fills.forget(order_id)
+
+    async def _fill_from_state(self, state):
+        if state.executed_qty == 0:
+            return None
+        if sum((f.qty for f in state.fills), ZERO) != state.executed_qty:
+            # Akış bazı dolumları kaçırmış, emri REST ile oku
+            order = await self.engine.call('get_order', symbol=self.symbol, orderId=state.order_id)
+            return await self._fill_from_order(order)
+        return self._add_fills([{'price': f.price, 'qty': f.qty, 'commission': f.commission,
+                                 'commissionAsset': f.commission_asset} for f in state.fills], 'BUY')
+
+    # Emir yanıtında komisyon yok; baz varlıkla ödenen komisyon pozisyondan düşülsün diye
+    # dolumlar myTrades'ten okunur
+    async def _fill_from_order(self, order):
+        executed = Decimal(order['executedQty'])
+        if executed == 0:
+            return None
+        trades = await self.engine.call('get_my_trades', symbol=self.symbol, orderId=order['orderId'])
+        if sum((Decimal(t['qty']) for t in trades), ZERO) == executed:
+            return self._add_fills(trades, 'BUY')
+        logging.warning(f"[{self.symbol}] Emrin dolumları eksik döndü, komisyon düşülemedi: {order['orderId']}")
+        self.position += executed
+        return Decimal(order['cummulativeQuoteQty']) / executed
+
+
+# market_data verilmezse fiyatlar tek bir multiplex WebSocket'ten okunur (gözetmen altında
+# çalışan işçiler paylaşımlı bellek veriyolunu verir)
+class Engine:
+    def __init__(self, client, config, market_data=None):
+        # Tüm semboller aynı istek ağırlığı ve emir limitlerini paylaşır
+        self.scheduler = WeightScheduler(config.get('weight_limit', 6000), config.get('order_limit', 50))
+        self.client = AsyncScheduledClient(AsyncInstrumentedClient(client), self.scheduler)
+        self.metrics = MetricsReporter(textfile=config.get('metrics_textfile', 'trading_bot.prom'),
+                                       interval=config.get('metrics_interval', 60), port=config.get('metrics_port'))
+        self.bsm = BinanceSocketManager(client)
+        self.market_data = market_data or MarketDataMux(self)
+        self.user_stream = AsyncUserDataStream(self.bsm)
+        self.fills = AsyncFillTracker(self.user_stream)
+        # Aynı dosyayı paylaşan işçi süreçleri SQLite kilidiyle sırayla yazar
+        self.ledger = Ledger(config.get('ledger_path', LEDGER_FILE)).attach(self.user_stream)
+        self.balances = BalanceCache(None, self.user_stream, reconcile_interval=0)
+        self.registry = SymbolRegistry(None, refresh_interval=0)
+        self.reconcile_interval = config.get('reconcile_interval', 300)
+        self.clock = ClockSync(self.client, interval=config.get('clock_sync_interval', 30))
+        self.client.attach_clock(self.clock)
+        self.strategies = [SymbolStrategy(self, c) for c in config['strategies']]
+        self._tasks = set()
+        self._strategies_changed = None
+
+    async def call(self, method, **params):
+        return await getattr(self.client, method)(**params)
+
+    # Çalışırken yeni sembol ekler (gözetmen, çöken işçinin sembollerini dağıtırken kullanır).
+    # Fiyat kaynağı yeni aboneliği kendisi okumaya başlar (MarketDataMux yeniden bağlanır,
+    # BusMarketData bir sonraki taramada okur).
+    def add_strategy(self, config):
+        strategy = SymbolStrategy(self, config)
+        self.strategies.append(strategy)
+        if self._strategies_changed is not None:
+            self._tasks.add(asyncio.create_task(strategy.run()))
+            self._strategies_changed.set()
+        return strategy
+
+    # Satış gelirinin bakiyeye yansımasını bekle; olay gelmezse REST ile yenile
+    async def wait_for_balance(self, version, timeout=2):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.balances.version != version:
+                return
+            await asyncio.sleep(0.05)
+        self.balances.apply_snapshot(await self.call('get_account'))
+
+    async def _reconcile(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                drift = self.balances.apply_snapshot(await self.call('get_account'))
+            except BinanceAPIException as e:
+                logging.error(f"Binance API hatası: {e}")
+                continue
+            for asset, (cached, actual) in drift.items():
+                logging.warning(f"Bakiye sapması düzeltildi: {asset} önbellek={cached}, gerçek={actual}")
+
+    async def run(self):
+        if self.registry.needs_refresh():
+            self.registry.apply_exchange_info(await self.call('get_exchange_info'))
+        self.metrics.start()
+        self.ledger.start()
+        await self.clock.sync_async(5)
+        logging.info(f"Sunucu saat farkı: {self.clock.offset_ms:.1f} ms, gidiş-dönüş: {self.clock.rtt_ms:.1f} ms")
+        background = [asyncio.create_task(self.user_stream.run()), asyncio.create_task(self.market_data.run()),
+                      asyncio.create_task(self.clock.run_async())]
+        self.balances.apply_snapshot(await self.call('get_account'))
+        if self.reconcile_interval:
+            background.append(asyncio.create_task(self._reconcile()))
+        self._strategies_changed = asyncio.Event()
+        self._tasks = {asyncio.create_task(strategy.run()) for strategy in self.strategies}
+        try:
+            # Tüm stratejiler (sonradan eklenenler dahil) bitene kadar bekle
+            while self._tasks:
+                changed = asyncio.create_task(self._strategies_changed.wait())
+                done, _ = await asyncio.wait(self._tasks | {changed}, return_when=asyncio.FIRST_COMPLETED)
+                changed.cancel()
+                self._strategies_changed.clear()
+                self._tasks -= done
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            self.metrics.stop()
+            self.ledger.stop()
+
+async def run_engine(config, api_key, api_secret):
+    client = await AsyncClient.create(api_key, api_secret)
+    try:
+        await Engine(client, config).run()
+    finally:
+        await client.close_connection()
+
+def main():
+    parser = argparse.ArgumentParser(description="Birden fazla sembolde TP/SL stratejisini tek süreçte çalıştırır")
+    parser.add_argument('config', help="Strateji yapılandırması (JSON)")
+    args = parser.parse_args()
+
+    setup_logging()
+    with open(args.config, encoding='utf-8') as f:
+        config = json.load(f)
+    api_key = os.environ.get('BINANCE_API_KEY') or input("API Anahtarınızı Girin: ")
+    api_secret = os.environ.get('BINANCE_API_SECRET') or input("API Gizli Anahtarınızı Girin: ")
+    try:
+        asyncio.run(run_engine(config, api_key, api_secret))
+    except KeyboardInterrupt:
+        print("Motor durduruldu.")
+
+if __name__ == "__main__":
+    main()
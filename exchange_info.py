@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import namedtuple
+from decimal import Decimal
+
+EXCHANGE_INFO_CACHE = 'exchange_info.json'
+
+SymbolFilters = namedtuple('SymbolFilters', [
+    'symbol', 'status', 'base_asset', 'quote_asset',
+    'min_qty', 'max_qty', 'step_size',
+    'min_price', 'max_price', 'tick_size',
+    'min_notional', 'max_notional', 'apply_min_to_market',
+    'max_num_orders', 'max_num_algo_orders',
+    'multiplier_up', 'multiplier_down', 'avg_price_mins',
+])
+
+def _decimal(value):
+    return None if value is None else Decimal(value)
+
+# exchangeInfo içindeki sembol kaydını filtre türüne göre indekslenmiş küçük bir kayda çevirir
+def compact_symbol(symbol_info):
+    return {
+        'symbol': symbol_info['symbol'],
+        'status': symbol_info.get('status'),
+        'baseAsset': symbol_info['baseAsset'],
+        'quoteAsset': symbol_info['quoteAsset'],
+        'filters': {f['filterType']: f for f in symbol_info['filters']},
+    }
+
+def build_symbol_filters(record):
+    filters = record['filters']
+    lot_size = filters.get('LOT_SIZE', {})
+    price_filter = filters.get('PRICE_FILTER', {})
+    # Spot tarafında MIN_NOTIONAL yerini NOTIONAL filtresine bıraktı, ikisini de tanı
+    notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
+    percent_price = filters.get('PERCENT_PRICE') or {}
+    by_side = filters.get('PERCENT_PRICE_BY_SIDE') or {}
+    return SymbolFilters(
+        symbol=record['symbol'],
+        status=record['status'],
+        base_asset=record['baseAsset'],
+        quote_asset=record['quoteAsset'],
+        min_qty=_decimal(lot_size.get('minQty')),
+        max_qty=_decimal(lot_size.get('maxQty')),
+        step_size=_decimal(lot_size.get('stepSize')),
+        min_price=_decimal(price_filter.get('minPrice')),
+        max_price=_decimal(price_filter.get('maxPrice')),
+        tick_size=_decimal(price_filter.get('tickSize')),
+        min_notional=_decimal(notional.get('minNotional')),
+        max_notional=_decimal(notional.get('maxNotional')),
+        apply_min_to_market=notional.get('applyMinToMarket', notional.get('applyToMarket', True)),
+        max_num_orders=filters.get('MAX_NUM_ORDERS', {}).get('maxNumOrders'),
+        max_num_algo_orders=filters.get('MAX_NUM_ALGO_ORDERS', {}).get('maxNumAlgoOrders'),
+        multiplier_up=_decimal(percent_price.get('multiplierUp', by_side.get('askMultiplierUp'))),
+        multiplier_down=_decimal(percent_price.get('multiplierDown', by_side.get('bidMultiplierDown'))),
+        avg_price_mins=percent_price.get('avgPriceMins', by_side.get('avgPriceMins', notional.get('avgPriceMins'))),
+    )
+
+# Tüm semboller için exchangeInfo tek seferde çekilir, diskte TTL ile saklanır ve arka planda
+# yenilenir. Böylece birden fazla bot aynı isteği tekrar tekrar göndermez; başlangıçta
+# ve sembol değiştirirken ağ isteği gerekmez.
+class SymbolRegistry:
+    def __init__(self, client, path=EXCHANGE_INFO_CACHE, ttl=6 * 3600, refresh_interval=3600):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self._records = {}
+        self._filters = {}
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # binance paketi yalnızca kayıt defteri çalışırken yüklenir; filtre çözümleme (headless hızlı
+    # başlangıç) paketin içe aktarma maliyetini ödemez
+    def start(self):
+        from binance.exceptions import BinanceAPIException
+        if self.needs_refresh():
+            try:
+                self.refresh()
+            except BinanceAPIException as e:
+                if not self._records:
+                    raise
+                logging.warning(f"exchangeInfo yenilenemedi, eski önbellek kullanılıyor: {e}")
+        if self.refresh_interval:
+            self._thread = threading.Thread(target=self._refresh_loop, name="exchange-info-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def age(self):
+        return time.time() - self._fetched_at
+
+    def symbols(self):
+        with self._lock:
+            return list(self._records)
+
+    def get(self, symbol):
+        symbol = symbol.upper()
+        with self._lock:
+            filters = self._filters.get(symbol)
+            if filters is None:
+                record = self._records.get(symbol)
+                if record is None:
+                    return None
+                filters = self._filters[symbol] = build_symbol_filters(record)
+            return filters
+
+    def needs_refresh(self):
+        return not self._load_from_disk() or self.age() > self.ttl
+
+    def refresh(self):
+        self.apply_exchange_info(self.client.get_exchange_info())
+
+    def apply_exchange_info(self, exchange_info):
+        records = {s['symbol']: compact_symbol(s) for s in exchange_info['symbols']}
+        fetched_at = time.time()
+        with self._lock:
+            self._records = records
+            self._filters = {}
+            self._fetched_at = fetched_at
+        self._save_to_disk(records, fetched_at)
+        logging.info(f"exchangeInfo güncellendi: {len(records)} sembol")
+
+    def _load_from_disk(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.warning(f"exchangeInfo önbelleği okunamadı: {e}")
+            return False
+        with self._lock:
+            if self._records and data['fetched_at'] <= self._fetched_at:
+                return True
+            self._records = data['symbols']
+            self._filters = {}
+            self._fetched_at = data['fetched_at']
+        return True
+
+    def _save_to_disk(self, records, fetched_at):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': fetched_at, 'symbols': records}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"exchangeInfo önbelleği yazılamadı: {e}")
+
+    def _refresh_loop(self):
+        from binance.exceptions import BinanceAPIException
+        while not self._stop.wait(self.refresh_interval):
+            # Başka bir bot dosyayı yakın zamanda yenilediyse ağa gitme
+            self._load_from_disk()
+            if self.age() < self.refresh_interval:
+                continue
+            try:
+                self.refresh()
+            except BinanceAPIException as e:
+                logging.error(f"Binance API hatası: {e}")
+            except Exception as e:
+                logging.error(f"Hata: {e}")
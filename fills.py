@@ -0,0 +1,50 @@
+from decimal import Decimal
+from collections import namedtuple
+
+FINAL_ORDER_STATUSES = ('FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH')
+
+ZERO = Decimal('0')
+
+# Bir emrin tüm dolumlarının toplamı: vwap = quote / qty, commissions: {varlık: miktar}
+FillSummary = namedtuple('FillSummary', 'order_id qty quote vwap commissions')
+
+def _summary(order_id, qty, quote, commissions):
+    return FillSummary(order_id, qty, quote, quote / qty if qty > 0 else None, commissions)
+
+# REST dolumları: emir yanıtındaki `fills` ya da myTrades kayıtları
+def summarize_fills(order_id, fills):
+    qty = quote = ZERO
+    commissions = {}
+    for fill in fills:
+        fill_qty = Decimal(fill['qty'])
+        qty += fill_qty
+        quote += Decimal(fill['price']) * fill_qty
+        asset = fill.get('commissionAsset')
+        if asset:
+            commissions[asset] = commissions.get(asset, ZERO) + Decimal(fill['commission'])
+    return _summary(order_id, qty, quote, commissions)
+
+# Kullanıcı veri akışındaki emir durumu (user_stream.OrderState). Olayların bir kısmı
+# kaçırılmışsa (dolum toplamı executedQty'yi tutmuyorsa) None döner.
+def summarize_state(state):
+    qty = quote = ZERO
+    commissions = {}
+    for fill in state.fills:
+        qty += fill.qty
+        quote += fill.price * fill.qty
+        commissions[fill.commission_asset] = commissions.get(fill.commission_asset, ZERO) + fill.commission
+    if qty != state.executed_qty:
+        return None
+    return _summary(state.order_id, qty, quote, commissions)
+
+# FULL emir yanıtı; fills yoksa (ACK/RESULT) toplam miktarlardan hesaplanır
+def summarize_order(order):
+    if order.get('fills'):
+        return summarize_fills(order['orderId'], order['fills'])
+    return _summary(order['orderId'], Decimal(order.get('executedQty', '0')),
+                    Decimal(order.get('cummulativeQuoteQty', '0')), {})
+
+# Yalnızca bu emrin dolumları indirilir; yanıt boyutu hesap geçmişinden bağımsızdır
+def fetch_order_fills(client, symbol, order_id):
+    return summarize_fills(order_id, client.get_my_trades(symbol=symbol, orderId=order_id))
+
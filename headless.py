@@ -0,0 +1,233 @@
+import time
+
+# Soğuk başlangıç ölçümü içe aktarmalardan önce başlar
+STARTED = time.perf_counter()
+
+import os
+import sys
+import json
+import logging
+import argparse
+from decimal import Decimal, ROUND_DOWN
+from concurrent.futures import ThreadPoolExecutor
+from log_pipeline import setup_logging
+from rest_client import RestClient, RestAPIException, API_URL
+from journal import StateJournal, RESUME_PHASES, journal_buy_order, journal_position
+from exchange_info import SymbolRegistry, build_symbol_filters, compact_symbol
+from instrument import get_instrument
+from fills import summarize_order
+from strategy import exit_levels, EXIT_MODES
+from ledger import Ledger
+
+# Modülün yüklenmesinden ilk emrin borsa onayına kadar hedef süre (ms); aşılırsa uyarı yazılır
+COLD_START_TARGET_MS = 500
+# Ayarlar JSON dosyasından okunur; BOT_<ALAN> ortam değişkenleri dosyadakinin üstüne yazar.
+# API anahtarları yalnızca BINANCE_API_KEY / BINANCE_API_SECRET ortam değişkenlerinden alınır.
+CONFIG_ENV_PREFIX = 'BOT_'
+REQUIRED_FIELDS = ('symbol', 'profit_percentage', 'loss_percentage', 'allocation_percentage')
+DEFAULTS = {
+    'order_type': 'MARKET',
+    'limit_price': None,
+    'exit_mode': 'IZLEME',
+    'stop_mode': 'SABIT',
+    'profit_multiple': None,
+    'loss_multiple': None,
+}
+DECIMAL_FIELDS = ('profit_percentage', 'loss_percentage', 'allocation_percentage', 'limit_price',
+                  'profit_multiple', 'loss_multiple')
+# quoteOrderQty hassasiyeti (spot kote varlıklarının quoteAssetPrecision değeri)
+QUOTE_PRECISION = Decimal('0.00000001')
+# NOTIONAL/MIN_NOTIONAL filtresi olmayan semboller için (binance_bot.unpack_filters ile aynı)
+DEFAULT_MIN_NOTIONAL = Decimal('10')
+# Arka uç yanıt vermedi; emrin gönderilip gönderilmediği bilinmiyor
+UNKNOWN_SEND_STATUS_CODE = -1007
+
+def load_config(path=None):
+    config = dict(DEFAULTS)
+    if path:
+        with open(path, encoding='utf-8') as f:
+            config.update(json.load(f))
+    for field in REQUIRED_FIELDS + tuple(DEFAULTS):
+        value = os.environ.get(CONFIG_ENV_PREFIX + field.upper())
+        if value is not None:
+            config[field] = value
+    missing = [field for field in REQUIRED_FIELDS if config.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Eksik ayar: {', '.join(missing)}")
+    for field in DECIMAL_FIELDS:
+        config[field] = Decimal(str(config[field])) if config.get(field) not in (None, '') else None
+    for field in ('symbol', 'order_type', 'exit_mode', 'stop_mode'):
+        config[field] = str(config[field]).upper()
+
+    if config['order_type'] not in ('MARKET', 'LIMIT'):
+        raise ValueError(f"Geçersiz emir türü: {config['order_type']}")
+    if config['order_type'] == 'LIMIT' and config['limit_price'] is None:
+        raise ValueError("LIMIT emri için limit_price gerekli")
+    if config['exit_mode'] not in ('IZLEME', 'OCO'):
+        raise ValueError(f"Geçersiz çıkış yöntemi: {config['exit_mode']}")
+    if config['stop_mode'] not in EXIT_MODES:
+        raise ValueError(f"Geçersiz çıkış seviyesi modu: {config['stop_mode']}")
+    if config['stop_mode'] == 'ATR' and (config['profit_multiple'] is None or config['loss_multiple'] is None):
+        raise ValueError("ATR modu için profit_multiple ve loss_multiple gerekli")
+    return config
+
+# Filtreler önce exchangeInfo disk önbelleğinden alınır; önbellek yoksa ya da eskiyse yalnızca bu
+# sembol sorgulanır (tüm exchangeInfo birkaç MB'tır)
+def load_filters(client, symbol):
+    registry = SymbolRegistry(client, refresh_interval=0)
+    if not registry.needs_refresh():
+        filters = registry.get(symbol)
+        if filters is not None:
+            return filters
+    info = client.get_symbol_info(symbol)
+    if info is None:
+        raise ValueError(f"Symbol bilgisi bulunamadı: {symbol}")
+    return build_symbol_filters(compact_symbol(info))
+
+def free_balance(account, asset):
+    for balance in account['balances']:
+        if balance['asset'] == asset:
+            return Decimal(balance['free'])
+    return Decimal('0')
+
+# İlk emre kadar olan kısa yol: filtreler ve bakiye paralel alınır, piyasa alımı fiyat sorgusu
+# yapılmadan harcanacak tutarla (quoteOrderQty) verilir. Sonuç günlüğe yazılır; tam bot bu kayıttan
+# devam eder. Aşama süreleri (ms) döner.
+def enter_position(client, journal, ledger, config):
+    timings = {}
+    stage = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        filters_future = pool.submit(load_filters, client, config['symbol'])
+        account_future = pool.submit(client.get_account)
+        filters = filters_future.result()
+        account = account_future.result()
+    timings['hazirlik'] = (time.perf_counter() - stage) * 1000
+
+    min_notional = filters.min_notional if filters.min_notional is not None else DEFAULT_MIN_NOTIONAL
+    instrument = get_instrument(filters.step_size, filters.tick_size, min_notional)
+    allocation_percentage = config['allocation_percentage'] / Decimal('100')
+    allocation_amount = free_balance(account, filters.quote_asset) * allocation_percentage
+    if allocation_amount < min_notional:
+        raise ValueError(f"Alım için ayrılan miktar notional minimumun altında: {allocation_amount} < {min_notional}")
+
+    journal.reset(phase='entering', symbol=config['symbol'], profit_percentage=config['profit_percentage'],
+                  loss_percentage=config['loss_percentage'], order_type=config['order_type'],
+                  exit_mode=config['exit_mode'], stop_mode=config['stop_mode'],
+                  profit_multiple=config['profit_multiple'], loss_multiple=config['loss_multiple'],
+                  allocation_percentage=allocation_percentage)
+    ledger.begin(config['symbol'])
+
+    stage = time.perf_counter()
+    if config['order_type'] == 'MARKET':
+        quote_quantity = allocation_amount.quantize(QUOTE_PRECISION, rounding=ROUND_DOWN)
+        logging.info(f"Piyasa emriyle alım yapılıyor: {quote_quantity} {filters.quote_asset} {config['symbol']}")
+        # Emir gönderilmeden önce günlüğe yazılır; yanıt gelmeden çökülürse tam bot sonucu sorgular
+        client_order_id = journal_buy_order(journal, None)()
+        order = client.order_market_buy(symbol=config['symbol'], quoteOrderQty=f"{quote_quantity:f}",
+                                        newOrderRespType='FULL', newClientOrderId=client_order_id)
+        timings['emir'] = (time.perf_counter() - stage) * 1000
+        # Kullanıcı veri akışı henüz açık değil; dolumlar emir yanıtından deftere yazılır
+        ledger.record_order(order)
+        entry_price = summarize_order(order).vwap
+        if entry_price is None:
+            raise ValueError(f"Alım işlemi gerçekleşmedi: {order.get('status')}")
+        take_profit_price, stop_loss_price = exit_levels(entry_price, config['profit_percentage'],
+                                                         config['loss_percentage'], filters.tick_size)
+        journal_position(journal, entry_price, take_profit_price, stop_loss_price, 0)
+        logging.info(f"Alım işlemi başarılı: {entry_price} fiyatından alındı.")
+        print(f"Alım işlemi başarılı: {entry_price} fiyatından alındı.")
+    else:
+        price = instrument.round_price(config['limit_price'])
+        quantity = instrument.round_quantity(allocation_amount / price)
+        if quantity < filters.min_qty or not instrument.notional_ok(price, quantity):
+            raise ValueError(f"Limit alım miktarı filtrelerin altında: {quantity} @ {price}")
+        logging.info(f"Limit emriyle alım yapılıyor: {quantity} {config['symbol']} at {price}")
+        # Dolum beklemesi tam botta, günlükteki istemci emir numarasıyla yapılır
+        client_order_id = journal_buy_order(journal, price)()
+        order = client.order_limit_buy(symbol=config['symbol'], quantity=instrument.format_quantity(quantity),
+                                       price=instrument.format_price(price), newClientOrderId=client_order_id)
+        timings['emir'] = (time.perf_counter() - stage) * 1000
+        print(f"Limit emriyle {price} fiyatından alım emri verildi: {order['orderId']}")
+    return timings
+
+# Gönderilen emir için yalnızca kesin 4xx reddi emrin borsada olmadığını gösterir; zaman aşımı,
+# 5xx ya da yanıt işlenirken çıkan hatada emir dolmuş olabilir
+def order_rejected(error):
+    return (isinstance(error, RestAPIException) and 400 <= error.status_code < 500
+            and error.code != UNKNOWN_SEND_STATUS_CODE)
+
+# İlk emir başarısız oldu. Emir gönderilmeden önceki hatalarda dizi kapatılır; gönderildikten sonra
+# aşama olduğu gibi bırakılır, tam bot açılışta emri borsadan sorgular (resume_buy_order).
+def finish_failed_entry(journal, error):
+    phase = journal.snapshot().get('phase')
+    if phase in RESUME_PHASES and not (phase == 'buying' and order_rejected(error)):
+        logging.warning(f"Emrin sonucu belirsiz (aşama: {phase}); tam bot açılışta borsadan sorgulayacak.")
+        print(f"Emrin sonucu belirsiz (aşama: {phase}); tam bot açılışta borsadan sorgulayacak.")
+        return
+    journal.record('stopped', sync=True, phase='stopped')
+
+def main():
+    startup_ms = (time.perf_counter() - STARTED) * 1000
+    parser = argparse.ArgumentParser(description="Soru sormadan, ortam değişkenleri/ayar dosyasıyla çalışan hızlı başlangıç")
+    parser.add_argument('--config', default=os.environ.get(CONFIG_ENV_PREFIX + 'CONFIG'), help="JSON ayar dosyası")
+    parser.add_argument('--entry-only', action='store_true', help="İlk emirden sonra dur, tam botu başlatma")
+    args = parser.parse_args()
+
+    setup_logging()
+    api_key = os.environ.get('BINANCE_API_KEY')
+    api_secret = os.environ.get('BINANCE_API_SECRET')
+    if not api_key or not api_secret:
+        logging.error("BINANCE_API_KEY ve BINANCE_API_SECRET tanımlı olmalı.")
+        print("BINANCE_API_KEY ve BINANCE_API_SECRET tanımlı olmalı.")
+        sys.exit(1)
+
+    journal = StateJournal()
+    saved = journal.recover()
+    if saved.get('phase') in RESUME_PHASES:
+        # Yarım kalmış dizi varsa yeni emir verilmez, tam bot günlükten devam eder
+        logging.info(f"Kayıtlı işlem dizisi bulundu ({saved['symbol']}, aşama: {saved['phase']}), ilk emir atlanıyor.")
+        print(f"Kayıtlı işlem dizisi bulundu ({saved['symbol']}, aşama: {saved['phase']}), ilk emir atlanıyor.")
+    else:
+        try:
+            config = load_config(args.config)
+        except (OSError, ValueError, ArithmeticError) as e:
+            logging.error(f"Geçersiz ayar: {e}")
+            print(f"Geçersiz ayar: {e}")
+            sys.exit(1)
+        # BOT_API_URL (test ağı, sahte borsa) yalnızca hafif istemciyi etkiler; tam bot kendi uç noktalarını kullanır
+        client = RestClient(api_key, api_secret, api_url=os.environ.get(CONFIG_ENV_PREFIX + 'API_URL', API_URL))
+        journal.start()
+        ledger = Ledger().start()
+        try:
+            timings = enter_position(client, journal, ledger, config)
+        except RestAPIException as e:
+            logging.error(f"Binance API hatası: {e}")
+            print(f"Binance API hatası: {e}")
+            finish_failed_entry(journal, e)
+            sys.exit(1)
+        except Exception as e:
+            logging.error(f"Hata: {e}")
+            print(f"Hata: {e}")
+            finish_failed_entry(journal, e)
+            sys.exit(1)
+        finally:
+            journal.stop()
+            ledger.stop()
+        total_ms = (time.perf_counter() - STARTED) * 1000
+        summary = ", ".join(f"{name} {ms:.1f}" for name, ms in timings.items())
+        logging.info(f"Soğuk başlangıç → ilk emir: {total_ms:.1f} ms (başlangıç {startup_ms:.1f}, {summary})",
+                     extra={'event': 'cold_start', 'data': {'total_ms': total_ms, 'startup_ms': startup_ms, **timings}})
+        print(f"Soğuk başlangıç → ilk emir: {total_ms:.1f} ms (başlangıç {startup_ms:.1f}, {summary})")
+        if total_ms > COLD_START_TARGET_MS:
+            logging.warning(f"Soğuk başlangıç hedefi aşıldı: {total_ms:.1f} > {COLD_START_TARGET_MS} ms")
+
+    if args.entry_only:
+        return
+    # Tam bot (python-binance, WebSocket akışları, göstergeler) ancak ilk emirden sonra yüklenir
+    loaded = time.perf_counter()
+    import binance_bot
+    logging.info(f"Tam bot {(time.perf_counter() - loaded) * 1000:.0f} ms içinde yüklendi.")
+    binance_bot.main()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import math
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Tik başına O(1) güncellenen göstergeler. Geçmiş sabit kapasiteli NumPy halka tamponlarında tutulur;
+# kayan toplamlar düz float olarak taşınır, pencereden çıkan değer toplamdan düşülür. Float birikim
+# hatası, her `capacity` güncellemede bir tamponun tamamından yeniden toplanarak sıfırlanır
+# (amortize O(1)). Fiyatlar float'tır; emir fiyatına dönüştürme çağıranın işidir.
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Göstergeler için numpy gerekli: pip install numpy")
+
+
+# Sabit kapasiteli halka tampon. `width` verilirse her kayıt bir satırdır (ör. mum: zaman, açılış,
+# en yüksek, en düşük, kapanış, hacim). Tek boyutluysa dolu tampona eklemek çıkan değeri döner.
+class RingBuffer:
+    def __init__(self, capacity, width=None, dtype='float64'):
+        _require_numpy()
+        self.capacity = capacity
+        self.width = width
+        self.data = np.zeros(capacity if width is None else (capacity, width), dtype=dtype)
+        self.count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def full(self):
+        return self.count == self.capacity
+
+    def push(self, value):
+        evicted = None
+        if self.count == self.capacity:
+            if self.width is None:
+                evicted = self.data[self._next].item()
+        else:
+            self.count += 1
+        self.data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        return evicted
+
+    def last(self):
+        if not self.count:
+            return None
+        value = self.data[(self._next - 1) % self.capacity]
+        return value.item() if self.width is None else tuple(value.tolist())
+
+    # Eskiden yeniye kopya; yalnızca dışa aktarma ve yeniden toplama için
+    def values(self):
+        if self.count < self.capacity:
+            return self.data[:self.count].copy()
+        return np.concatenate((self.data[self._next:], self.data[:self._next]))
+
+
+class EMA:
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+
+    def update(self, value):
+        self.value = value if self.value is None else self.value + self.alpha * (value - self.value)
+        return self.value
+
+
+# Son `window` fiyatın hacim ağırlıklı ortalaması. bookTicker akışında hacim yoktur; qty=1 ile
+# tik ağırlıklı ortalamaya döner.
+class RollingVWAP:
+    def __init__(self, window):
+        self.prices = RingBuffer(window)
+        self.quantities = RingBuffer(window)
+        self._notional = 0.0
+        self._quantity = 0.0
+        self._updates = 0
+
+    def update(self, price, qty=1.0):
+        old_price = self.prices.push(price)
+        old_qty = self.quantities.push(qty)
+        self._notional += price * qty
+        self._quantity += qty
+        if old_qty is not None:
+            self._notional -= old_price * old_qty
+            self._quantity -= old_qty
+        self._updates += 1
+        if self._updates % self.prices.capacity == 0:
+            self._resum()
+        return self.value
+
+    def _resum(self):
+        prices = self.prices.data[:self.prices.count]
+        quantities = self.quantities.data[:self.quantities.count]
+        self._notional = float(np.dot(prices, quantities))
+        self._quantity = float(quantities.sum())
+
+    @property
+    def value(self):
+        return self._notional / self._quantity if self._quantity > 0 else None
+
+
+# Son `window` logaritmik getirinin örneklem standart sapması
+class RollingVolatility:
+    def __init__(self, window):
+        self.returns = RingBuffer(window)
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._prev = None
+        self._updates = 0
+
+    def update(self, price):
+        if self._prev is None or price <= 0:
+            self._prev = price
+            return None
+        ret = math.log(price / self._prev)
+        self._prev = price
+        evicted = self.returns.push(ret)
+        self._sum += ret
+        self._sumsq += ret * ret
+        if evicted is not None:
+            self._sum -= evicted
+            self._sumsq -= evicted * evicted
+        self._updates += 1
+        if self._updates % self.returns.capacity == 0:
+            returns = self.returns.data[:self.returns.count]
+            self._sum = float(returns.sum())
+            self._sumsq = float(np.dot(returns, returns))
+        return self.value
+
+    @property
+    def value(self):
+        n = self.returns.count
+        if n < 2:
+            return None
+        variance = (self._sumsq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+
+# Wilder ATR: ilk `period` mumun gerçek aralık ortalamasıyla başlar, sonra üssel yumuşatılır
+class ATR:
+    def __init__(self, period=14):
+        self.period = period
+        self.value = None
+        self._prev_close = None
+        self._seed_sum = 0.0
+        self._seed_count = 0
+
+    def update(self, high, low, close):
+        if self._prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        if self.value is None:
+            self._seed_sum += true_range
+            self._seed_count += 1
+            if self._seed_count == self.period:
+                self.value = self._seed_sum / self.period
+        else:
+            self.value += (true_range - self.value) / self.period
+        return self.value
+
+
+CANDLE_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+# İşlem/tiklerden `interval` saniyelik mumlar. Açık mum düz float'larda tutulur; aralık değişince
+# kapanan mum tampona yazılır ve döner. Hiç tik gelmeyen aralıklar için mum üretilmez.
+class CandleAggregator:
+    def __init__(self, interval=60, capacity=500):
+        self.interval = interval
+        self.candles = RingBuffer(capacity, width=len(CANDLE_FIELDS))
+        self.current = None
+
+    def update(self, price, qty, timestamp):
+        open_time = timestamp - timestamp % self.interval
+        current = self.current
+        if current is not None and open_time == current[0]:
+            if price > current[2]:
+                current[2] = price
+            elif price < current[3]:
+                current[3] = price
+            current[4] = price
+            current[5] += qty
+            return None
+        self.current = [open_time, price, price, price, price, qty]
+        if current is None:
+            return None
+        self.candles.push(current)
+        return current
+
+    # REST'ten gelen kapanmış mumlar (ör. başlangıçta ısınma için)
+    def add_closed(self, candle):
+        self.candles.push(candle)
+
+
+# Fiyat akışından beslenen gösterge seti. EMA ve VWAP her tikte, ATR ve oynaklık mum kapanışında
+# güncellenir (oynaklık, tik sıklığından bağımsız olsun diye mum kapanış getirilerinden hesaplanır).
+class IndicatorEngine:
+    def __init__(self, ema_periods=(20, 50), atr_period=14, vwap_window=500, volatility_window=30,
+                 candle_interval=60, candle_capacity=500):
+        _require_numpy()
+        self.emas = {period: EMA(period) for period in ema_periods}
+        self._ema_list = list(self.emas.values())
+        self.atr = ATR(atr_period)
+        self.vwap = RollingVWAP(vwap_window)
+        self.volatility = RollingVolatility(volatility_window)
+        self.candles = CandleAggregator(candle_interval, candle_capacity)
+        self.price = None
+
+    def update(self, price, qty=1.0, timestamp=None):
+        price = float(price)
+        for ema in self._ema_list:
+            ema.update(price)
+        self.vwap.update(price, qty)
+        candle = self.candles.update(price, qty, time.time() if timestamp is None else timestamp)
+        if candle is not None:
+            self._on_candle(candle)
+        self.price = price
+
+    def _on_candle(self, candle):
+        self.atr.update(candle[2], candle[3], candle[4])
+        self.volatility.update(candle[4])
+
+    # get_klines yanıtı: [açılış ms, açılış, en yüksek, en düşük, kapanış, hacim, ...]; son (açık) mum
+    # çağıran tarafından çıkarılmalıdır
+    def seed_klines(self, klines):
+        for kline in klines:
+            candle = [kline[0] / 1000, float(kline[1]), float(kline[2]), float(kline[3]), float(kline[4]),
+                      float(kline[5])]
+            self.candles.add_closed(candle)
+            self._on_candle(candle)
+
+    def ema(self, period):
+        return self.emas[period].value
+
+    def snapshot(self):
+        return {
+            'price': self.price,
+            'vwap': self.vwap.value,
+            'atr': self.atr.value,
+            'volatility': self.volatility.value,
+            **{f"ema{period}": ema.value for period, ema in self.emas.items()},
+        }
@@ -0,0 +1,131 @@
+from decimal import Decimal, ROUND_CEILING
+from functools import lru_cache
+
+# numpy yalnızca dizi fonksiyonlarında kullanılır ve ilk kullanımda yüklenir; tekil emir yolunu
+# kullanan hızlı başlangıç (headless) numpy'nin içe aktarma süresini ödemez
+np = None
+
+# Adım (step/tick) değerleri tam sayı olarak ölçeklenir: 0.001 adımı 3 basamak ölçekte 1 birimdir.
+# Yuvarlama ve karşılaştırmalar tam sayı aritmetiğiyle yapılır; sonuçlar Decimal ile
+# (value / step).to_integral_value(ROUND_DOWN) * step hesabıyla birebir aynıdır.
+@lru_cache(maxsize=None)
+def grid(step):
+    step = Decimal(step).normalize()
+    decimals = max(0, -step.as_tuple().exponent)
+    scale = 10 ** decimals
+    return decimals, scale, int(step * scale)
+
+def to_units(value, scale):
+    # int() sıfıra doğru keser, pozitif değerlerde ROUND_DOWN ile aynıdır
+    if type(value) is not Decimal:
+        value = Decimal(value)
+    return int(value * scale)
+
+def format_units(units, decimals):
+    if decimals == 0:
+        return str(units)
+    sign = '-' if units < 0 else ''
+    whole, frac = divmod(abs(units), 10 ** decimals)
+    return f"{sign}{whole}.{frac:0{decimals}d}"
+
+def floor_units(value, step):
+    decimals, scale, step_units = grid(step)
+    units = to_units(value, scale)
+    return units - units % step_units
+
+def floor_to_step(value, step):
+    decimals = grid(step)[0]
+    return Decimal(floor_units(value, step)).scaleb(-decimals)
+
+def format_on_step(value, step):
+    decimals = grid(step)[0]
+    return format_units(floor_units(value, step), decimals)
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("Vektörel yuvarlama için numpy gerekli: pip install numpy")
+        np = numpy
+
+# Dizi halindeki float değerleri adıma göre aşağı yuvarlar ve ölçekli int64 birimleri döner.
+# Float gösterim hatası (0.3 -> 0.29999...) yüzünden bir alt adıma düşmemek için
+# tam sayıya çok yakın değerler önce en yakın tam sayıya çekilir.
+def floor_units_array(values, step):
+    _require_numpy()
+    decimals, scale, step_units = grid(step)
+    scaled = np.asarray(values, dtype=np.float64) * scale
+    nearest = np.rint(scaled)
+    units = np.where(np.abs(scaled - nearest) < 1e-6, nearest, np.floor(scaled)).astype(np.int64)
+    return units - units % step_units
+
+def floor_to_step_array(values, step):
+    return floor_units_array(values, step) / grid(step)[1]
+
+
+# Sembol başına önceden derlenmiş yuvarlama/biçimlendirme bilgisi
+class Instrument:
+    __slots__ = ('step_size', 'tick_size', 'qty_decimals', 'qty_scale', 'step_units',
+                 'price_decimals', 'price_scale', 'tick_units', 'min_notional_units')
+
+    def __init__(self, step_size, tick_size, min_notional=Decimal('0')):
+        self.step_size = Decimal(step_size)
+        self.tick_size = Decimal(tick_size)
+        self.qty_decimals, self.qty_scale, self.step_units = grid(self.step_size)
+        self.price_decimals, self.price_scale, self.tick_units = grid(self.tick_size)
+        # Notional = fiyat birimi x miktar birimi, ölçek iki ölçeğin çarpımıdır
+        notional_scale = self.qty_scale * self.price_scale
+        min_notional = Decimal(min_notional) * notional_scale
+        self.min_notional_units = int(min_notional.to_integral_value(rounding=ROUND_CEILING))
+
+    @classmethod
+    def from_filters(cls, symbol_filters):
+        return cls(symbol_filters.step_size, symbol_filters.tick_size, symbol_filters.min_notional or Decimal('0'))
+
+    # Sıcak yolda çağrıldıkları için yardımcı fonksiyonlar burada satır içi yazıldı
+    def qty_units(self, quantity):
+        if type(quantity) is not Decimal:
+            quantity = Decimal(quantity)
+        units = int(quantity * self.qty_scale)
+        return units - units % self.step_units
+
+    def price_units(self, price):
+        if type(price) is not Decimal:
+            price = Decimal(price)
+        units = int(price * self.price_scale)
+        return units - units % self.tick_units
+
+    def round_quantity(self, quantity):
+        return Decimal(self.qty_units(quantity)).scaleb(-self.qty_decimals)
+
+    def round_price(self, price):
+        return Decimal(self.price_units(price)).scaleb(-self.price_decimals)
+
+    def format_quantity(self, quantity):
+        units = self.qty_units(quantity)
+        if self.qty_decimals == 0:
+            return str(units)
+        whole, frac = divmod(units, self.qty_scale)
+        return f"{whole}.{frac:0{self.qty_decimals}d}"
+
+    def format_price(self, price):
+        units = self.price_units(price)
+        if self.price_decimals == 0:
+            return str(units)
+        whole, frac = divmod(units, self.price_scale)
+        return f"{whole}.{frac:0{self.price_decimals}d}"
+
+    def notional_ok(self, price, quantity):
+        return self.price_units(price) * self.qty_units(quantity) >= self.min_notional_units
+
+    def round_prices(self, prices):
+        return floor_to_step_array(prices, self.tick_size)
+
+    def round_quantities(self, quantities):
+        return floor_to_step_array(quantities, self.step_size)
+
+@lru_cache(maxsize=1024)
+def get_instrument(step_size, tick_size, min_notional=Decimal('0')):
+    return Instrument(step_size, tick_size, min_notional)
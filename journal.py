@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from decimal import Decimal
+
+STATE_JOURNAL_FILE = 'trading_state.jsonl'
+STATE_SNAPSHOT_FILE = 'trading_state.snapshot.json'
+# Kayıtlar bu süre boyunca biriktirilip tek yazma + fsync ile diske iner (saniye)
+FLUSH_INTERVAL = 0.05
+# Bu kadar kayıttan sonra durumun tamamı anlık görüntüye yazılır ve günlük boşaltılır
+SNAPSHOT_EVERY = 500
+# Yazma hatasında biriken kayıtlar bu aralıkla yeniden denenir (saniye)
+WRITE_RETRY_DELAY = 1.0
+# Günlükte bu aşamalardan birinde kalmış işlem dizisine yeniden başlatmada devam edilir
+RESUME_PHASES = ('buying', 'holding', 'sold')
+# Kayıt alanı olmayan üst bilgiler
+RECORD_META = ('seq', 'time', 'type')
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"JSON'a çevrilemeyen değer: {value!r}")
+
+def _dumps(value):
+    return json.dumps(value, default=_encode, separators=(',', ':'))
+
+# Kayıt alanları duruma yazılır; 'reset' kaydı önceki durumu siler. Decimal'ler diske metin olarak
+# yazılır, geri yüklenen durumda Decimal(...) ile çevrilmelidir.
+def apply_record(state, record):
+    if record['type'] == 'reset':
+        state.clear()
+    for key, value in record.items():
+        if key not in RECORD_META:
+            state[key] = value
+    state['updated'] = record['time']
+
+# Alım emri gönderilmeden önce, emirde kullanılacak istemci emir numarasıyla (newClientOrderId)
+# kaydedilir; emir gönderilirken çökülürse sonucu bu numarayla sorgulanabilir. Numarayı döner.
+# Aynı alım yeni fiyata taşınırsa (cancelReplace) her çağrı yeni numara üretir; client_order_ids
+# tüm numaraları tutar, placed_at ilk emrin zamanı olarak kalır.
+def journal_buy_order(journal, buy_price, hit_stop=None):
+    client_order_ids = []
+    placed_at = time.time()
+    def on_submit():
+        client_order_id = f"bot-{uuid.uuid4().hex[:28]}"
+        client_order_ids.append(client_order_id)
+        journal.record('buy_order', sync=True, phase='buying', client_order_id=client_order_id,
+                       client_order_ids=list(client_order_ids), buy_price=buy_price, hit_stop=hit_stop,
+                       placed_at=placed_at)
+        return client_order_id
+    return on_submit
+
+def journal_position(journal, entry_price, take_profit_price, stop_loss_price, current_loss_count, legs=None):
+    journal.record('position', sync=True, phase='holding', entry_price=entry_price, take_profit_price=take_profit_price,
+                   stop_loss_price=stop_loss_price, current_loss_count=current_loss_count, legs=legs)
+
+
+# Durum geçişlerinin yalnızca eklenen günlüğü. record() durumu bellekte hemen günceller, satırı
+# kuyruğa koyar; yazıcı iş parçacığı biriken satırları tek seferde yazıp fsync eder (grup commit).
+# sync=True olan kayıt diske inene kadar bekler, beklerken biriktirme süresi kısaltılır.
+# Yazma başarısız olursa kayıtlar kuyruğa geri konur ve yeniden denenir; senkron bekleyen, kayıt
+# diske inmeden dönmez. Günlük SNAPSHOT_EVERY kayıtta bir anlık görüntüye katlanır: görüntü geçici dosyaya yazılıp
+# os.replace ile atomik değiştirilir, ardından günlük boşaltılır. Bu ikisi arasında çökülürse
+# görüntüdeki sıra numarasına kadarki kayıtlar açılışta atlanır.
+class StateJournal:
+    def __init__(self, path=STATE_JOURNAL_FILE, snapshot_path=STATE_SNAPSHOT_FILE,
+                 flush_interval=FLUSH_INTERVAL, snapshot_every=SNAPSHOT_EVERY):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self.state = {}
+        self.seq = 0
+        self._pending = []
+        self._durable = 0
+        self._urgent = False
+        self._since_snapshot = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._file = None
+        self._thread = None
+
+    # Anlık görüntü + ardından gelen kayıtlarla durumu kurar. Çökmede yarım kalmış son satır
+    # kesilip atılır ki sonraki kayıtlar bozuk satırın arkasına eklenmesin.
+    def recover(self):
+        state, seq = {}, 0
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            state, seq = snapshot['state'], snapshot['seq']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Durum görüntüsü okunamadı, yalnızca günlük kullanılacak: {e}")
+
+        replayed = 0
+        try:
+            with open(self.path, 'rb') as f:
+                good_end = 0
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_end += len(line)
+                    if record['seq'] <= seq:
+                        continue
+                    apply_record(state, record)
+                    seq = record['seq']
+                    replayed += 1
+                if good_end < f.seek(0, os.SEEK_END):
+                    logging.warning(f"Durum günlüğünün yarım kalmış sonu atıldı: {self.path}")
+                    os.truncate(self.path, good_end)
+        except FileNotFoundError:
+            pass
+
+        with self._cond:
+            self.state, self.seq, self._durable = state, seq, seq
+            self._since_snapshot = replayed
+        return dict(state)
+
+    def start(self):
+        # Tamponsuz: yarım kalan yazma, hatada dosya sonundan kesilip atılabilsin
+        self._file = open(self.path, 'ab', buffering=0)
+        self._thread = threading.Thread(target=self._writer, name="state-journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        with self._cond:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+
+    def record(self, kind, sync=False, **fields):
+        with self._cond:
+            self.seq += 1
+            seq = self.seq
+            record = {'seq': seq, 'time': time.time(), 'type': kind, **fields}
+            apply_record(self.state, record)
+            self._pending.append(_dumps(record).encode('utf-8') + b'\n')
+            if sync:
+                self._urgent = True
+            self._cond.notify_all()
+            if sync and self._thread is not None:
+                self._cond.wait_for(lambda: self._durable >= seq or self._stopped)
+                if self._durable < seq:
+                    raise OSError(f"Durum kaydı diske yazılamadı: {kind}")
+        return seq
+
+    # Yeni işlem dizisi: önceki durum silinir
+    def reset(self, **fields):
+        return self.record('reset', sync=True, **fields)
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.state)
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stopped)
+                if not self._pending:
+                    return
+                # İlk kayıttan sonra kısa süre daha biriktir; senkron bekleyen varsa hemen yaz
+                self._cond.wait_for(lambda: self._urgent or self._stopped, self.flush_interval)
+                batch, self._pending = self._pending, []
+                self._urgent = False
+                seq = self.seq
+                self._since_snapshot += len(batch)
+                state = dict(self.state) if self._since_snapshot >= self.snapshot_every else None
+            try:
+                self._append(b''.join(batch))
+            except OSError as e:
+                with self._cond:
+                    self._pending[:0] = batch
+                    self._since_snapshot -= len(batch)
+                    if self._stopped:
+                        logging.error(f"Durum günlüğü yazılamadı, {len(self._pending)} kayıt kaydedilemedi: {e}")
+                        self._cond.notify_all()
+                        return
+                    logging.error(f"Durum günlüğü yazılamadı, tekrar denenecek: {e}")
+                    self._cond.wait_for(lambda: self._stopped, WRITE_RETRY_DELAY)
+                continue
+            if state is not None:
+                try:
+                    self._write_snapshot(state, seq)
+                except OSError as e:
+                    # Kayıtlar günlükte duruyor; görüntü bir sonraki turda tekrar denenir
+                    logging.error(f"Durum görüntüsü yazılamadı: {e}")
+                    state = None
+            with self._cond:
+                self._durable = seq
+                if state is not None:
+                    self._since_snapshot = 0
+                self._cond.notify_all()
+
+    def _append(self, data):
+        start = self._file.seek(0, os.SEEK_END)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view):]
+            os.fsync(self._file.fileno())
+        except OSError:
+            try:
+                self._file.truncate(start)
+            except OSError:
+                pass
+            raise
+
+    # Günlüğe yalnızca bu iş parçacığı yazar; kuyruktaki yeni kayıtlar henüz dosyada olmadığı için
+    # görüntüden sonra günlüğün tamamı silinebilir
+    def _write_snapshot(self, state, seq):
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(_dumps({'seq': seq, 'time': time.time(), 'state': state}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._file.truncate(0)
+        os.fsync(self._file.fileno())
@@ -0,0 +1,501 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import sqlite3
+import argparse
+import threading
+from decimal import Decimal
+from datetime import datetime, timezone
+from fills import FINAL_ORDER_STATUSES
+
+LEDGER_FILE = 'trading_ledger.db'
+# Yazıcı iş parçacığının tek işlemde (transaction) uyguladığı en fazla kayıt
+MAX_BATCH = 500
+# Veritabanı açılamaz ya da kilitli kalırsa toplu yazma bu aralıkla yeniden denenir (saniye)
+WRITE_RETRY_DELAY = 1.0
+# Tek bir kaydın hatası; yalnızca o kayıt atlanır. Kilit/disk hataları (OperationalError) tüm
+# toplu yazmayı yeniden denetir.
+ITEM_ERRORS = (sqlite3.IntegrityError, ArithmeticError, ValueError, TypeError, KeyError)
+ZERO = Decimal('0')
+ONE = Decimal('1')
+
+# fills: borsadaki her dolum (komisyonuyla), sembol + işlem numarasıyla tekil.
+# trips: bir alım ile onu kapatan satış arasındaki tur; dizinin ilk turu 'entry', sonrakiler 'reentry'.
+# daily_pnl / symbol_pnl: tur kapanırken artımlı güncellenen özetler; raporlar ham dolumları taramaz.
+# Tutarlar Decimal metni, zamanlar borsa zamanı (ms) olarak saklanır.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sequences (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    started INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sequences_symbol ON sequences (symbol, id);
+
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    order_id INTEGER NOT NULL,
+    trade_id INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    side TEXT NOT NULL,
+    price TEXT NOT NULL,
+    qty TEXT NOT NULL,
+    commission TEXT NOT NULL,
+    commission_asset TEXT,
+    trip_id INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS fills_trade ON fills (symbol, trade_id);
+CREATE INDEX IF NOT EXISTS fills_order ON fills (symbol, order_id);
+CREATE INDEX IF NOT EXISTS fills_time ON fills (symbol, time);
+
+CREATE TABLE IF NOT EXISTS trips (
+    id INTEGER PRIMARY KEY,
+    sequence_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    opened INTEGER NOT NULL,
+    closed INTEGER,
+    entry_qty TEXT NOT NULL DEFAULT '0',
+    entry_quote TEXT NOT NULL DEFAULT '0',
+    exit_qty TEXT NOT NULL DEFAULT '0',
+    exit_quote TEXT NOT NULL DEFAULT '0',
+    fees TEXT NOT NULL DEFAULT '0',
+    pnl TEXT
+);
+CREATE INDEX IF NOT EXISTS trips_symbol ON trips (symbol, closed);
+CREATE INDEX IF NOT EXISTS trips_closed ON trips (closed);
+CREATE INDEX IF NOT EXISTS trips_sequence ON trips (sequence_id);
+
+CREATE TABLE IF NOT EXISTS daily_pnl (
+    symbol TEXT NOT NULL,
+    day TEXT NOT NULL,
+    trips INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    reentries INTEGER NOT NULL,
+    gross_pnl TEXT NOT NULL,
+    fees TEXT NOT NULL,
+    net_pnl TEXT NOT NULL,
+    peak TEXT NOT NULL,
+    low TEXT NOT NULL,
+    drawdown TEXT NOT NULL,
+    PRIMARY KEY (symbol, day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS daily_fees (
+    symbol TEXT NOT NULL,
+    day TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (symbol, day, asset)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS symbol_pnl (
+    symbol TEXT PRIMARY KEY,
+    trips INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    reentries INTEGER NOT NULL,
+    gross_pnl TEXT NOT NULL,
+    fees TEXT NOT NULL,
+    net_pnl TEXT NOT NULL,
+    peak TEXT NOT NULL,
+    max_drawdown TEXT NOT NULL,
+    first_closed INTEGER NOT NULL,
+    last_closed INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+def connect(path=LEDGER_FILE):
+    db = sqlite3.connect(path, timeout=30)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+def _day(timestamp):
+    return datetime.fromtimestamp(timestamp / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+def _decimals(row, names):
+    return [Decimal(row[name]) if row is not None else ZERO for name in names]
+
+# Komisyon kote varlıktaysa olduğu gibi, baz varlıktaysa dolum fiyatıyla çevrilip tura yazılır.
+# Başka bir varlıkla (ör. BNB) ödenen komisyon kar/zarara katılmaz, yalnızca daily_fees'te görünür.
+def _fee_in_quote(symbol, asset, commission, price):
+    if not asset or not commission:
+        return ZERO
+    if symbol.endswith(asset):
+        return commission
+    if symbol.startswith(asset):
+        return commission * price
+    return ZERO
+
+def begin_sequence(db, symbol, timestamp):
+    return db.execute("INSERT INTO sequences (symbol, started) VALUES (?, ?)", (symbol, timestamp)).lastrowid
+
+def _open_trip(db, symbol):
+    return db.execute("SELECT * FROM trips WHERE symbol = ? AND closed IS NULL ORDER BY id DESC LIMIT 1",
+                      (symbol,)).fetchone()
+
+# Sembolün son işlem dizisinde kaydedilmiş dolumlar ve dizinin başlangıcı (ms). Yeniden başlatılan
+# strateji pozisyonunu bunlardan ve borsadaki sonraki dolumlardan kurar.
+def sequence_fills(db, symbol):
+    row = db.execute("SELECT started FROM sequences WHERE symbol = ? ORDER BY id DESC LIMIT 1", (symbol,)).fetchone()
+    if row is None:
+        return None, []
+    fills = db.execute("SELECT * FROM fills WHERE symbol = ? AND time >= ? ORDER BY trade_id",
+                       (symbol, row['started'])).fetchall()
+    return row['started'], fills
+
+def _new_trip(db, symbol, timestamp):
+    sequence_id = db.execute("SELECT max(id) FROM sequences WHERE symbol = ?", (symbol,)).fetchone()[0]
+    if sequence_id is None:
+        sequence_id = begin_sequence(db, symbol, timestamp)
+    first = db.execute("SELECT 1 FROM trips WHERE sequence_id = ? LIMIT 1", (sequence_id,)).fetchone() is None
+    trip_id = db.execute("INSERT INTO trips (sequence_id, symbol, kind, opened) VALUES (?, ?, ?, ?)",
+                         (sequence_id, symbol, 'entry' if first else 'reentry', timestamp)).lastrowid
+    return db.execute("SELECT * FROM trips WHERE id = ?", (trip_id,)).fetchone()
+
+# Dolumu açık tura ekler; açık tur yoksa alım yeni tur açar, satış tursuz kaydedilir (ör. bot
+# dışında alınmış bakiyenin satışı). Daha önce kaydedilmiş dolum atlanır, None döner.
+def add_fill(db, symbol, order_id, trade_id, timestamp, side, price, qty, commission, commission_asset):
+    if db.execute("SELECT 1 FROM fills WHERE symbol = ? AND trade_id = ?", (symbol, trade_id)).fetchone():
+        return None
+    price, qty, commission = Decimal(price), Decimal(qty), Decimal(commission)
+    trip = _open_trip(db, symbol)
+    if trip is None and side == 'BUY':
+        trip = _new_trip(db, symbol, timestamp)
+    trip_id = None
+    if trip is not None:
+        trip_id = trip['id']
+        qty_column, quote_column = ('entry_qty', 'entry_quote') if side == 'BUY' else ('exit_qty', 'exit_quote')
+        trip_qty, trip_quote, fees = _decimals(trip, (qty_column, quote_column, 'fees'))
+        fees += _fee_in_quote(symbol, commission_asset, commission, price)
+        db.execute(f"UPDATE trips SET {qty_column} = ?, {quote_column} = ?, fees = ? WHERE id = ?",
+                   (str(trip_qty + qty), str(trip_quote + price * qty), str(fees), trip_id))
+    db.execute("INSERT INTO fills (symbol, order_id, trade_id, time, side, price, qty, commission, commission_asset, trip_id) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+               (symbol, order_id, trade_id, timestamp, side, str(price), str(qty), str(commission), commission_asset, trip_id))
+    if commission and commission_asset:
+        day = _day(timestamp)
+        row = db.execute("SELECT amount FROM daily_fees WHERE symbol = ? AND day = ? AND asset = ?",
+                         (symbol, day, commission_asset)).fetchone()
+        db.execute("INSERT OR REPLACE INTO daily_fees (symbol, day, asset, amount) VALUES (?, ?, ?, ?)",
+                   (symbol, day, commission_asset, str(_decimals(row, ('amount',))[0] + commission)))
+    return trip_id
+
+# Satış emri sonuçlanınca açık tur kapanır. Kar/zarar, satılan miktarın alım maliyetine göre
+# hesaplanır (baz varlıkla ödenen alım komisyonu yüzünden satılan miktar biraz azdır).
+# Emir bu turun satışlarından biri değilse (geç gelen eski olay) hiçbir şey yapılmaz.
+def close_trip(db, symbol, order_id, side, timestamp):
+    if side != 'SELL':
+        return None
+    trip = _open_trip(db, symbol)
+    if trip is None or Decimal(trip['exit_qty']) == 0:
+        return None
+    if not db.execute("SELECT 1 FROM fills WHERE symbol = ? AND order_id = ? AND trip_id = ? LIMIT 1",
+                      (symbol, order_id, trip['id'])).fetchone():
+        return None
+    entry_qty, entry_quote, exit_qty, exit_quote, fees = _decimals(
+        trip, ('entry_qty', 'entry_quote', 'exit_qty', 'exit_quote', 'fees'))
+    sold = min(exit_qty / entry_qty, ONE) if entry_qty else ONE
+    gross = exit_quote - entry_quote * sold
+    pnl = gross - fees
+    db.execute("UPDATE trips SET closed = ?, pnl = ? WHERE id = ?", (timestamp, str(pnl), trip['id']))
+    _roll_up(db, symbol, timestamp, trip['kind'], gross, fees, pnl)
+    return pnl
+
+# Günlük satırda gün içi birikimli net kar/zararın en yüksek/en düşük değeri ve gün içi en büyük
+# düşüş tutulur; tarih aralığı raporunda düşüş bu üçünden tur düzeyinde kesin olarak birleştirilir.
+def _roll_up(db, symbol, timestamp, kind, gross, fees, pnl):
+    win = 1 if pnl > 0 else 0
+    reentry = 1 if kind == 'reentry' else 0
+    day = _day(timestamp)
+    row = db.execute("SELECT * FROM daily_pnl WHERE symbol = ? AND day = ?", (symbol, day)).fetchone()
+    day_gross, day_fees, net, peak, low, drawdown = _decimals(row, ('gross_pnl', 'fees', 'net_pnl', 'peak', 'low', 'drawdown'))
+    net += pnl
+    peak, low = max(peak, net), min(low, net)
+    drawdown = max(drawdown, peak - net)
+    db.execute("INSERT OR REPLACE INTO daily_pnl (symbol, day, trips, wins, reentries, gross_pnl, fees, net_pnl, peak, low, drawdown) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+               (symbol, day, (row['trips'] if row else 0) + 1, (row['wins'] if row else 0) + win,
+                (row['reentries'] if row else 0) + reentry, str(day_gross + gross), str(day_fees + fees),
+                str(net), str(peak), str(low), str(drawdown)))
+
+    row = db.execute("SELECT * FROM symbol_pnl WHERE symbol = ?", (symbol,)).fetchone()
+    total_gross, total_fees, equity, peak, max_drawdown = _decimals(row, ('gross_pnl', 'fees', 'net_pnl', 'peak', 'max_drawdown'))
+    equity += pnl
+    peak = max(peak, equity)
+    max_drawdown = max(max_drawdown, peak - equity)
+    db.execute("INSERT OR REPLACE INTO symbol_pnl (symbol, trips, wins, reentries, gross_pnl, fees, net_pnl, peak, max_drawdown, first_closed, last_closed) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+               (symbol, (row['trips'] if row else 0) + 1, (row['wins'] if row else 0) + win,
+                (row['reentries'] if row else 0) + reentry, str(total_gross + gross), str(total_fees + fees),
+                str(equity), str(peak), str(max_drawdown), row['first_closed'] if row else timestamp, timestamp))
+
+
+# Kullanıcı veri akışındaki dolumları ve REST emir yanıtlarını SQLite defterine yazar. Olay
+# işleyicisi yalnızca kuyruğa ekler; veritabanına tek bir yazıcı iş parçacığı toplu işlemlerle yazar,
+# işlem döngüsü diske hiç beklemez. Her kayıt kendi SAVEPOINT'inde uygulanır: hatalı kayıt tek başına
+# atlanır. Veritabanı açılamaz ya da kilitli kalırsa (ör. aynı dosyayı paylaşan işçi süreçler) kayıtlar
+# kuyrukta bekler ve toplu yazma yeniden denenir. Bot kapalıyken gerçekleşen dolumlar deftere girmez.
+class Ledger:
+    def __init__(self, path=LEDGER_FILE):
+        self.path = path
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def attach(self, user_stream):
+        user_stream.subscribe('executionReport', self._on_execution_report)
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._writer, name="ledger", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    # Kuyruktaki kayıtlar yazıldıktan sonra döner; yazma hâlâ başarısızsa bir deneme daha yapılıp
+    # kalan kayıtlar atılır
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    # Yeni işlem dizisi; sembolün bundan sonraki ilk turu 'entry', sonrakiler 'reentry' sayılır
+    def begin(self, symbol):
+        self._queue.put(('begin', symbol.upper(), _now_ms()))
+
+    # FULL emir yanıtı; aynı dolumlar akıştan da gelirse işlem numarasıyla tekilleştirilir
+    def record_order(self, order):
+        timestamp = order.get('transactTime') or _now_ms()
+        for fill in order.get('fills') or ():
+            self._queue.put(('fill', order['symbol'], order['orderId'], fill['tradeId'], timestamp, order['side'],
+                             fill['price'], fill['qty'], fill['commission'], fill.get('commissionAsset')))
+        if order.get('status') in FINAL_ORDER_STATUSES:
+            self._queue.put(('done', order['symbol'], order['orderId'], order['side'], timestamp))
+
+    def _on_execution_report(self, msg):
+        if msg['x'] == 'TRADE':
+            self._queue.put(('fill', msg['s'], msg['i'], msg['t'], msg['T'], msg['S'], msg['L'], msg['l'], msg['n'], msg['N']))
+        if msg['X'] in FINAL_ORDER_STATUSES:
+            self._queue.put(('done', msg['s'], msg['i'], msg['S'], msg['T']))
+
+    def _next_batch(self):
+        items = [self._queue.get()]
+        while items[-1] is not None and len(items) < MAX_BATCH:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _writer(self):
+        db = None
+        items, last = [], False
+        while True:
+            if not items:
+                items = self._next_batch()
+                last = items[-1] is None
+                if last:
+                    items.pop()
+            try:
+                if db is None:
+                    db = connect(self.path)
+                    db.isolation_level = None
+                closed = self._apply_batch(db, items)
+            except sqlite3.Error as e:
+                if self._stopping.is_set():
+                    logging.error(f"İşlem defterine yazılamadı, {len(items) + self._queue.qsize()} kayıt atıldı: {e}")
+                    break
+                logging.error(f"İşlem defterine yazılamadı, tekrar denenecek: {e}")
+                self._stopping.wait(WRITE_RETRY_DELAY)
+                continue
+            for symbol, order_id, pnl in closed:
+                logging.info(f"Tur kapandı ({symbol}): net kar/zarar {pnl:f}",
+                             extra={'event': 'trip_closed', 'data': {'symbol': symbol, 'order_id': order_id, 'pnl': str(pnl)}})
+            items = []
+            if last:
+                break
+        if db is not None:
+            db.close()
+
+    # Tek işlem, kayıt başına bir SAVEPOINT. Kapanan turları (sembol, emir, kar/zarar) döner.
+    def _apply_batch(self, db, items):
+        closed = []
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for item in items:
+                db.execute("SAVEPOINT item")
+                try:
+                    pnl = self._apply(db, item)
+                except ITEM_ERRORS as e:
+                    db.execute("ROLLBACK TO item")
+                    logging.error(f"İşlem defteri kaydı atlandı ({item[0]} {item[1:3]}): {e}")
+                    pnl = None
+                db.execute("RELEASE item")
+                if pnl is not None:
+                    closed.append((item[1], item[2], pnl))
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        return closed
+
+    def _apply(self, db, item):
+        kind = item[0]
+        if kind == 'fill':
+            add_fill(db, *item[1:])
+        elif kind == 'done':
+            return close_trip(db, *item[1:])
+        else:
+            begin_sequence(db, *item[1:])
+        return None
+
+
+# Tarih aralığı verilmezse sembol özetleri olduğu gibi döner; verilirse günlük satırlar birleştirilir.
+# Aralık günleri UTC'dir ve her iki uç dahildir.
+def report(db, symbol=None, since=None, until=None):
+    if since is None and until is None:
+        query, params = "SELECT * FROM symbol_pnl", ()
+        if symbol:
+            query, params = query + " WHERE symbol = ?", (symbol,)
+        return [{'symbol': row['symbol'], 'trips': row['trips'], 'wins': row['wins'], 'reentries': row['reentries'],
+                 'gross_pnl': Decimal(row['gross_pnl']), 'fees': Decimal(row['fees']), 'net_pnl': Decimal(row['net_pnl']),
+                 'max_drawdown': Decimal(row['max_drawdown'])}
+                for row in db.execute(query + " ORDER BY symbol", params)]
+
+    totals = {}
+    for row in daily_rows(db, symbol, since, until):
+        total = totals.get(row['symbol'])
+        if total is None:
+            total = totals[row['symbol']] = {'symbol': row['symbol'], 'trips': 0, 'wins': 0, 'reentries': 0,
+                                             'gross_pnl': ZERO, 'fees': ZERO, 'net_pnl': ZERO, 'max_drawdown': ZERO,
+                                             'peak': ZERO}
+        start = total['net_pnl']
+        net, peak, low, drawdown = _decimals(row, ('net_pnl', 'peak', 'low', 'drawdown'))
+        # Önceki günlerin zirvesinden bu günün en düşüğüne ya da gün içindeki düşüş
+        total['max_drawdown'] = max(total['max_drawdown'], drawdown, total['peak'] - (start + low))
+        total['peak'] = max(total['peak'], start + peak)
+        total['net_pnl'] = start + net
+        total['trips'] += row['trips']
+        total['wins'] += row['wins']
+        total['reentries'] += row['reentries']
+        total['gross_pnl'] += Decimal(row['gross_pnl'])
+        total['fees'] += Decimal(row['fees'])
+    for total in totals.values():
+        del total['peak']
+    return list(totals.values())
+
+def _range_query(table, symbol, since, until, columns='*'):
+    conditions, params = [], []
+    if symbol:
+        conditions.append("symbol = ?")
+        params.append(symbol)
+    if since:
+        conditions.append("day >= ?")
+        params.append(since)
+    if until:
+        conditions.append("day <= ?")
+        params.append(until)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {columns} FROM {table}{where} ORDER BY symbol, day", params
+
+def daily_rows(db, symbol=None, since=None, until=None):
+    query, params = _range_query('daily_pnl', symbol, since, until)
+    return db.execute(query, params).fetchall()
+
+# {sembol: {varlık: toplam komisyon}}
+def fees_by_asset(db, symbol=None, since=None, until=None):
+    query, params = _range_query('daily_fees', symbol, since, until, 'symbol, asset, amount')
+    fees = {}
+    for row in db.execute(query, params):
+        assets = fees.setdefault(row['symbol'], {})
+        assets[row['asset']] = assets.get(row['asset'], ZERO) + Decimal(row['amount'])
+    return fees
+
+def recent_trips(db, symbol=None, limit=20):
+    if symbol:
+        return db.execute("SELECT * FROM trips WHERE symbol = ? AND closed IS NOT NULL ORDER BY closed DESC LIMIT ?",
+                          (symbol, limit)).fetchall()
+    return db.execute("SELECT * FROM trips WHERE closed IS NOT NULL ORDER BY closed DESC LIMIT ?", (limit,)).fetchall()
+
+def _parse_day(value):
+    datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+def _print_report(db, args):
+    rows = report(db, args.symbol, args.since, args.until)
+    fees = fees_by_asset(db, args.symbol, args.since, args.until)
+    if not rows:
+        print("Kapanmış işlem bulunamadı.")
+        return
+    print(f"{'Sembol':<12}{'Tur':>7}{'Kazanma':>9}{'Y.alım':>8}{'Brüt':>16}{'Komisyon':>14}{'Net':>16}{'En büyük düşüş':>16}")
+    for row in rows:
+        win_rate = row['wins'] / row['trips'] * 100 if row['trips'] else 0
+        print(f"{row['symbol']:<12}{row['trips']:>7}{win_rate:>8.1f}%{row['reentries']:>8}{row['gross_pnl']:>16.4f}"
+              f"{row['fees']:>14.4f}{row['net_pnl']:>16.4f}{row['max_drawdown']:>16.4f}")
+        assets = fees.get(row['symbol'])
+        if assets:
+            print("    Komisyon (varlık bazında): " + ", ".join(f"{asset} {amount:f}" for asset, amount in sorted(assets.items())))
+    if args.daily:
+        print()
+        print(f"{'Gün':<12}{'Sembol':<12}{'Tur':>6}{'Kazanan':>9}{'Net':>16}{'Gün içi düşüş':>16}")
+        for row in daily_rows(db, args.symbol, args.since, args.until):
+            print(f"{row['day']:<12}{row['symbol']:<12}{row['trips']:>6}{row['wins']:>9}"
+                  f"{Decimal(row['net_pnl']):>16.4f}{Decimal(row['drawdown']):>16.4f}")
+
+def _print_trips(db, args):
+    rows = recent_trips(db, args.symbol, args.limit)
+    if not rows:
+        print("Kapanmış işlem bulunamadı.")
+        return
+    print(f"{'Kapanış (UTC)':<21}{'Sembol':<12}{'Tür':<9}{'Miktar':>16}{'Alış':>14}{'Satış':>14}{'Net':>14}")
+    for row in rows:
+        entry_qty, entry_quote, exit_qty, exit_quote = _decimals(row, ('entry_qty', 'entry_quote', 'exit_qty', 'exit_quote'))
+        closed = datetime.fromtimestamp(row['closed'] / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        entry_price = entry_quote / entry_qty if entry_qty else ZERO
+        exit_price = exit_quote / exit_qty if exit_qty else ZERO
+        print(f"{closed:<21}{row['symbol']:<12}{row['kind']:<9}{exit_qty:>16f}{entry_price:>14.6f}"
+              f"{exit_price:>14.6f}{Decimal(row['pnl']):>14.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="İşlem defteri: kar/zarar, kazanma oranı, komisyon ve düşüş raporları")
+    parser.add_argument('--db', default=LEDGER_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = commands.add_parser('report', help="Sembol başına kar/zarar özeti")
+    report_parser.add_argument('--symbol', type=str.upper, default=None)
+    report_parser.add_argument('--since', type=_parse_day, default=None, help="Başlangıç günü (YYYY-AA-GG, UTC)")
+    report_parser.add_argument('--until', type=_parse_day, default=None, help="Bitiş günü, dahil (YYYY-AA-GG, UTC)")
+    report_parser.add_argument('--daily', action='store_true', help="Günlük satırları da yazdır")
+
+    trips_parser = commands.add_parser('trips', help="Son kapanan alım-satım turları")
+    trips_parser.add_argument('--symbol', type=str.upper, default=None)
+    trips_parser.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        print(f"İşlem defteri bulunamadı: {args.db}")
+        sys.exit(1)
+    db = connect(args.db)
+    started = time.perf_counter()
+    if args.command == 'report':
+        _print_report(db, args)
+    else:
+        _print_trips(db, args)
+    print(f"Sorgu süresi: {(time.perf_counter() - started) * 1000:.1f} ms")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+LOG_FILE = 'trading_bot.log'
+EVENT_LOG_FILE = 'trading_events.jsonl'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Her fiyat tikinin loglanması yerine varsayılan olarak 10 tikte bir ya da 5 saniyede bir
+TICK_LOG_EVERY = 10
+TICK_LOG_INTERVAL = 5
+
+TICK_LOGGER = logging.getLogger('tick')
+
+# Kuyruk doluysa kayıt beklemeden atılır: disk yavaşlasa da işlem döngüsü hiç bloklanmaz.
+# Mesaj biçimlendirme (%-argümanlar) dinleyici iş parçacığında yapılır.
+class DropQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Her kayıt tek satır JSON; `extra={'event': ..., 'data': {...}}` ile yapılandırılmış alan eklenir
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        event = getattr(record, 'event', None)
+        if event is not None:
+            entry['event'] = event
+        data = getattr(record, 'data', None)
+        if data is not None:
+            entry['data'] = data
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# `every` çağrıdan birini ya da en az `interval` saniyede bir çağrıyı geçirir. log_tick bunu
+# LogRecord oluşturulmadan önce sorar; atılan tikler için kayıt nesnesi hiç yaratılmaz.
+class TickSampler:
+    def __init__(self, every=TICK_LOG_EVERY, interval=TICK_LOG_INTERVAL):
+        self.every = every
+        self.interval = interval
+        self._count = 0
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def sample(self):
+        now = time.monotonic()
+        with self._lock:
+            self._count += 1
+            if self._count >= self.every or now - self._last >= self.interval:
+                self._count = 0
+                self._last = now
+                return True
+        return False
+
+
+# Yalnızca `console=True` ile işaretlenmiş kayıtlar ekrana yazılır (print'in yerine)
+class ConsoleFilter(logging.Filter):
+    def filter(self, record):
+        return getattr(record, 'console', False)
+
+
+class LogPipeline:
+    def __init__(self, handler, listener):
+        self.handler = handler
+        self.listener = listener
+        self._stopped = False
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        self.listener.stop()
+        if self.handler.dropped:
+            sys.stderr.write(f"Log kuyruğu dolduğu için {self.handler.dropped} kayıt atıldı.\n")
+
+_pipeline = None
+_tick_sampler = TickSampler()
+
+# Kök logger'a kuyruk işleyicisi bağlar; dosya yazımı ayrı bir iş parçacığında yapılır.
+# Metin logu boyuta göre, JSONL olay logu zamana göre döndürülür.
+def setup_logging(log_file=LOG_FILE, event_file=EVENT_LOG_FILE, level=logging.INFO,
+                  max_bytes=20 * 1024 * 1024, backup_count=5, event_rotate_when='midnight',
+                  queue_size=10000, tick_every=TICK_LOG_EVERY, tick_interval=TICK_LOG_INTERVAL,
+                  console=True):
+    global _pipeline, _tick_sampler
+    if _pipeline is not None:
+        return _pipeline
+
+    text_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    text_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [text_handler]
+    if event_file:
+        event_handler = TimedRotatingFileHandler(event_file, when=event_rotate_when, backupCount=backup_count,
+                                                 encoding='utf-8')
+        event_handler.setFormatter(JsonFormatter())
+        handlers.append(event_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter('%(message)s'))
+        console_handler.addFilter(ConsoleFilter())
+        handlers.append(console_handler)
+
+    handler = DropQueueHandler(queue.Queue(queue_size))
+    listener = QueueListener(handler.queue, *handlers, respect_handler_level=True)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(handler)
+    _tick_sampler = TickSampler(tick_every, tick_interval)
+    listener.start()
+
+    _pipeline = LogPipeline(handler, listener)
+    atexit.register(_pipeline.stop)
+    return _pipeline
+
+# Sıcak döngüdeki fiyat logu: örneklenir, biçimlendirme ve yazma dinleyici tarafında yapılır
+def log_tick(symbol, price):
+    if TICK_LOGGER.isEnabledFor(logging.INFO) and _tick_sampler.sample():
+        TICK_LOGGER.info("Güncel fiyat: %s", price,
+                         extra={'event': 'tick', 'data': {'symbol': symbol, 'price': price}, 'console': True})
+
+# print + logging çiftinin yerine: kayıt hem loga hem ekrana gider. %-argümanlar dinleyici
+# iş parçacığında biçimlendirilir, ekrana yazma da orada yapılır; işlem döngüsü stdout'ta beklemez.
+def log_status(level, msg, *args):
+    logging.log(level, msg, *args, extra={'console': True})
@@ -0,0 +1,289 @@
+import os
+import io
+import json
+import time
+import logging
+import zipfile
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+
+MARKET_DATA_ROOT = 'market_data'
+
+AGGTRADES_SCHEMA = {
+    'agg_id': '<i8',
+    'time': '<i8',
+    'price': '<f8',
+    'qty': '<f8',
+    'is_buyer_maker': '|u1',
+}
+KLINES_SCHEMA = {
+    'time': '<i8',
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'volume': '<f8',
+}
+# Sıralı ve tekrarsız tutulan anahtar sütun; artımlı eşitlemede bunun üzerinden devam edilir
+KEY_COLUMNS = {'aggtrades': 'agg_id', 'klines': 'time'}
+# Bellekte biriktirilip tek seferde diske eklenecek satır sayısı
+SYNC_BATCH_ROWS = 200000
+
+# Sembol ve veri seti başına, sütun başına bir dosyadan oluşan yalnızca-eklemeli depo.
+# Dosyalar ham little-endian dizilerdir; meta.json içindeki satır sayısı "işlenmiş" boyu
+# gösterir, böylece yarım kalan bir yazma okuyuculara hiç görünmez. Okumalar np.memmap
+# üzerinden kopyasızdır; zaman aralığı sorguları searchsorted ile dilim döner.
+class ColumnStore:
+    def __init__(self, root, symbol, dataset):
+        self.kind = 'klines' if dataset.startswith('klines') else 'aggtrades'
+        self.schema = KLINES_SCHEMA if self.kind == 'klines' else AGGTRADES_SCHEMA
+        self.key = KEY_COLUMNS[self.kind]
+        self.path = os.path.join(root, symbol.upper(), dataset)
+        self._meta_path = os.path.join(self.path, 'meta.json')
+        self._columns = {}
+        self._columns_count = -1
+        os.makedirs(self.path, exist_ok=True)
+        self.count = self._read_count()
+        self._truncate_uncommitted()
+
+    def _read_count(self):
+        try:
+            with open(self._meta_path, encoding='utf-8') as f:
+                return json.load(f)['count']
+        except FileNotFoundError:
+            return 0
+
+    # Sütunun ham dosyası; yalnızca ilk count satırı işlenmiştir (sweep işçileri doğrudan memmap eder)
+    def column_path(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    # Önceki bir çökmeden kalan, meta dosyasına işlenmemiş baytları at
+    def _truncate_uncommitted(self):
+        for name, dtype in self.schema.items():
+            path = self.column_path(name)
+            size = self.count * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def column(self, name):
+        if self._columns_count != self.count:
+            self._columns = {}
+            self._columns_count = self.count
+        array = self._columns.get(name)
+        if array is None:
+            dtype = np.dtype(self.schema[name])
+            if self.count == 0:
+                array = np.empty(0, dtype=dtype)
+            else:
+                array = np.memmap(self.column_path(name), dtype=dtype, mode='r', shape=(self.count,))
+            self._columns[name] = array
+        return array
+
+    def last(self, name):
+        return self.column(name)[-1] if self.count else None
+
+    def append(self, columns):
+        keys = np.asarray(columns[self.key], dtype=self.schema[self.key])
+        if keys.size == 0:
+            return 0
+        # Daha önce yazılmış satırları atla (eşitleme tekrar çalıştırılabilir olsun)
+        last_key = self.last(self.key)
+        start = 0 if last_key is None else int(np.searchsorted(keys, last_key, side='right'))
+        if start >= keys.size:
+            return 0
+        for name, dtype in self.schema.items():
+            data = np.ascontiguousarray(np.asarray(columns[name])[start:], dtype=dtype)
+            with open(self.column_path(name), 'ab') as f:
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        count = self.count + keys.size - start
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'count': count, 'schema': self.schema}, f)
+        os.replace(tmp_path, self._meta_path)
+        self.count = count
+        return keys.size - start
+
+    def search(self, start_time=None, end_time=None):
+        times = self.column('time')
+        lo = 0 if start_time is None else int(np.searchsorted(times, start_time, side='left'))
+        hi = self.count if end_time is None else int(np.searchsorted(times, end_time, side='left'))
+        return lo, hi
+
+    # [start_time, end_time) aralığındaki satırlar; dönen diziler memmap dilimleridir
+    def range(self, start_time=None, end_time=None, columns=None):
+        lo, hi = self.search(start_time, end_time)
+        return {name: self.column(name)[lo:hi] for name in (columns or self.schema)}
+
+    def window(self, seconds, now=None):
+        now = int(time.time() * 1000) if now is None else now
+        return self.range(now - seconds * 1000, None)
+
+def open_store(symbol, dataset, root=MARKET_DATA_ROOT):
+    return ColumnStore(root, symbol, dataset)
+
+# backtest.run_backtest girdileriyle aynı sözlük biçimi
+def load_backtest_arrays(symbol, dataset, start_time=None, end_time=None, root=MARKET_DATA_ROOT):
+    store = open_store(symbol, dataset, root)
+    data = store.range(start_time, end_time)
+    if store.kind == 'klines':
+        return {'timestamps': data['time'], 'opens': data['open'], 'highs': data['high'],
+                'lows': data['low'], 'prices': data['close']}
+    return {'timestamps': data['time'], 'prices': data['price']}
+
+# Yeni spot dökümlerinde zaman damgaları mikrosaniyedir; depo ve backtest CSV okuyucuları
+# zamanları milisaniyeye indirmek için bunu kullanır
+def normalize_ms(times):
+    times = np.asarray(times, dtype=np.int64)
+    if times.size and times[0] > 10 ** 14:
+        times = times // 1000
+    return times
+
+def _aggtrade_columns(trades):
+    return {
+        'agg_id': np.fromiter((t['a'] for t in trades), dtype=np.int64, count=len(trades)),
+        'time': normalize_ms(np.fromiter((t['T'] for t in trades), dtype=np.int64, count=len(trades))),
+        'price': np.fromiter((float(t['p']) for t in trades), dtype=np.float64, count=len(trades)),
+        'qty': np.fromiter((float(t['q']) for t in trades), dtype=np.float64, count=len(trades)),
+        'is_buyer_maker': np.fromiter((t['m'] for t in trades), dtype=np.uint8, count=len(trades)),
+    }
+
+def _kline_columns(klines):
+    data = np.array([k[:6] for k in klines], dtype=np.float64).reshape(-1, 6)
+    return {
+        'time': normalize_ms(data[:, 0].astype(np.int64)),
+        'open': data[:, 1], 'high': data[:, 2], 'low': data[:, 3], 'close': data[:, 4], 'volume': data[:, 5],
+    }
+
+# Son kayıtlı aggTrade kimliğinden itibaren yalnızca yeni işlemleri indirir
+def sync_aggtrades(client, symbol, start_time=None, root=MARKET_DATA_ROOT, limit=1000):
+    store = open_store(symbol, 'aggtrades', root)
+    last_id = store.last('agg_id')
+    if last_id is not None:
+        params = {'fromId': int(last_id) + 1}
+    elif start_time is not None:
+        params = {'startTime': start_time, 'endTime': start_time + 3600 * 1000}
+    else:
+        params = {}
+
+    added = 0
+    buffer = []
+    while True:
+        trades = client.get_aggregate_trades(symbol=symbol, limit=limit, **params)
+        if not trades:
+            if 'startTime' in params and params['startTime'] < time.time() * 1000:
+                # Bu saatte işlem yoksa bir sonraki saate geç
+                params = {'startTime': params['endTime'], 'endTime': params['endTime'] + 3600 * 1000}
+                continue
+            break
+        buffer.extend(trades)
+        # Saatlik pencerenin kısa sayfası yalnızca o saatin sessiz geçtiğini gösterir; fromId ile
+        # ilerlerken kısa sayfa ise borsadaki son işleme yetişildiği anlamına gelir
+        caught_up = 'fromId' in params and len(trades) < limit
+        params = {'fromId': trades[-1]['a'] + 1}
+        if len(buffer) >= SYNC_BATCH_ROWS:
+            added += store.append(_aggtrade_columns(buffer))
+            buffer = []
+        if caught_up:
+            break
+    if buffer:
+        added += store.append(_aggtrade_columns(buffer))
+    logging.info(f"{symbol} aggTrades eşitlendi: {added} yeni satır, toplam {store.count}")
+    return added
+
+# Yalnızca kapanmış mumlar eklenir; sonraki eşitleme son mumun ardından devam eder
+def sync_klines(client, symbol, interval='1m', start_time=None, root=MARKET_DATA_ROOT, limit=1000):
+    store = open_store(symbol, f"klines_{interval}", root)
+    last_time = store.last('time')
+    start = int(last_time) + 1 if last_time is not None else (start_time or 0)
+    now = client.get_server_time()['serverTime']
+
+    added = 0
+    buffer = []
+    while True:
+        klines = client.get_klines(symbol=symbol, interval=interval, startTime=start, limit=limit)
+        closed = [k for k in klines if k[6] < now]
+        buffer.extend(closed)
+        if len(buffer) >= SYNC_BATCH_ROWS:
+            added += store.append(_kline_columns(buffer))
+            buffer = []
+        if len(closed) < limit:
+            break
+        start = klines[-1][0] + 1
+    if buffer:
+        added += store.append(_kline_columns(buffer))
+    logging.info(f"{symbol} {interval} mumları eşitlendi: {added} yeni satır, toplam {store.count}")
+    return added
+
+def _open_csv(path):
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            return io.StringIO(archive.read(archive.namelist()[0]).decode('utf-8'))
+    return open(path, encoding='utf-8')
+
+# data.binance.vision üzerindeki CSV/ZIP dökümlerini ağ bağlantısı olmadan içe aktarır
+def import_csv(symbol, path, dataset, root=MARKET_DATA_ROOT):
+    store = open_store(symbol, dataset, root)
+    with _open_csv(path) as f:
+        first = f.readline()
+        f.seek(0)
+        header = 0 if first.split(',')[0].strip().isdigit() else 1
+        if store.kind == 'klines':
+            data = np.loadtxt(f, delimiter=',', usecols=(0, 1, 2, 3, 4, 5), skiprows=header, ndmin=2)
+            columns = {
+                'time': normalize_ms(data[:, 0].astype(np.int64)),
+                'open': data[:, 1], 'high': data[:, 2], 'low': data[:, 3], 'close': data[:, 4], 'volume': data[:, 5],
+            }
+        else:
+            data = np.loadtxt(f, delimiter=',', usecols=(0, 1, 2, 5, 6), skiprows=header, ndmin=2,
+                              converters={6: lambda v: 1.0 if v.strip().lower() in ('true', b'true') else 0.0})
+            columns = {
+                'agg_id': data[:, 0].astype(np.int64),
+                'time': normalize_ms(data[:, 3].astype(np.int64)),
+                'price': data[:, 1], 'qty': data[:, 2],
+                'is_buyer_maker': data[:, 4].astype(np.uint8),
+            }
+    added = store.append(columns)
+    print(f"{path}: {added} satır eklendi, toplam {store.count}")
+    logging.info(f"{path}: {added} satır eklendi, toplam {store.count}")
+    return added
+
+def _parse_date(value):
+    return int(datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel geçmiş piyasa verisi deposu")
+    parser.add_argument('--root', default=MARKET_DATA_ROOT)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sync = commands.add_parser('sync', help="Binance'ten yeni verileri indir")
+    sync.add_argument('symbol')
+    sync.add_argument('--aggtrades', action='store_true')
+    sync.add_argument('--klines', metavar='INTERVAL', default=None, help="örn. 1m, 1s")
+    sync.add_argument('--since', default=None, help="Boş depo için başlangıç tarihi (YYYY-AA-GG)")
+
+    imp = commands.add_parser('import', help="CSV/ZIP dökümünü içe aktar")
+    imp.add_argument('symbol')
+    imp.add_argument('files', nargs='+')
+    imp.add_argument('--dataset', default='aggtrades', help="aggtrades veya klines_<interval>")
+
+    args = parser.parse_args()
+    symbol = args.symbol.upper()
+    if args.command == 'import':
+        for path in sorted(args.files):
+            import_csv(symbol, path, args.dataset, args.root)
+        return
+
+    from binance.client import Client
+    client = Client()
+    since = _parse_date(args.since) if args.since else None
+    if args.aggtrades:
+        print(f"aggTrades: {sync_aggtrades(client, symbol, since, args.root)} yeni satır")
+    if args.klines:
+        print(f"{args.klines} mumları: {sync_klines(client, symbol, args.klines, since, args.root)} yeni satır")
+
+if __name__ == "__main__":
+    main()
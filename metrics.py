@@ -0,0 +1,290 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from binance.exceptions import BinanceAPIException
+from rate_limiter import WRAPPED_PREFIXES
+
+# Histogram mikro saniye çözünürlükle kayıt tutar. 128'e kadar değerler tam, üstü her ikinin
+# kuvveti aralığında 64 alt kovaya bölünür (HDR histogram benzeri, göreli hata < %1.6).
+SUB_BUCKET_BITS = 7
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS >> 1
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+METRICS_TEXTFILE = 'trading_bot.prom'
+
+def _bucket_index(value):
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (value >> shift) - HALF_SUB_BUCKETS
+
+def _bucket_value(index):
+    if index < SUB_BUCKETS:
+        return index
+    shift, offset = divmod(index - SUB_BUCKETS, HALF_SUB_BUCKETS)
+    shift += 1
+    low = (offset + HALF_SUB_BUCKETS) << shift
+    # Kovanın orta noktası
+    return low + (1 << (shift - 1))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = _bucket_index(int(seconds * 1e6))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_value(index) / 1e6, self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+# Sayaç, gösterge ve gecikme histogramlarının tek kayıt defteri
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self._counters), ('gauge', self._gauges)):
+                for name in sorted({n for n, _ in series}):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (n, key), value in sorted(series.items()):
+                        if n == name:
+                            lines.append(f"{name}{_format_labels(key)} {value}")
+            for name in sorted({n for n, _ in self._histograms}):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} summary")
+                for (n, key), histogram in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    for q in SUMMARY_QUANTILES:
+                        lines.append(f"{name}{_format_labels(key, [('quantile', q)])} {histogram.quantile(q):.6f}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def summary_lines(self):
+        lines = []
+        with self._lock:
+            for (name, key), histogram in sorted(self._histograms.items()):
+                labels = ','.join(f"{k}={v}" for k, v in key)
+                lines.append(f"{name}[{labels}] n={histogram.count} ort={histogram.mean() * 1000:.2f}ms "
+                             f"p50={histogram.quantile(0.5) * 1000:.2f}ms p99={histogram.quantile(0.99) * 1000:.2f}ms "
+                             f"max={histogram.max * 1000:.2f}ms")
+            for (name, key), value in sorted(self._counters.items()):
+                labels = ','.join(f"{k}={v}" for k, v in key)
+                lines.append(f"{name}[{labels}] {value}")
+        return lines
+
+METRICS = Metrics()
+METRICS.describe('binance_request_seconds', 'REST isteği süresi')
+METRICS.describe('binance_requests_total', 'REST isteği sayısı')
+METRICS.describe('binance_errors_total', 'Hata ile biten REST istekleri')
+METRICS.describe('binance_used_weight_1m', 'Sunucunun bildirdiği 1 dakikalık istek ağırlığı')
+METRICS.describe('binance_order_count_10s', 'Sunucunun bildirdiği 10 saniyelik emir sayısı')
+METRICS.describe('stage_seconds', 'Strateji aşaması süresi')
+
+
+def _record_response(metrics, response):
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return
+    weight = headers.get('x-mbx-used-weight-1m')
+    if weight is not None:
+        metrics.set_gauge('binance_used_weight_1m', int(weight))
+    orders = headers.get('x-mbx-order-count-10s')
+    if orders is not None:
+        metrics.set_gauge('binance_order_count_10s', int(orders))
+
+
+# python-binance Client'ı saran vekil: her REST çağrısının süresi, sonucu ve ağırlık kullanımı kaydedilir.
+# ScheduledClient'ın içine konursa yalnızca ağ süresi ölçülür, her tekrar deneme ayrı sayılır.
+class InstrumentedClient:
+    def __init__(self, client, metrics=METRICS):
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, 'metrics', metrics)
+
+    def __setattr__(self, name, value):
+        setattr(self._client, name, value)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not name.startswith(WRAPPED_PREFIXES):
+            return attr
+
+        def call(*args, **params):
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **params)
+            except BinanceAPIException as e:
+                self._record(name, start, 'error', e.code, e.response)
+                raise
+            except Exception:
+                self._record(name, start, 'error', 'network', None)
+                raise
+            self._record(name, start, 'ok', None, self._client.response)
+            return result
+        return call
+
+    def _record(self, method, start, status, code, response):
+        self.metrics.observe('binance_request_seconds', time.perf_counter() - start, method=method)
+        self.metrics.inc('binance_requests_total', method=method, status=status)
+        if code is not None:
+            self.metrics.inc('binance_errors_total', method=method, code=code)
+        _record_response(self.metrics, response)
+
+
+class AsyncInstrumentedClient(InstrumentedClient):
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not name.startswith(WRAPPED_PREFIXES):
+            return attr
+
+        async def call(*args, **params):
+            start = time.perf_counter()
+            try:
+                result = await attr(*args, **params)
+            except BinanceAPIException as e:
+                self._record(name, start, 'error', e.code, e.response)
+                raise
+            except Exception:
+                self._record(name, start, 'error', 'network', None)
+                raise
+            self._record(name, start, 'ok', None, self._client.response)
+            return result
+        return call
+
+
+def write_textfile(metrics, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(metrics.render_prometheus())
+    os.replace(tmp_path, path)
+
+def start_http_server(metrics, port, host='127.0.0.1'):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logging.info(f"Metrikler http://{host}:{port}/metrics adresinde")
+    return server
+
+
+# Belirli aralıklarla textfile'ı yazar ve özet satırlarını loga ekler
+class MetricsReporter:
+    def __init__(self, metrics=METRICS, textfile=METRICS_TEXTFILE, interval=60, port=None):
+        self.metrics = metrics
+        self.textfile = textfile
+        self.interval = interval
+        self.port = port
+        self._server = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.port:
+            self._server = start_http_server(self.metrics, self.port)
+        self._thread = threading.Thread(target=self._run, name='metrics-reporter', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+        self.report()
+
+    def report(self):
+        if self.textfile:
+            try:
+                write_textfile(self.metrics, self.textfile)
+            except OSError as e:
+                logging.error(f"Metrik dosyası yazılamadı: {e}")
+        for line in self.metrics.summary_lines():
+            logging.info(f"Metrik: {line}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
@@ -0,0 +1,1317 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import struct
+import socket
+import hashlib
+import logging
+import argparse
+import itertools
+import threading
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from collections import namedtuple
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Yerel sahte borsa: botun kullandığı spot REST uçları, piyasa akışları (bookTicker, aggTrade,
+# depth) ve kullanıcı veri akışı (WebSocket API aboneliği) tek bir portta sunulur. Fiyatlar
+# betiklenmiş bir yoldan adım adım gelir; emirler basit bir eşleştirme motorunda dolar.
+# Gecikme, 5xx hataları, 429 ve kısmi dolumlar ayarlanabilir.
+#
+#   python mock_exchange.py serve --port 8800
+#   python mock_exchange.py run binance_bot --balance USDT=1000 < cevaplar.txt
+#   python mock_exchange.py check
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+ZERO = Decimal('0')
+EIGHT_DECIMALS = Decimal('0.00000001')
+OPEN_STATUSES = ('NEW', 'PARTIALLY_FILLED')
+STOP_TYPES = ('STOP_LOSS_LIMIT', 'TAKE_PROFIT_LIMIT')
+LIMIT_TYPES = ('LIMIT', 'LIMIT_MAKER') + STOP_TYPES
+ORDER_ROUTES = ('order', 'orderList/oco', 'order/cancelReplace')
+KNOWN_QUOTES = ('USDT', 'USDC', 'FDUSD', 'TRY', 'BTC', 'ETH', 'BNB')
+# Gerçek borsadaki istek ağırlıkları; listede olmayanlar 1 sayılır
+PATH_WEIGHTS = {
+    'exchangeInfo': 20, 'account': 20, 'myTrades': 20, 'allOrders': 20,
+    'openOrders': 6, 'ticker/price': 2, 'ticker/bookTicker': 2, 'avgPrice': 2,
+}
+
+SymbolSpec = namedtuple('SymbolSpec', 'symbol base_asset quote_asset tick_size step_size min_qty min_notional')
+
+
+class MockError(Exception):
+    def __init__(self, status, code, msg, data=None, headers=None):
+        super().__init__(msg)
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.data = data
+        self.headers = headers or {}
+
+    def body(self):
+        body = {'code': self.code, 'msg': self.msg}
+        if self.data is not None:
+            body['data'] = self.data
+        return body
+
+
+def _fmt(value):
+    return f"{value:.8f}"
+
+def _floor(value, step):
+    return (value / step).to_integral_value(rounding=ROUND_DOWN) * step
+
+def _round(value, step):
+    return (value / step).to_integral_value(rounding=ROUND_HALF_UP) * step
+
+def _decimal_param(params, name, required=True):
+    value = params.get(name)
+    if value in (None, ''):
+        if required:
+            raise MockError(400, -1102, f"Mandatory parameter '{name}' was not sent, was empty/null, or malformed.")
+        return None
+    try:
+        return Decimal(value)
+    except ArithmeticError:
+        raise MockError(400, -1100, f"Illegal characters found in parameter '{name}'.")
+
+def _stop_triggered(side, stop_price, last):
+    return last <= stop_price if side == 'SELL' else last >= stop_price
+
+def request_weight(method, route, params):
+    if route == 'depth':
+        limit = int(params.get('limit', 100))
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    if method == 'GET' and route == 'order':
+        return 4
+    return PATH_WEIGHTS.get(route, 1)
+
+def make_symbol(symbol, tick_size, step_size, min_qty=None, min_notional=Decimal('5'), base_asset=None, quote_asset=None):
+    symbol = symbol.upper()
+    if base_asset is None or quote_asset is None:
+        quote_asset = next((q for q in KNOWN_QUOTES if symbol.endswith(q) and symbol != q), None)
+        if quote_asset is None:
+            raise ValueError(f"Sembolün varlıkları belirlenemedi: {symbol}")
+        base_asset = symbol[:-len(quote_asset)]
+    return SymbolSpec(symbol, base_asset, quote_asset, Decimal(tick_size), Decimal(step_size),
+                      Decimal(min_qty) if min_qty is not None else Decimal(step_size), Decimal(min_notional))
+
+def symbol_info(spec):
+    return {
+        'symbol': spec.symbol,
+        'status': 'TRADING',
+        'baseAsset': spec.base_asset,
+        'baseAssetPrecision': 8,
+        'quoteAsset': spec.quote_asset,
+        'quotePrecision': 8,
+        'quoteAssetPrecision': 8,
+        'orderTypes': ['LIMIT', 'LIMIT_MAKER', 'MARKET', 'STOP_LOSS_LIMIT', 'TAKE_PROFIT_LIMIT'],
+        'icebergAllowed': False,
+        'ocoAllowed': True,
+        'otoAllowed': False,
+        'quoteOrderQtyMarketAllowed': True,
+        'allowTrailingStop': False,
+        'cancelReplaceAllowed': True,
+        'amendAllowed': True,
+        'isSpotTradingAllowed': True,
+        'isMarginTradingAllowed': False,
+        'filters': [
+            {'filterType': 'PRICE_FILTER', 'minPrice': _fmt(spec.tick_size), 'maxPrice': '1000000.00000000',
+             'tickSize': _fmt(spec.tick_size)},
+            {'filterType': 'LOT_SIZE', 'minQty': _fmt(spec.min_qty), 'maxQty': '9000000.00000000',
+             'stepSize': _fmt(spec.step_size)},
+            {'filterType': 'NOTIONAL', 'minNotional': _fmt(spec.min_notional), 'applyMinToMarket': True,
+             'maxNotional': '9000000.00000000', 'applyMaxToMarket': False, 'avgPriceMins': 5},
+            {'filterType': 'MAX_NUM_ORDERS', 'maxNumOrders': 200},
+            {'filterType': 'MAX_NUM_ALGO_ORDERS', 'maxNumAlgoOrders': 5},
+        ],
+        'permissions': [],
+        'permissionSets': [['SPOT']],
+        'defaultSelfTradePreventionMode': 'EXPIRE_MAKER',
+        'allowedSelfTradePreventionModes': ['NONE', 'EXPIRE_TAKER', 'EXPIRE_MAKER', 'EXPIRE_BOTH'],
+    }
+
+# Tekrarlanabilir rastgele yürüyüş: `steps` adet fiyat
+def random_walk(start, steps, volatility=0.001, seed=None):
+    rng = random.Random(seed)
+    price = float(start)
+    prices = []
+    for _ in range(steps):
+        price *= 1 + rng.gauss(0, volatility)
+        prices.append(price)
+    return prices
+
+
+class Order:
+    def __init__(self, order_id, client_order_id, spec, side, order_type, quantity, price, stop_price,
+                 time_in_force, list_id, now):
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        self.spec = spec
+        self.symbol = spec.symbol
+        self.side = side
+        self.type = order_type
+        self.orig_qty = quantity
+        self.price = price or ZERO
+        self.stop_price = stop_price or ZERO
+        self.time_in_force = time_in_force
+        self.list_id = list_id
+        self.executed_qty = ZERO
+        self.quote_qty = ZERO
+        self.status = 'NEW'
+        self.time = self.update_time = now
+        self.working = order_type not in STOP_TYPES
+        self.working_time = now if self.working else -1
+        self.fills = []
+        # [varlık, miktar]: emir için kilitlenen bakiye; OCO bacakları aynı listeyi paylaşır
+        self.reserve = None
+
+    @property
+    def remaining(self):
+        return self.orig_qty - self.executed_qty
+
+    @property
+    def is_open(self):
+        return self.status in OPEN_STATUSES
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'orderId': self.order_id,
+            'orderListId': self.list_id,
+            'clientOrderId': self.client_order_id,
+            'price': _fmt(self.price),
+            'origQty': _fmt(self.orig_qty),
+            'executedQty': _fmt(self.executed_qty),
+            'cummulativeQuoteQty': _fmt(self.quote_qty),
+            'status': self.status,
+            'timeInForce': self.time_in_force,
+            'type': self.type,
+            'side': self.side,
+            'stopPrice': _fmt(self.stop_price),
+            'icebergQty': _fmt(ZERO),
+            'time': self.time,
+            'updateTime': self.update_time,
+            'isWorking': self.working,
+            'workingTime': self.working_time,
+            'origQuoteOrderQty': _fmt(ZERO),
+            'selfTradePreventionMode': 'EXPIRE_MAKER',
+        }
+
+
+# Sunucu tarafı WebSocket bağlantısı (RFC 6455): maskesiz metin çerçeveleri gönderir,
+# istemcinin ping'lerine pong döner. Sıkıştırma ve uzantılar desteklenmez.
+class WebSocketConnection:
+    def __init__(self, sock, rfile):
+        self.sock = sock
+        self.rfile = rfile
+        self.combined = False
+        self.closed = False
+        self._send_lock = threading.Lock()
+
+    def _send_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        with self._send_lock:
+            if self.closed:
+                return False
+            try:
+                self.sock.sendall(header + payload)
+            except OSError:
+                self.closed = True
+                return False
+        return True
+
+    def send_json(self, message):
+        return self._send_frame(0x1, json.dumps(message).encode('utf-8'))
+
+    def _read(self, size):
+        data = self.rfile.read(size)
+        if len(data) < size:
+            raise ConnectionError("WebSocket bağlantısı kapandı")
+        return data
+
+    # Sıradaki metin mesajını döner; bağlantı kapandıysa None
+    def recv(self):
+        message = b''
+        while True:
+            first, second = self._read(2)
+            opcode = first & 0x0f
+            length = second & 0x7f
+            if length == 126:
+                length = struct.unpack('!H', self._read(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', self._read(8))[0]
+            mask = self._read(4) if second & 0x80 else None
+            payload = self._read(length)
+            if mask:
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+            if opcode == 0x8:
+                self._send_frame(0x8, payload[:2])
+                self.closed = True
+                return None
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            message += payload
+            if first & 0x80:
+                return message.decode('utf-8')
+
+    def close(self):
+        self._send_frame(0x8, struct.pack('!H', 1000))
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def _make_handler(exchange):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _handle(self, method):
+            parts = urlsplit(self.path)
+            params = dict(parse_qsl(parts.query, keep_blank_values=True))
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                params.update(parse_qsl(self.rfile.read(length).decode('utf-8'), keep_blank_values=True))
+            status, payload, headers = exchange.handle_request(method, parts.path, params)
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json;charset=UTF-8')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.headers.get('Upgrade', '').lower() == 'websocket':
+                self._websocket()
+            else:
+                self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+        def do_PUT(self):
+            self._handle('PUT')
+
+        def do_DELETE(self):
+            self._handle('DELETE')
+
+        def _websocket(self):
+            key = self.headers.get('Sec-WebSocket-Key', '')
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode('ascii')).digest()).decode('ascii')
+            self.send_response(101, 'Switching Protocols')
+            self.send_header('Upgrade', 'websocket')
+            self.send_header('Connection', 'Upgrade')
+            self.send_header('Sec-WebSocket-Accept', accept)
+            self.end_headers()
+            self.close_connection = True
+            exchange.serve_websocket(WebSocketConnection(self.connection, self.rfile), self.path)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class MockExchange:
+    def __init__(self, symbols, prices, balances=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, weight_limit=6000, order_limit=50, partial_fill=None,
+                 fee=Decimal('0.001'), depth_levels=20, depth_notional=Decimal('1000'),
+                 tick_interval=0.1, loop=False, clock_skew_ms=0, seed=None):
+        self.symbols = {spec.symbol: spec for spec in symbols}
+        self.paths = {symbol: [Decimal(str(p)) for p in path] for symbol, path in prices.items()}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.weight_limit = weight_limit
+        self.order_limit = order_limit
+        self.partial_fill = Decimal(str(partial_fill)) if partial_fill else None
+        self.fee = Decimal(str(fee))
+        self.depth_levels = depth_levels
+        self.depth_notional = Decimal(str(depth_notional))
+        self.tick_interval = tick_interval
+        self.loop = loop
+        self.clock_skew_ms = clock_skew_ms
+        self.finished = threading.Event()
+
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._balances = {asset: [Decimal(str(amount)), ZERO] for asset, amount in (balances or {}).items()}
+        self._account_time = 0
+        self._dirty = set()
+        self._orders = {}
+        self._open = {}
+        self._lists = {}
+        self._trades = {symbol: [] for symbol in self.symbols}
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._list_ids = itertools.count(1)
+        self._agg_ids = itertools.count(1)
+        self._execution_ids = itertools.count(1)
+        self._subscription_ids = itertools.count(0)
+        self._index = {symbol: 0 for symbol in self.symbols}
+        self._last = {}
+        self._books = {}
+        self._update_ids = {symbol: 1 for symbol in self.symbols}
+        self._streams = {}
+        self._user_conns = {}
+        self._listen_keys = set()
+        self._connections = set()
+        self._weight_window = (0, 0)
+        self._orders_10s = (0, 0)
+        self._orders_1d = (0, 0)
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+
+        self._routes = {
+            ('GET', 'ping'): self._ping,
+            ('GET', 'time'): self._time,
+            ('GET', 'exchangeInfo'): self._exchange_info,
+            ('GET', 'ticker/price'): self._ticker_price,
+            ('GET', 'ticker/bookTicker'): self._book_ticker,
+            ('GET', 'avgPrice'): self._avg_price,
+            ('GET', 'depth'): self._depth,
+            ('GET', 'account'): self._account,
+            ('GET', 'order'): self._get_order,
+            ('GET', 'openOrders'): self._open_orders,
+            ('GET', 'allOrders'): self._all_orders,
+            ('GET', 'myTrades'): self._my_trades,
+            ('POST', 'order'): self._new_order,
+            ('DELETE', 'order'): self._cancel_order,
+            ('DELETE', 'openOrders'): self._cancel_open_orders,
+            ('POST', 'orderList/oco'): self._new_oco,
+            ('POST', 'order/cancelReplace'): self._cancel_replace,
+            ('PUT', 'order/amend/keepPriority'): self._amend_keep_priority,
+            ('POST', 'userDataStream'): self._listen_key,
+            ('PUT', 'userDataStream'): self._listen_key,
+            ('DELETE', 'userDataStream'): self._listen_key,
+        }
+
+        now = self.now()
+        for symbol, path in self.paths.items():
+            self._set_price(symbol, path[0], now)
+        self._server = None
+        self._stop = threading.Event()
+        self._market_thread = None
+
+    def now(self):
+        return int(time.time() * 1000) + self.clock_skew_ms
+
+    # port=0: boş bir port seçilir, adres `url` ile okunur
+    def start(self, host='127.0.0.1', port=0):
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='mock-exchange', daemon=True).start()
+        if self.tick_interval:
+            self._market_thread = threading.Thread(target=self._market_loop, name='mock-market', daemon=True)
+            self._market_thread.start()
+        logging.info(f"Sahte borsa {self.url} adresinde")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            conn.close()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _market_loop(self):
+        while not self._stop.wait(self.tick_interval):
+            if not self.step():
+                self.finished.set()
+                return
+
+    # ---- Piyasa ----
+
+    # Tüm sembollerde fiyat yolunu bir adım ilerletir; yol bittiyse False
+    def step(self):
+        with self._lock:
+            now = self.now()
+            for symbol, path in self.paths.items():
+                index = self._index[symbol] + 1
+                if index >= len(path):
+                    if not self.loop:
+                        return False
+                    index = 0
+                self._index[symbol] = index
+                self._set_price(symbol, path[index], now)
+            self._flush_account(now)
+            return True
+
+    # Betik dışında fiyatı doğrudan ayarlar (testlerde ani sıçrama için)
+    def set_price(self, symbol, price):
+        with self._lock:
+            now = self.now()
+            self._set_price(symbol, Decimal(str(price)), now)
+            self._flush_account(now)
+
+    def last_price(self, symbol):
+        with self._lock:
+            return self._last[symbol]
+
+    # Fiyat yolunun son alış fiyatı olduğu, her seviyede `depth_notional` değerinde miktar bulunan sentetik defter
+    def _build_book(self, spec, price):
+        qty = max(spec.min_qty, _floor(self.depth_notional / price, spec.step_size))
+        bids = [(price - spec.tick_size * i, qty) for i in range(self.depth_levels) if price - spec.tick_size * i > 0]
+        asks = [(price + spec.tick_size * (i + 1), qty) for i in range(self.depth_levels)]
+        return bids, asks
+
+    def _set_price(self, symbol, price, now):
+        spec = self.symbols[symbol]
+        price = max(spec.tick_size, _round(price, spec.tick_size))
+        old_bids, old_asks = self._books.get(symbol, ([], []))
+        bids, asks = self._build_book(spec, price)
+        self._last[symbol] = price
+        self._books[symbol] = (bids, asks)
+        update_id = self._update_ids[symbol] = self._update_ids[symbol] + 1
+
+        name = symbol.lower()
+        self._publish((f"{name}@depth", f"{name}@depth@100ms"), {
+            'e': 'depthUpdate', 'E': now, 's': symbol, 'U': update_id, 'u': update_id,
+            'b': self._book_diff(old_bids, bids), 'a': self._book_diff(old_asks, asks),
+        })
+        self._publish((f"{name}@bookTicker",), {
+            'u': update_id, 's': symbol, 'b': _fmt(bids[0][0]), 'B': _fmt(bids[0][1]),
+            'a': _fmt(asks[0][0]), 'A': _fmt(asks[0][1]),
+        })
+        agg_id = next(self._agg_ids)
+        self._publish((f"{name}@aggTrade",), {
+            'e': 'aggTrade', 'E': now, 's': symbol, 'a': agg_id, 'p': _fmt(price), 'q': _fmt(spec.min_qty),
+            'f': agg_id, 'l': agg_id, 'T': now, 'm': False, 'M': True,
+        })
+        self._match_resting(symbol, now)
+
+    @staticmethod
+    def _book_diff(old, new):
+        new_levels = dict(new)
+        changes = [[_fmt(price), '0.00000000'] for price, _ in old if price not in new_levels]
+        old_levels = dict(old)
+        changes.extend([_fmt(price), _fmt(qty)] for price, qty in new if old_levels.get(price) != qty)
+        return changes
+
+    def _match_resting(self, symbol, now):
+        last = self._last[symbol]
+        for order in [o for o in self._open.values() if o.symbol == symbol]:
+            if not order.is_open:
+                continue
+            if not order.working:
+                if not _stop_triggered(order.side, order.stop_price, last):
+                    continue
+                order.working = True
+                order.working_time = now
+            if (order.side == 'BUY' and last > order.price) or (order.side == 'SELL' and last < order.price):
+                continue
+            qty = order.remaining
+            if self.partial_fill is not None:
+                part = max(order.spec.step_size, _floor(order.orig_qty * self.partial_fill, order.spec.step_size))
+                qty = min(qty, part)
+            self._fill(order, qty, order.price, True, now)
+
+    # ---- Bakiye ----
+
+    def _balance(self, asset):
+        balance = self._balances.get(asset)
+        if balance is None:
+            balance = self._balances[asset] = [ZERO, ZERO]
+        return balance
+
+    def _touch(self, asset, now):
+        self._dirty.add(asset)
+        self._account_time = now
+
+    def _reserve(self, asset, amount, now):
+        balance = self._balance(asset)
+        if balance[0] < amount:
+            raise MockError(400, -2010, "Account has insufficient balance for requested action.")
+        balance[0] -= amount
+        balance[1] += amount
+        self._touch(asset, now)
+        return [asset, amount]
+
+    def _spend(self, order, asset, amount, now):
+        balance = self._balance(asset)
+        from_locked = ZERO
+        if order.reserve is not None:
+            from_locked = min(amount, order.reserve[1])
+            order.reserve[1] -= from_locked
+            balance[1] -= from_locked
+        balance[0] -= amount - from_locked
+        self._touch(asset, now)
+
+    def _credit(self, asset, amount, now):
+        self._balance(asset)[0] += amount
+        self._touch(asset, now)
+
+    # Emir (OCO ise listenin tüm bacakları) kapandığında kilitli kalan bakiyeyi serbest bırakır
+    def _release(self, order, now):
+        reserve = order.reserve
+        if reserve is None or reserve[1] <= 0:
+            return
+        siblings = self._lists.get(order.list_id, [order])
+        if any(o.is_open for o in siblings):
+            return
+        balance = self._balance(reserve[0])
+        balance[0] += reserve[1]
+        balance[1] -= reserve[1]
+        reserve[1] = ZERO
+        self._touch(reserve[0], now)
+
+    def _flush_account(self, now):
+        if not self._dirty:
+            return
+        assets = sorted(self._dirty)
+        self._dirty.clear()
+        self._user_event({
+            'e': 'outboundAccountPosition', 'E': now, 'u': now,
+            'B': [{'a': a, 'f': _fmt(self._balances[a][0]), 'l': _fmt(self._balances[a][1])} for a in assets],
+        })
+
+    # ---- Emirler ----
+
+    def _spec(self, params):
+        symbol = params.get('symbol')
+        if not symbol:
+            raise MockError(400, -1102, "Mandatory parameter 'symbol' was not sent, was empty/null, or malformed.")
+        spec = self.symbols.get(symbol.upper())
+        if spec is None:
+            raise MockError(400, -1121, "Invalid symbol.")
+        return spec
+
+    def _validate(self, spec, order_type, quantity, price):
+        if quantity < spec.min_qty or quantity % spec.step_size:
+            raise MockError(400, -1013, "Filter failure: LOT_SIZE")
+        if order_type in LIMIT_TYPES:
+            if price is None or price <= 0 or price % spec.tick_size:
+                raise MockError(400, -1013, "Filter failure: PRICE_FILTER")
+        reference = price if order_type in LIMIT_TYPES else self._last[spec.symbol]
+        if reference * quantity < spec.min_notional:
+            raise MockError(400, -1013, "Filter failure: NOTIONAL")
+
+    def _execution_report(self, order, execution_type, now, last_qty=ZERO, last_price=ZERO, commission=ZERO,
+                          commission_asset=None, trade_id=-1, maker=False):
+        self._user_event({
+            'e': 'executionReport', 'E': now, 's': order.symbol, 'c': order.client_order_id, 'S': order.side,
+            'o': order.type, 'f': order.time_in_force, 'q': _fmt(order.orig_qty), 'p': _fmt(order.price),
+            'P': _fmt(order.stop_price), 'F': '0.00000000', 'g': order.list_id, 'C': '', 'x': execution_type,
+            'X': order.status, 'r': 'NONE', 'i': order.order_id, 'l': _fmt(last_qty), 'z': _fmt(order.executed_qty),
+            'L': _fmt(last_price), 'n': _fmt(commission), 'N': commission_asset, 'T': now, 't': trade_id,
+            'I': next(self._execution_ids), 'w': order.is_open and order.working, 'm': maker, 'M': False,
+            'O': order.time, 'Z': _fmt(order.quote_qty), 'Y': _fmt(last_qty * last_price), 'Q': '0.00000000',
+            'W': order.working_time, 'V': 'EXPIRE_MAKER',
+        })
+
+    def _fill(self, order, qty, price, maker, now):
+        spec = order.spec
+        quote = (qty * price).quantize(EIGHT_DECIMALS)
+        if order.side == 'BUY':
+            commission = (qty * self.fee).quantize(EIGHT_DECIMALS)
+            commission_asset = spec.base_asset
+            self._spend(order, spec.quote_asset, quote, now)
+            self._credit(spec.base_asset, qty - commission, now)
+        else:
+            commission = (quote * self.fee).quantize(EIGHT_DECIMALS)
+            commission_asset = spec.quote_asset
+            self._spend(order, spec.base_asset, qty, now)
+            self._credit(spec.quote_asset, quote - commission, now)
+        order.executed_qty += qty
+        order.quote_qty += quote
+        order.update_time = now
+        order.status = 'FILLED' if order.remaining <= 0 else 'PARTIALLY_FILLED'
+        trade_id = next(self._trade_ids)
+        order.fills.append({'price': _fmt(price), 'qty': _fmt(qty), 'commission': _fmt(commission),
+                            'commissionAsset': commission_asset, 'tradeId': trade_id})
+        self._trades[order.symbol].append({
+            'symbol': order.symbol, 'id': trade_id, 'orderId': order.order_id, 'orderListId': order.list_id,
+            'price': _fmt(price), 'qty': _fmt(qty), 'quoteQty': _fmt(quote), 'commission': _fmt(commission),
+            'commissionAsset': commission_asset, 'time': now, 'isBuyer': order.side == 'BUY',
+            'isMaker': maker, 'isBestMatch': True,
+        })
+        self._execution_report(order, 'TRADE', now, qty, price, commission, commission_asset, trade_id, maker)
+        # OCO: bir bacak dolmaya başlayınca diğeri sona erer
+        for sibling in self._lists.get(order.list_id, ()):
+            if sibling is not order and sibling.is_open:
+                self._finish(sibling, 'EXPIRED', now)
+        if not order.is_open:
+            self._open.pop(order.order_id, None)
+            self._release(order, now)
+
+    def _finish(self, order, status, now):
+        order.status = status
+        order.update_time = now
+        self._open.pop(order.order_id, None)
+        self._execution_report(order, 'CANCELED' if status == 'CANCELED' else 'EXPIRED', now)
+        self._release(order, now)
+
+    # Karşı taraftaki seviyeleri yürüyerek hemen eşleşecek (fiyat, miktar) listesini ve kalan miktarı döner
+    def _plan(self, symbol, side, order_type, quantity, price):
+        bids, asks = self._books[symbol]
+        plan = []
+        remaining = quantity
+        for level_price, level_qty in (asks if side == 'BUY' else bids):
+            if remaining <= 0:
+                break
+            if order_type != 'MARKET' and ((side == 'BUY' and level_price > price) or
+                                           (side == 'SELL' and level_price < price)):
+                break
+            qty = min(remaining, level_qty)
+            plan.append((level_price, qty))
+            remaining -= qty
+        return plan, remaining
+
+    def _place(self, spec, side, order_type, quantity, price, stop_price, time_in_force, client_order_id, now,
+               list_id=-1, reserve=None):
+        if side not in ('BUY', 'SELL'):
+            raise MockError(400, -1102, "Mandatory parameter 'side' was not sent, was empty/null, or malformed.")
+        if order_type not in ('MARKET',) + LIMIT_TYPES:
+            raise MockError(400, -1116, "Invalid orderType.")
+        self._validate(spec, order_type, quantity, price)
+        bids, asks = self._books[spec.symbol]
+        if order_type == 'LIMIT_MAKER' and ((side == 'BUY' and price >= asks[0][0]) or
+                                            (side == 'SELL' and price <= bids[0][0])):
+            raise MockError(400, -2010, "Order would immediately match and take.")
+        if order_type in STOP_TYPES and _stop_triggered(side, stop_price, self._last[spec.symbol]):
+            raise MockError(400, -2010, "Stop price would trigger immediately.")
+        if order_type not in ('LIMIT',) + STOP_TYPES:
+            time_in_force = 'GTC'
+
+        plan = []
+        if order_type in ('MARKET', 'LIMIT'):
+            plan, unfilled = self._plan(spec.symbol, side, order_type, quantity, price)
+            if time_in_force == 'FOK' and unfilled > 0:
+                plan = []
+        if order_type == 'MARKET':
+            if side == 'BUY':
+                needed, asset = sum(p * q for p, q in plan), spec.quote_asset
+            else:
+                needed, asset = quantity, spec.base_asset
+            if self._balance(asset)[0] < needed:
+                raise MockError(400, -2010, "Account has insufficient balance for requested action.")
+        elif reserve is None:
+            if side == 'BUY':
+                reserve = self._reserve(spec.quote_asset, (quantity * price).quantize(EIGHT_DECIMALS), now)
+            else:
+                reserve = self._reserve(spec.base_asset, quantity, now)
+
+        order_id = next(self._order_ids)
+        order = Order(order_id, client_order_id or f"mock{order_id}", spec, side, order_type, quantity, price,
+                      stop_price, time_in_force, list_id, now)
+        order.reserve = reserve
+        self._orders[order_id] = order
+        if list_id != -1:
+            self._lists.setdefault(list_id, []).append(order)
+        self._execution_report(order, 'NEW', now)
+        for level_price, qty in plan:
+            self._fill(order, qty, level_price, False, now)
+        if order.is_open:
+            if order_type == 'MARKET' or time_in_force in ('IOC', 'FOK'):
+                self._finish(order, 'EXPIRED', now)
+            else:
+                self._open[order_id] = order
+        return order
+
+    def _order_response(self, order, response_type, now):
+        if response_type == 'ACK':
+            return {'symbol': order.symbol, 'orderId': order.order_id, 'orderListId': order.list_id,
+                    'clientOrderId': order.client_order_id, 'transactTime': now}
+        response = order.to_dict()
+        response['transactTime'] = now
+        if response_type == 'FULL':
+            response['fills'] = list(order.fills)
+        return response
+
+    def _place_from_params(self, params, now):
+        spec = self._spec(params)
+        order_type = params.get('type', '').upper()
+        quantity = _decimal_param(params, 'quantity', required=False)
+        quote_qty = _decimal_param(params, 'quoteOrderQty', required=False)
+        if quantity is None:
+            if order_type != 'MARKET' or quote_qty is None:
+                raise MockError(400, -1102, "Mandatory parameter 'quantity' was not sent, was empty/null, or malformed.")
+            quantity = _floor(quote_qty / self._books[spec.symbol][1][0][0], spec.step_size)
+        price = _decimal_param(params, 'price', required=order_type in LIMIT_TYPES)
+        stop_price = _decimal_param(params, 'stopPrice', required=order_type in STOP_TYPES)
+        return self._place(spec, params.get('side', '').upper(), order_type, quantity, price, stop_price,
+                           params.get('timeInForce', 'GTC'), params.get('newClientOrderId'), now)
+
+    def _find_order(self, params, spec, id_key='orderId', client_key='origClientOrderId'):
+        order_id = params.get(id_key)
+        client_id = params.get(client_key)
+        if order_id:
+            order = self._orders.get(int(order_id))
+        elif client_id:
+            order = next((o for o in self._orders.values() if o.client_order_id == client_id), None)
+        else:
+            raise MockError(400, -1102, f"Param '{id_key}' or '{client_key}' must be sent, but both were empty/null!")
+        if order is None or order.symbol != spec.symbol:
+            return None
+        return order
+
+    # ---- REST ----
+
+    def _check_rate(self, method, route, params, now, headers):
+        minute = now // 60000
+        window, used = self._weight_window
+        used = (used if window == minute else 0) + request_weight(method, route, params)
+        self._weight_window = (minute, used)
+        headers['x-mbx-used-weight'] = str(used)
+        headers['x-mbx-used-weight-1m'] = str(used)
+        if used > self.weight_limit:
+            raise MockError(429, -1003, f"Too much request weight used; current limit is {self.weight_limit} "
+                                        f"request weight per 1 MINUTE.",
+                            headers={'Retry-After': str(60 - (now // 1000) % 60)})
+        if method == 'POST' and route in ORDER_ROUTES:
+            window, count = self._orders_10s
+            count = (count if window == now // 10000 else 0) + 1
+            self._orders_10s = (now // 10000, count)
+            day, daily = self._orders_1d
+            daily = (daily if day == now // 86400000 else 0) + 1
+            self._orders_1d = (now // 86400000, daily)
+            headers['x-mbx-order-count-10s'] = str(count)
+            headers['x-mbx-order-count-1d'] = str(daily)
+            if count > self.order_limit:
+                raise MockError(429, -1015, f"Too many new orders; current limit is {self.order_limit} orders per TEN_SECONDS.",
+                                headers={'Retry-After': str(10 - (now // 1000) % 10)})
+        if self.rate_limit_rate and self._random.random() < self.rate_limit_rate:
+            raise MockError(429, -1003, "Too many requests; current limit is exceeded.", headers={'Retry-After': '1'})
+
+    def _check_timestamp(self, params, now):
+        timestamp = int(params.get('timestamp', 0))
+        recv_window = int(params.get('recvWindow', 5000))
+        if timestamp >= now + 1000:
+            raise MockError(400, -1021, "Timestamp for this request was 1000ms ahead of the server's time.")
+        if now - timestamp > recv_window:
+            raise MockError(400, -1021, "Timestamp for this request is outside of the recvWindow.")
+
+    # HTTP işleyicisinden çağrılır: (durum kodu, JSON gövdesi, ek başlıklar)
+    def handle_request(self, method, path, params):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._random.random() * self.jitter)
+        route = path[len('/api/v3/'):] if path.startswith('/api/v3/') else None
+        handler = self._routes.get((method, route))
+        headers = {}
+        with self._lock:
+            self.stats['requests'] += 1
+            now = self.now()
+            try:
+                if handler is None:
+                    raise MockError(404, -1000, f"Sahte borsada desteklenmeyen uç: {method} {path}")
+                self._check_rate(method, route, params, now, headers)
+                if self.error_rate and self._random.random() < self.error_rate:
+                    raise MockError(500, -1000, "An unknown error occurred while processing the request.")
+                if 'signature' in params:
+                    self._check_timestamp(params, now)
+                result = handler(params, now)
+                self._flush_account(now)
+                return 200, result, headers
+            except MockError as e:
+                self.stats['errors'] += 1
+                if e.status == 429:
+                    self.stats['rate_limited'] += 1
+                self._flush_account(now)
+                headers.update(e.headers)
+                return e.status, e.body(), headers
+
+    def _ping(self, params, now):
+        return {}
+
+    def _time(self, params, now):
+        return {'serverTime': now}
+
+    def _exchange_info(self, params, now):
+        wanted = None
+        if params.get('symbol'):
+            wanted = {self._spec(params).symbol}
+        elif params.get('symbols'):
+            wanted = set(json.loads(params['symbols']))
+        return {
+            'timezone': 'UTC',
+            'serverTime': now,
+            'rateLimits': [
+                {'rateLimitType': 'REQUEST_WEIGHT', 'interval': 'MINUTE', 'intervalNum': 1, 'limit': self.weight_limit},
+                {'rateLimitType': 'ORDERS', 'interval': 'SECOND', 'intervalNum': 10, 'limit': self.order_limit},
+                {'rateLimitType': 'ORDERS', 'interval': 'DAY', 'intervalNum': 1, 'limit': 160000},
+            ],
+            'exchangeFilters': [],
+            'symbols': [symbol_info(spec) for symbol, spec in sorted(self.symbols.items())
+                        if wanted is None or symbol in wanted],
+        }
+
+    def _ticker_price(self, params, now):
+        if params.get('symbol'):
+            spec = self._spec(params)
+            return {'symbol': spec.symbol, 'price': _fmt(self._last[spec.symbol])}
+        return [{'symbol': symbol, 'price': _fmt(price)} for symbol, price in sorted(self._last.items())]
+
+    def _book_ticker(self, params, now):
+        def ticker(symbol):
+            bids, asks = self._books[symbol]
+            return {'symbol': symbol, 'bidPrice': _fmt(bids[0][0]), 'bidQty': _fmt(bids[0][1]),
+                    'askPrice': _fmt(asks[0][0]), 'askQty': _fmt(asks[0][1])}
+        if params.get('symbol'):
+            return ticker(self._spec(params).symbol)
+        return [ticker(symbol) for symbol in sorted(self._books)]
+
+    def _avg_price(self, params, now):
+        return {'mins': 5, 'price': _fmt(self._last[self._spec(params).symbol]), 'closeTime': now}
+
+    def _depth(self, params, now):
+        spec = self._spec(params)
+        limit = int(params.get('limit', 100))
+        bids, asks = self._books[spec.symbol]
+        return {
+            'lastUpdateId': self._update_ids[spec.symbol],
+            'bids': [[_fmt(p), _fmt(q)] for p, q in bids[:limit]],
+            'asks': [[_fmt(p), _fmt(q)] for p, q in asks[:limit]],
+        }
+
+    def _account(self, params, now):
+        return {
+            'makerCommission': int(self.fee * 10000), 'takerCommission': int(self.fee * 10000),
+            'buyerCommission': 0, 'sellerCommission': 0,
+            'canTrade': True, 'canWithdraw': True, 'canDeposit': True, 'brokered': False,
+            'requireSelfTradePrevention': False, 'preventSor': False,
+            'updateTime': self._account_time, 'accountType': 'SPOT',
+            'balances': [{'asset': asset, 'free': _fmt(free), 'locked': _fmt(locked)}
+                         for asset, (free, locked) in sorted(self._balances.items())],
+            'permissions': ['SPOT'], 'uid': 0,
+        }
+
+    def _get_order(self, params, now):
+        order = self._find_order(params, self._spec(params))
+        if order is None:
+            raise MockError(400, -2013, "Order does not exist.")
+        return order.to_dict()
+
+    def _open_orders(self, params, now):
+        symbol = self._spec(params).symbol if params.get('symbol') else None
+        return [o.to_dict() for o in self._open.values() if symbol is None or o.symbol == symbol]
+
+    def _all_orders(self, params, now):
+        symbol = self._spec(params).symbol
+        limit = min(int(params.get('limit', 500)), 1000)
+        orders = [o.to_dict() for o in self._orders.values() if o.symbol == symbol]
+        return orders[-limit:]
+
+    def _my_trades(self, params, now):
+        symbol = self._spec(params).symbol
+        limit = min(int(params.get('limit', 500)), 1000)
+        trades = self._trades[symbol]
+        if params.get('orderId'):
+            order_id = int(params['orderId'])
+            trades = [t for t in trades if t['orderId'] == order_id]
+        if params.get('fromId'):
+            from_id = int(params['fromId'])
+            return [t for t in trades if t['id'] >= from_id][:limit]
+        return trades[-limit:]
+
+    def _new_order(self, params, now):
+        order = self._place_from_params(params, now)
+        default_type = 'FULL' if order.type in ('MARKET', 'LIMIT') else 'ACK'
+        return self._order_response(order, params.get('newOrderRespType', default_type), now)
+
+    def _cancel(self, order, now):
+        for leg in self._lists.get(order.list_id, [order]):
+            if leg.is_open:
+                self._finish(leg, 'CANCELED', now)
+        return order.to_dict()
+
+    def _cancel_order(self, params, now):
+        order = self._find_order(params, self._spec(params))
+        if order is None or not order.is_open:
+            raise MockError(400, -2011, "Unknown order sent.")
+        return self._cancel(order, now)
+
+    def _cancel_open_orders(self, params, now):
+        symbol = self._spec(params).symbol
+        orders = [o for o in list(self._open.values()) if o.symbol == symbol]
+        if not orders:
+            raise MockError(400, -2011, "Unknown order sent.")
+        return [self._cancel(o, now) for o in orders if o.is_open]
+
+    def _new_oco(self, params, now):
+        spec = self._spec(params)
+        side = params.get('side', '').upper()
+        quantity = _decimal_param(params, 'quantity')
+        list_id = next(self._list_ids)
+        if side == 'SELL':
+            reserve = self._reserve(spec.base_asset, quantity, now)
+        else:
+            top = max(_decimal_param(params, 'abovePrice', required=False) or ZERO,
+                      _decimal_param(params, 'belowPrice', required=False) or ZERO)
+            reserve = self._reserve(spec.quote_asset, (quantity * top).quantize(EIGHT_DECIMALS), now)
+        legs = []
+        try:
+            for prefix in ('below', 'above'):
+                order_type = params.get(f'{prefix}Type', '').upper()
+                legs.append(self._place(spec, side, order_type, quantity,
+                                        _decimal_param(params, f'{prefix}Price', required=order_type in LIMIT_TYPES),
+                                        _decimal_param(params, f'{prefix}StopPrice', required=order_type in STOP_TYPES),
+                                        params.get(f'{prefix}TimeInForce', 'GTC'),
+                                        params.get(f'{prefix}ClientOrderId'), now, list_id, reserve))
+        except MockError:
+            for leg in legs:
+                self._finish(leg, 'EXPIRED', now)
+            self._lists.pop(list_id, None)
+            balance = self._balance(reserve[0])
+            balance[0] += reserve[1]
+            balance[1] -= reserve[1]
+            raise
+        return {
+            'orderListId': list_id, 'contingencyType': 'OCO', 'listStatusType': 'EXEC_STARTED',
+            'listOrderStatus': 'EXECUTING', 'listClientOrderId': params.get('listClientOrderId', f"mocklist{list_id}"),
+            'transactionTime': now, 'symbol': spec.symbol,
+            'orders': [{'symbol': spec.symbol, 'orderId': leg.order_id, 'clientOrderId': leg.client_order_id}
+                       for leg in legs],
+            'orderReports': [self._order_response(leg, 'RESULT', now) for leg in legs],
+        }
+
+    def _cancel_replace(self, params, now):
+        spec = self._spec(params)
+        mode = params.get('cancelReplaceMode', 'STOP_ON_FAILURE')
+        order = self._find_order(params, spec, 'cancelOrderId', 'cancelOrigClientOrderId')
+        cancel_response = None
+        cancel_error = {'code': -2011, 'msg': "Unknown order sent."}
+        if order is None or not order.is_open:
+            if mode == 'STOP_ON_FAILURE':
+                raise MockError(400, -2022, "Order cancel-replace failed.", data={
+                    'cancelResult': 'FAILURE', 'newOrderResult': 'NOT_ATTEMPTED',
+                    'cancelResponse': cancel_error, 'newOrderResponse': None})
+        else:
+            cancel_response = self._cancel(order, now)
+        try:
+            new_order = self._place_from_params(params, now)
+        except MockError as e:
+            raise MockError(409, -2021, "Order cancel-replace partially failed.", data={
+                'cancelResult': 'SUCCESS' if cancel_response else 'FAILURE', 'newOrderResult': 'FAILURE',
+                'cancelResponse': cancel_response or cancel_error, 'newOrderResponse': e.body()})
+        return {
+            'cancelResult': 'SUCCESS' if cancel_response else 'FAILURE', 'newOrderResult': 'SUCCESS',
+            'cancelResponse': cancel_response or cancel_error,
+            'newOrderResponse': self._order_response(new_order, params.get('newOrderRespType', 'FULL'), now),
+        }
+
+    # Sırayı koruyarak miktar azaltma; yeni miktar dolmuş miktara eşit ya da altındaysa emir FILLED olur
+    def _amend_keep_priority(self, params, now):
+        spec = self._spec(params)
+        order = self._find_order(params, spec)
+        if order is None or not order.is_open:
+            raise MockError(400, -2013, "Order does not exist.")
+        new_qty = _decimal_param(params, 'newQty')
+        if new_qty >= order.orig_qty or new_qty % spec.step_size:
+            raise MockError(400, -2038, "The requested modification would not decrease the order quantity.")
+        if order.reserve is not None and order.list_id == -1:
+            freed = (order.orig_qty - new_qty) * (order.price if order.side == 'BUY' else 1)
+            freed = min(freed.quantize(EIGHT_DECIMALS), order.reserve[1])
+            order.reserve[1] -= freed
+            balance = self._balance(order.reserve[0])
+            balance[0] += freed
+            balance[1] -= freed
+            self._touch(order.reserve[0], now)
+        order.orig_qty = max(new_qty, order.executed_qty)
+        order.update_time = now
+        if order.remaining <= 0:
+            order.status = 'FILLED'
+            self._open.pop(order.order_id, None)
+            self._release(order, now)
+        self._execution_report(order, 'REPLACED', now)
+        amended = order.to_dict()
+        amended['transactTime'] = now
+        return {'transactTime': now, 'executionId': next(self._execution_ids), 'amendedOrder': amended}
+
+    def _listen_key(self, params, now):
+        key = params.get('listenKey') or base64.b16encode(os.urandom(16)).decode('ascii').lower()
+        self._listen_keys.add(key)
+        return {'listenKey': key} if 'listenKey' not in params else {}
+
+    # ---- WebSocket ----
+
+    def _publish(self, streams, message):
+        for stream in streams:
+            for conn in list(self._streams.get(stream, ())):
+                conn.send_json({'stream': stream, 'data': message} if conn.combined else message)
+
+    def _user_event(self, event):
+        for conn, subscription_id in list(self._user_conns.items()):
+            conn.send_json(event if subscription_id is None else {'subscriptionId': subscription_id, 'event': event})
+
+    # Süreç içi kullanım (ölçümler): kullanıcı olayları WebSocket yerine doğrudan `conn.send_json`'a verilir
+    def add_user_connection(self, conn):
+        with self._lock:
+            self._user_conns[conn] = None
+
+    # Piyasa akışlarını ve WebSocket API'yi tüm piyasa/bağlantı kopmasını sınamak için keser
+    def disconnect_streams(self):
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            conn.close()
+
+    def serve_websocket(self, conn, raw_path):
+        parts = urlsplit(raw_path)
+        path = parts.path
+        with self._lock:
+            self._connections.add(conn)
+        try:
+            if path.rstrip('/') == '/ws-api/v3':
+                self._serve_ws_api(conn)
+                return
+            if path == '/stream':
+                conn.combined = True
+                streams = dict(parse_qsl(parts.query)).get('streams', '').split('/')
+            elif path.startswith('/ws/'):
+                streams = [path[len('/ws/'):]]
+            else:
+                return
+            with self._lock:
+                if len(streams) == 1 and streams[0] in self._listen_keys:
+                    self._user_conns[conn] = None
+                    streams = []
+                for stream in streams:
+                    self._streams.setdefault(stream, set()).add(conn)
+            while conn.recv() is not None:
+                pass
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(conn)
+                self._user_conns.pop(conn, None)
+                for subscribers in self._streams.values():
+                    subscribers.discard(conn)
+            conn.close()
+
+    def _serve_ws_api(self, conn):
+        while True:
+            text = conn.recv()
+            if text is None:
+                return
+            request = json.loads(text)
+            method = request.get('method')
+            response = {'id': request.get('id'), 'status': 200, 'result': {}, 'rateLimits': []}
+            subscription_id = None
+            if method in ('userDataStream.subscribe', 'userDataStream.subscribe.signature'):
+                subscription_id = next(self._subscription_ids)
+                response['result'] = {'subscriptionId': subscription_id}
+            elif method == 'userDataStream.unsubscribe':
+                with self._lock:
+                    self._user_conns.pop(conn, None)
+            elif method == 'time':
+                response['result'] = {'serverTime': self.now()}
+            elif method != 'ping':
+                response = {'id': request.get('id'), 'status': 400,
+                            'error': {'code': -1000, 'msg': f"Sahte borsada desteklenmeyen metot: {method}"}}
+            conn.send_json(response)
+            # Abonelik yanıttan sonra kaydedilir; istemci kuyruğunu yanıtı aldıktan sonra bağlar
+            if subscription_id is not None:
+                with self._lock:
+                    self._user_conns[conn] = subscription_id
+
+    def summary_lines(self):
+        with self._lock:
+            statuses = {}
+            for order in self._orders.values():
+                statuses[order.status] = statuses.get(order.status, 0) + 1
+            lines = [
+                f"İstek: {self.stats['requests']}, hata: {self.stats['errors']}, 429: {self.stats['rate_limited']}",
+                "Emirler: " + (', '.join(f"{status}={count}" for status, count in sorted(statuses.items())) or '-'),
+                f"İşlemler: {sum(len(trades) for trades in self._trades.values())}",
+            ]
+            lines.extend(f"Bakiye {asset}: serbest={_fmt(free)} kilitli={_fmt(locked)}"
+                         for asset, (free, locked) in sorted(self._balances.items()))
+        return lines
+
+
+# python-binance'in REST, piyasa akışı ve WebSocket API adreslerini sahte borsaya yönlendirir.
+# Client/ThreadedWebsocketManager oluşturulmadan önce çağrılmalı.
+def install(url):
+    from binance.base_client import BaseClient
+    from binance.ws.streams import BinanceSocketManager
+    import endpoints
+    ws_url = 'ws' + url[len('http'):]
+    BaseClient.API_URL = url + '/api'
+    BaseClient.WS_API_URL = ws_url + '/ws-api/v3'
+    BinanceSocketManager.STREAM_URL = ws_url + '/'
+    endpoints.BINANCE_ENDPOINTS = (url + '/api',)
+
+
+def _parse_balances(values):
+    balances = {}
+    for value in values:
+        asset, _, amount = value.partition('=')
+        balances[asset.upper()] = Decimal(amount)
+    return balances
+
+def _load_prices(args):
+    if args.prices:
+        return [float(p) for p in args.prices.split(',')]
+    if args.csv:
+        from backtest import load_klines_csv, load_aggtrades_csv
+        data = load_klines_csv(args.csv) if args.kind == 'klines' else load_aggtrades_csv(args.csv)
+        return [float(p) for p in data['prices']]
+    return random_walk(args.start_price, args.steps, args.volatility, args.seed)
+
+def build_exchange(args):
+    spec = make_symbol(args.symbol, args.tick_size, args.step_size, args.min_qty, args.min_notional)
+    return MockExchange(
+        [spec], {spec.symbol: _load_prices(args)},
+        balances=_parse_balances(args.balance or ['USDT=1000']),
+        latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, weight_limit=args.weight_limit, order_limit=args.order_limit,
+        partial_fill=args.partial_fill, fee=args.fee, tick_interval=args.tick_interval, loop=args.loop,
+        clock_skew_ms=args.clock_skew, seed=args.seed,
+    )
+
+# Botu değiştirmeden sahte borsaya karşı çalıştırır. Girdiler stdin'den okunur; fiyat yolu
+# bittikten `linger` saniye sonra bota KeyboardInterrupt gönderilir ve özet yazılır.
+def run_module(exchange, module, workdir, linger):
+    import runpy
+    import tempfile
+    import _thread
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    install(exchange.url)
+    workdir = workdir or tempfile.mkdtemp(prefix='mock_exchange_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    print(f"Sahte borsa: {exchange.url}, çalışma dizini: {workdir}")
+
+    def stop_when_finished():
+        exchange.finished.wait()
+        time.sleep(linger)
+        _thread.interrupt_main()
+
+    threading.Thread(target=stop_when_finished, name='mock-runner', daemon=True).start()
+    try:
+        runpy.run_module(module, run_name='__main__', alter_sys=True)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for line in exchange.summary_lines():
+            print(line)
+
+# Botun emir yardımcılarını ve akışları sahte borsaya karşı uçtan uca dener
+def _self_check():
+    from binance import ThreadedWebsocketManager
+    from binance.client import Client
+    from binance.exceptions import BinanceAPIException
+    from user_stream import UserDataStream, FillTracker
+
+    spec = make_symbol('BTCUSDT', '0.01', '0.00001', min_notional='5')
+    prices = [100.0] * 20 + [100.5, 101.0, 101.5, 102.0]
+    exchange = MockExchange([spec], {'BTCUSDT': prices}, balances={'USDT': Decimal('1000')},
+                            depth_notional=Decimal('200'), tick_interval=0, partial_fill=0.5).start()
+    install(exchange.url)
+    client = Client('x', 'y', ping=False)
+    twm = ThreadedWebsocketManager(api_key='x', api_secret='y')
+    twm.daemon = True
+    twm.start()
+    user_stream = UserDataStream(twm)
+    fill_tracker = FillTracker(user_stream)
+    ticks = []
+    user_stream.start()
+    twm.start_symbol_book_ticker_socket(callback=ticks.append, symbol='BTCUSDT')
+    time.sleep(1)
+
+    # 500 USDT'lik piyasa alımı 200 USDT'lik seviyelerde üç dolum üretir
+    order = client.order_market_buy(symbol='BTCUSDT', quantity='5.00000', newOrderRespType='FULL')
+    print(f"Piyasa alımı: {order['status']}, dolum sayısı: {len(order['fills'])}, "
+          f"ortalama: {Decimal(order['cummulativeQuoteQty']) / Decimal(order['executedQty']):.4f}")
+    base = Decimal(client.get_asset_balance('BTC')['free'])
+    base = _floor(base, spec.step_size)
+    oco = client.create_oco_order(symbol='BTCUSDT', side='SELL', quantity=_fmt(base),
+                                  aboveType='LIMIT_MAKER', abovePrice='101.50', belowType='STOP_LOSS_LIMIT',
+                                  belowStopPrice='99.00', belowPrice='98.90', belowTimeInForce='GTC')
+    legs = {report['orderId']: report['type'] for report in oco['orderReports']}
+    while exchange.step():
+        pass
+    done = fill_tracker.wait_any(list(legs), timeout=5)
+    for state in done:
+        print(f"OCO bacağı {legs[state.order_id]}: {state.status}, dolum: {len(state.fills)}")
+    try:
+        client.get_order(symbol='BTCUSDT', orderId=999)
+    except BinanceAPIException as e:
+        print(f"Beklenen hata: {e.code} {e.message}")
+    print(f"bookTicker mesajı: {len(ticks)}")
+    twm.stop()
+    exchange.stop()
+    for line in exchange.summary_lines():
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel sahte Binance spot borsası")
+    parser.add_argument('command', choices=['serve', 'run', 'check'])
+    parser.add_argument('module', nargs='?', default='binance_bot', help="run: çalıştırılacak bot modülü")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--symbol', default='BTCUSDT')
+    parser.add_argument('--tick-size', default='0.01')
+    parser.add_argument('--step-size', default='0.00001')
+    parser.add_argument('--min-qty', default=None)
+    parser.add_argument('--min-notional', default='5')
+    parser.add_argument('--balance', action='append', help="Başlangıç bakiyesi, örn. USDT=1000 (tekrarlanabilir)")
+    parser.add_argument('--prices', help="Virgülle ayrılmış fiyat yolu")
+    parser.add_argument('--csv', help="Fiyat yolu için kline veya aggTrades CSV dosyası")
+    parser.add_argument('--kind', choices=['klines', 'aggtrades'], default='klines')
+    parser.add_argument('--start-price', type=float, default=100.0)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--volatility', type=float, default=0.001)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--tick-interval', type=float, default=0.05, help="Fiyat adımları arası saniye")
+    parser.add_argument('--loop', action='store_true', help="Fiyat yolu bitince başa dön")
+    parser.add_argument('--latency', type=float, default=0.0, help="REST gecikmesi (ms)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Gecikmeye eklenen rastgele süre üst sınırı (ms)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="500 dönen isteklerin oranı")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="429 dönen isteklerin oranı")
+    parser.add_argument('--weight-limit', type=int, default=6000)
+    parser.add_argument('--order-limit', type=int, default=50)
+    parser.add_argument('--partial-fill', type=float, default=None, help="Bekleyen emrin her adımda dolan oranı")
+    parser.add_argument('--fee', default='0.001')
+    parser.add_argument('--clock-skew', type=int, default=0, help="Sunucu saatinin kayması (ms)")
+    parser.add_argument('--workdir', default=None, help="run: botun log/önbellek dosyalarını yazacağı dizin")
+    parser.add_argument('--linger', type=float, default=2.0, help="run: fiyat yolu bittikten sonra beklenecek saniye")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.command == 'check':
+        _self_check()
+        return
+    exchange = build_exchange(args).start(args.host, args.port)
+    if args.command == 'run':
+        run_module(exchange, args.module, args.workdir, args.linger)
+        exchange.stop()
+        return
+    print(f"Sahte borsa {exchange.url} adresinde çalışıyor (REST: {exchange.url}/api, akış: ws{exchange.url[4:]}/ws)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exchange.stop()
+        for line in exchange.summary_lines():
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import json
+import logging
+from decimal import Decimal
+from binance.exceptions import BinanceAPIException
+
+AMEND_KEEP_PRIORITY_PATH = 'order/amend/keepPriority'
+# Emir artık yok (dolmuş ya da iptal edilmiş)
+UNKNOWN_ORDER_CODE = -2013
+
+ZERO = Decimal('0')
+
+# cancelReplace kısmen/tamamen başarısız olduğunda iki bacağın sonucu hata gövdesindeki `data` alanındadır
+def _error_data(e):
+    try:
+        return json.loads(e.response.text).get('data')
+    except (AttributeError, ValueError):
+        return None
+
+
+# Borsada duran bir limit emri. Fiyat/miktar değişikliği iptal + yeni emir yerine tek istekle
+# yapılır: yalnızca miktar azalıyorsa sırayı koruyan amend/keepPriority, aksi halde
+# cancelReplace (STOP_ON_FAILURE). Yerine konan emirlerin dolumları toplamda tutulur.
+class RestingOrder:
+    def __init__(self, client, symbol, side, instrument, quantity, price):
+        self.client = client
+        self.symbol = symbol
+        self.side = side
+        self.instrument = instrument
+        self.quantity = quantity
+        self.price = price
+        self.order_id = None
+        self.status = None
+        self.replaced_ids = []
+        # Kapanmış (yerine yenisi konmuş) emirlerden gelen dolumlar
+        self._closed_qty = ZERO
+        self._closed_quote = ZERO
+        # Açık emrin bilinen son dolumu
+        self._open_qty = ZERO
+        self._open_quote = ZERO
+
+    @classmethod
+    def place(cls, client, symbol, side, instrument, quantity, price, client_order_id=None):
+        quantity = instrument.round_quantity(quantity)
+        price = instrument.round_price(price)
+        resting = cls(client, symbol, side, instrument, quantity, price)
+        params = {} if client_order_id is None else {'newClientOrderId': client_order_id}
+        resting._apply(client.create_order(symbol=symbol, side=side, type='LIMIT', timeInForce='GTC',
+                                           quantity=instrument.format_quantity(quantity),
+                                           price=instrument.format_price(price), **params))
+        return resting
+
+    @property
+    def executed_qty(self):
+        return self._closed_qty + self._open_qty
+
+    @property
+    def remaining_qty(self):
+        return self.quantity - self.executed_qty
+
+    @property
+    def avg_price(self):
+        executed = self.executed_qty
+        return (self._closed_quote + self._open_quote) / executed if executed > 0 else None
+
+    def _apply(self, order):
+        self.order_id = order['orderId']
+        self.status = order['status']
+        self._open_qty = Decimal(order['executedQty'])
+        self._open_quote = Decimal(order['cummulativeQuoteQty'])
+
+    def _close(self, order):
+        self._closed_qty += Decimal(order['executedQty'])
+        self._closed_quote += Decimal(order['cummulativeQuoteQty'])
+        self._open_qty = self._open_quote = ZERO
+        self.replaced_ids.append(order['orderId'])
+        self.status = order['status']
+
+    def refresh(self):
+        self._apply(self.client.get_order(symbol=self.symbol, orderId=self.order_id))
+        return self
+
+    # Kullanıcı veri akışından gelen emir durumu (FillTracker.OrderState) ile güncelle
+    def update_from_state(self, state):
+        if state.order_id != self.order_id or state.executed_qty < self._open_qty:
+            return
+        if sum((f.qty for f in state.fills), ZERO) != state.executed_qty:
+            # Akış bazı dolumları kaçırmış, emri REST ile oku
+            self.refresh()
+            return
+        self.status = state.status
+        self._open_qty = state.executed_qty
+        self._open_quote = sum((f.price * f.qty for f in state.fills), ZERO)
+
+    # client_order_id yalnızca cancelReplace ile konan yeni emre verilir
+    def amend(self, price=None, quantity=None, client_order_id=None):
+        price = self.price if price is None else self.instrument.round_price(price)
+        quantity = self.quantity if quantity is None else self.instrument.round_quantity(quantity)
+        if price == self.price and quantity == self.quantity:
+            return True
+        if price == self.price and self.executed_qty < quantity < self.quantity:
+            try:
+                self._keep_priority(quantity)
+                return True
+            except BinanceAPIException as e:
+                if e.code == UNKNOWN_ORDER_CODE:
+                    self.refresh()
+                    return False
+                # Sembolde desteklenmiyorsa cancelReplace ile devam et
+                logging.warning(f"Sırayı koruyarak miktar düşürülemedi, cancelReplace kullanılıyor: {e}")
+        return self._cancel_replace(price, quantity, client_order_id)
+
+    def _keep_priority(self, quantity):
+        response = self.client._put(AMEND_KEEP_PRIORITY_PATH, True, data={
+            'symbol': self.symbol,
+            'orderId': self.order_id,
+            'newQty': self.instrument.format_quantity(quantity - self._closed_qty),
+        })
+        self._apply(response['amendedOrder'])
+        self.quantity = quantity
+
+    def _cancel_replace(self, price, quantity, client_order_id=None):
+        new_qty = self.instrument.round_quantity(quantity - self.executed_qty)
+        if new_qty <= 0 or not self.instrument.notional_ok(price, new_qty):
+            self.cancel()
+            return False
+        params = {} if client_order_id is None else {'newClientOrderId': client_order_id}
+        try:
+            response = self.client.cancel_replace_order(
+                symbol=self.symbol, side=self.side, type='LIMIT', timeInForce='GTC',
+                cancelReplaceMode='STOP_ON_FAILURE', cancelOrderId=self.order_id,
+                quantity=self.instrument.format_quantity(new_qty), price=self.instrument.format_price(price), **params)
+        except BinanceAPIException as e:
+            data = _error_data(e)
+            if data is None:
+                raise
+            if data.get('cancelResult') == 'SUCCESS':
+                # Eski emir iptal edildi ama yenisi reddedildi
+                self._apply(data['cancelResponse'])
+                logging.error(f"Yeni emir verilemedi ({self.symbol}): {data.get('newOrderResponse')}")
+            else:
+                # İptal başarısız: emir büyük olasılıkla bu arada doldu
+                self.refresh()
+            return False
+
+        self._close(response['cancelResponse'])
+        self._apply(response['newOrderResponse'])
+        self.price = price
+        self.quantity = quantity
+
+        # İptal anına kadar beklenenden fazla dolum olduysa yeni emri küçült
+        excess = self._closed_qty + new_qty - quantity
+        if excess > 0:
+            logging.warning(f"Değişiklik sırasında {excess} dolum oldu, yeni emir küçültülüyor: {self.order_id}")
+            try:
+                if new_qty - excess > 0:
+                    self._keep_priority(quantity)
+                else:
+                    self.cancel()
+            except BinanceAPIException as e:
+                logging.error(f"Fazla miktar düzeltilemedi: {e}")
+        return True
+
+    def cancel(self):
+        try:
+            response = self.client.cancel_order(symbol=self.symbol, orderId=self.order_id)
+        except BinanceAPIException as e:
+            if e.code != UNKNOWN_ORDER_CODE:
+                raise
+            return self.refresh()
+        self._apply(response)
+        return self
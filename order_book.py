@@ -0,0 +1,185 @@
+import time
+import logging
+import threading
+from bisect import bisect_left, insort
+from collections import deque, namedtuple
+from binance.exceptions import BinanceAPIException
+
+# vwap: beklenen ortalama fiyat, worst_price: tüketilen son seviye,
+# slippage: en iyi fiyata göre aleyhte sapma oranı (0.001 = %0.1)
+BookEstimate = namedtuple('BookEstimate', 'vwap worst_price filled_qty slippage')
+
+def _set_level(levels, keys, key, qty):
+    if qty == 0:
+        if levels.pop(key, None) is not None:
+            del keys[bisect_left(keys, key)]
+        return
+    if key not in levels:
+        insort(keys, key)
+    levels[key] = qty
+
+
+# Sembol başına yerel L2 emir defteri: REST derinlik görüntüsü + diff-depth akışı.
+# Olaylar U/u sıra numaralarıyla kontrol edilir; boşluk görülürse defter yeniden eşitlenir.
+# Tahmin amaçlı olduğu için fiyat/miktarlar float tutulur. Alış tarafı anahtarları negatif
+# fiyattır, böylece iki taraf da en iyi seviyeden başlayarak artan sırada gezilir.
+class OrderBook:
+    def __init__(self, client, symbol, twm, snapshot_limit=1000, interval=100,
+                 max_buffer=10000, retry_delay=2):
+        self.client = client
+        self.symbol = symbol.upper()
+        self.twm = twm
+        self.snapshot_limit = snapshot_limit
+        self.interval = interval
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        self._bids = {}
+        self._asks = {}
+        self._bid_keys = []
+        self._ask_keys = []
+        self._last_update_id = 0
+        self._synced = False
+        self._buffer = deque(maxlen=max_buffer)
+        self._resync = threading.Event()
+        self._ready = threading.Event()
+        self._stopped = False
+        self._stream_name = None
+        self._sync_thread = None
+
+    def start(self):
+        self._stream_name = self.twm.start_depth_socket(callback=self._on_message, symbol=self.symbol,
+                                                        interval=self.interval)
+        self._sync_thread = threading.Thread(target=self._sync_loop, name=f"order-book-{self.symbol}", daemon=True)
+        self._sync_thread.start()
+        self._resync.set()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._resync.set()
+        if self._stream_name is not None:
+            try:
+                self.twm.stop_socket(self._stream_name)
+            except Exception as e:
+                logging.warning(f"Derinlik akışı kapatılamadı: {e}")
+            self._stream_name = None
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def is_synced(self):
+        return self._synced
+
+    def best_bid(self):
+        with self._lock:
+            return -self._bid_keys[0] if self._bid_keys else None
+
+    def best_ask(self):
+        with self._lock:
+            return self._ask_keys[0] if self._ask_keys else None
+
+    # `side` emrin yönüdür: BUY satış tarafını (asks), SELL alış tarafını (bids) tüketir
+    def estimate(self, side, quantity):
+        quantity = float(quantity)
+        with self._lock:
+            if side == 'BUY':
+                levels, keys, sign = self._asks, self._ask_keys, 1.0
+            else:
+                levels, keys, sign = self._bids, self._bid_keys, -1.0
+            if not keys:
+                return BookEstimate(None, None, 0.0, None)
+            remaining = quantity
+            cost = 0.0
+            key = keys[0]
+            for key in keys:
+                take = min(levels[key], remaining)
+                cost += take * key
+                remaining -= take
+                if remaining <= 0:
+                    break
+            best = keys[0] * sign
+        filled = quantity - max(remaining, 0.0)
+        vwap = cost * sign / filled if filled else None
+        slippage = (vwap - best) / best * sign if vwap is not None else None
+        return BookEstimate(vwap, key * sign, filled, slippage)
+
+    def _on_message(self, msg):
+        if msg.get('e') == 'error':
+            logging.warning(f"Derinlik akışı hatası ({self.symbol}): {msg.get('m')}")
+            with self._lock:
+                self._invalidate()
+            return
+        with self._lock:
+            if not self._synced:
+                self._buffer.append(msg)
+                return
+            if msg['u'] <= self._last_update_id:
+                return
+            if msg['U'] > self._last_update_id + 1:
+                logging.warning(f"Derinlik akışında boşluk ({self.symbol}): beklenen {self._last_update_id + 1}, gelen {msg['U']}")
+                self._invalidate()
+                self._buffer.append(msg)
+                return
+            self._apply(msg)
+
+    # Kilit tutulurken çağrılır
+    def _invalidate(self):
+        self._synced = False
+        self._buffer.clear()
+        self._resync.set()
+
+    def _apply(self, msg):
+        for price, qty in msg['b']:
+            _set_level(self._bids, self._bid_keys, -float(price), float(qty))
+        for price, qty in msg['a']:
+            _set_level(self._asks, self._ask_keys, float(price), float(qty))
+        self._last_update_id = msg['u']
+
+    def _load_snapshot(self, snapshot):
+        self._bids.clear()
+        self._asks.clear()
+        self._bids.update((-float(p), float(q)) for p, q in snapshot['bids'])
+        self._asks.update((float(p), float(q)) for p, q in snapshot['asks'])
+        self._bid_keys[:] = sorted(self._bids)
+        self._ask_keys[:] = sorted(self._asks)
+        self._last_update_id = snapshot['lastUpdateId']
+
+    def _sync_loop(self):
+        while True:
+            self._resync.wait()
+            if self._stopped:
+                return
+            self._resync.clear()
+            try:
+                snapshot = self.client.get_order_book(symbol=self.symbol, limit=self.snapshot_limit)
+            except BinanceAPIException as e:
+                logging.error(f"Derinlik görüntüsü alınamadı ({self.symbol}): {e}")
+                time.sleep(self.retry_delay)
+                self._resync.set()
+                continue
+            except Exception as e:
+                logging.error(f"Derinlik görüntüsü alınamadı ({self.symbol}): {e}")
+                time.sleep(self.retry_delay)
+                self._resync.set()
+                continue
+            with self._lock:
+                self._load_snapshot(snapshot)
+                synced = True
+                for msg in self._buffer:
+                    if msg['u'] <= self._last_update_id:
+                        continue
+                    if msg['U'] > self._last_update_id + 1:
+                        # Görüntü akıştan geride kaldı; tamponu koruyup yeni görüntü al
+                        synced = False
+                        break
+                    self._apply(msg)
+                if synced:
+                    self._buffer.clear()
+                    self._synced = True
+            if not synced:
+                time.sleep(self.retry_delay)
+                self._resync.set()
+                continue
+            self._ready.set()
+            logging.info(f"Emir defteri eşitlendi ({self.symbol}): {self._last_update_id}")
@@ -0,0 +1,110 @@
+import time
+import struct
+from decimal import Decimal
+from multiprocessing import shared_memory
+
+# Süreçler arası fiyat veriyolu: sembol başına paylaşımlı bellekte tek bir yuva, her yuva ayrı bir
+# önbellek satırında. Tek yazar (piyasa verisi süreci) seqlock ile yazar: sıra numarası yazım
+# sırasında tektir, okuyucu tek sayı görürse ya da okuma boyunca sıra değişirse tekrar okur.
+# Okuyucular veriyi kopyalamadan doğrudan paylaşımlı tampondan çözer; kilit ve sistem çağrısı yoktur.
+# Yazar süreç yeniden başlarsa sıra numaraları kaldığı yerden (yarım yazım varsa çift sayıya yuvarlanıp) sürer.
+# Bellek, gözetmenin ve onun başlattığı süreçlerin ortak kaynak izleyicisine kayıtlıdır; ilgisiz bir
+# süreçten bağlanılırsa o sürecin izleyicisi çıkışta belleği silebilir.
+# Stratejiler yalnızca en son fiyata baktığı için ara fiyatlar tutulmaz (PriceFeed ile aynı mantık).
+#
+# Yerleşim: başlık (64 bayt) | sembol adları (16 bayt × n, 64'e yuvarlanır) | yuvalar (64 bayt × n)
+
+MAGIC = b'PBUS'
+HEADER = struct.Struct('<4sI')
+NAME = struct.Struct('16s')
+SEQ = struct.Struct('<Q')
+# Fiyat 1e-8 birimlik tam sayı olarak (Binance fiyatları en fazla 8 ondalık), zaman time.monotonic()
+VALUE = struct.Struct('<qd')
+SLOT_SIZE = 64
+HEADER_SIZE = 64
+PRICE_SCALE = 10 ** 8
+DECIMAL_SCALE = Decimal(PRICE_SCALE)
+
+def _round_up(size, block=64):
+    return (size + block - 1) // block * block
+
+
+class PriceBus:
+    def __init__(self, shm, symbols, owner):
+        self.shm = shm
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.owner = owner
+        self._buf = shm.buf
+        self._slots = HEADER_SIZE + _round_up(NAME.size * len(symbols))
+        self._written = [(self.sequence(i) + 1) & ~1 for i in range(len(symbols))]
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # Veriyolunu oluşturan süreç (gözetmen) kapanırken unlink() eder
+    @classmethod
+    def create(cls, symbols, name=None):
+        symbols = [symbol.upper() for symbol in symbols]
+        size = HEADER_SIZE + _round_up(NAME.size * len(symbols)) + SLOT_SIZE * len(symbols)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, len(symbols))
+        for i, symbol in enumerate(symbols):
+            NAME.pack_into(shm.buf, HEADER_SIZE + i * NAME.size, symbol.encode('ascii'))
+        return cls(shm, symbols, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        shm = shared_memory.SharedMemory(name=name)
+        magic, count = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            shm.close()
+            raise ValueError(f"Geçersiz fiyat veriyolu: {name}")
+        symbols = [NAME.unpack_from(shm.buf, HEADER_SIZE + i * NAME.size)[0].rstrip(b'\0').decode('ascii')
+                   for i in range(count)]
+        return cls(shm, symbols, owner=False)
+
+    def close(self):
+        self._buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # Yalnızca tek bir süreç yazar; sıra numarası yazarda tutulur, paylaşımlı bellekten okunmaz
+    def publish(self, index, price, updated=None):
+        offset = self._slots + index * SLOT_SIZE
+        seq = self._written[index]
+        SEQ.pack_into(self._buf, offset, seq + 1)
+        VALUE.pack_into(self._buf, offset + SEQ.size, int(price * PRICE_SCALE),
+                        time.monotonic() if updated is None else updated)
+        SEQ.pack_into(self._buf, offset, seq + 2)
+        self._written[index] = seq + 2
+
+    # Değişiklik kontrolü için ucuz okuma: 0 henüz fiyat yazılmadı demektir
+    def sequence(self, index):
+        return SEQ.unpack_from(self._buf, self._slots + index * SLOT_SIZE)[0]
+
+    # (sıra, fiyat, zaman); yazım sürerken okunan yuva atılır ve tekrar okunur. Yazar yazım ortasında
+    # ölmüşse yuva tek sayıda kalır; `retries` denemeden sonra None döner, yeni yazar düzeltene kadar atlanır.
+    def read(self, index, retries=1000):
+        offset = self._slots + index * SLOT_SIZE
+        buf = self._buf
+        for _ in range(retries):
+            seq = SEQ.unpack_from(buf, offset)[0]
+            if seq & 1:
+                continue
+            units, updated = VALUE.unpack_from(buf, offset + SEQ.size)
+            if SEQ.unpack_from(buf, offset)[0] == seq:
+                if seq == 0:
+                    return 0, None, 0.0
+                return seq, Decimal(units) / DECIMAL_SCALE, updated
+        return None
+
+    def price(self, symbol):
+        result = self.read(self.index[symbol.upper()])
+        return result[1] if result is not None else None
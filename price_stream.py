@@ -0,0 +1,145 @@
+import time
+import logging
+import threading
+from decimal import Decimal
+from binance.exceptions import BinanceAPIException
+
+# WebSocket üzerinden gelen fiyatları TP/SL kontrolüne ileten akış.
+# bookTicker kaynağında satış tarafı için geçerli olan en iyi alış (bid) fiyatı,
+# aggTrade kaynağında gerçekleşen son işlem fiyatı kullanılır.
+class PriceStream:
+    def __init__(self, client, symbol, twm, source='bookTicker', poll_interval=2,
+                 fallback_after=30, reconnect_after=60, max_backoff=30):
+        self.client = client
+        self.symbol = symbol.upper()
+        self.twm = twm
+        self.source = source
+        self.poll_interval = poll_interval
+        self.fallback_after = fallback_after
+        self.reconnect_after = reconnect_after
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._price = None
+        self._price_time = 0.0
+        self._seq = 0
+        self._last_message = 0.0
+        self._error = False
+        self._stopped = False
+        self._stream_name = None
+        self._watchdog = None
+
+    def start(self):
+        self._open_socket()
+        self._fill_gap()
+        self._watchdog = threading.Thread(target=self._watch, name=f"price-stream-{self.symbol}", daemon=True)
+        self._watchdog.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._close_socket()
+
+    def last_price(self):
+        with self._cond:
+            return self._price
+
+    # Son fiyatın geldiği an (time.monotonic); tikten karara geçen süreyi ölçmek için
+    def last_price_time(self):
+        with self._cond:
+            return self._price_time
+
+    def is_down(self):
+        with self._cond:
+            return self._error or time.monotonic() - self._last_message > self.fallback_after
+
+    # Yeni bir fiyat gelene kadar bekler. Akış çalışmıyorsa eski REST yoklama yoluna düşer.
+    def next_price(self, timeout=None):
+        timeout = self.poll_interval if timeout is None else timeout
+        with self._cond:
+            seq = self._seq
+            if self._cond.wait_for(lambda: self._seq != seq or self._stopped, timeout) and self._seq != seq:
+                return self._price
+        if self.is_down():
+            self._fill_gap()
+        return self.last_price()
+
+    def _open_socket(self):
+        if self.source == 'aggTrade':
+            self._stream_name = self.twm.start_aggtrade_socket(callback=self._on_message, symbol=self.symbol)
+        else:
+            self._stream_name = self.twm.start_symbol_book_ticker_socket(callback=self._on_message, symbol=self.symbol)
+        with self._cond:
+            self._error = False
+            self._last_message = time.monotonic()
+
+    def _close_socket(self):
+        if self._stream_name is None:
+            return
+        try:
+            self.twm.stop_socket(self._stream_name)
+        except Exception as e:
+            logging.warning(f"Fiyat akışı kapatılamadı: {e}")
+        self._stream_name = None
+
+    def _on_message(self, msg):
+        msg = msg.get('data', msg)
+        if msg.get('e') == 'error':
+            logging.warning(f"Fiyat akışı hatası ({self.symbol}): {msg.get('m')}")
+            with self._cond:
+                self._error = True
+            return
+        price = msg.get('p') if self.source == 'aggTrade' else msg.get('b')
+        if price is None:
+            return
+        self._publish(Decimal(price), from_stream=True)
+
+    def _publish(self, price, from_stream):
+        with self._cond:
+            self._price = price
+            self._seq += 1
+            self._price_time = time.monotonic()
+            if from_stream:
+                self._last_message = time.monotonic()
+                self._error = False
+            self._cond.notify_all()
+
+    # Yeniden bağlanma sonrası ve akış kesikken aradaki boşluğu REST ile doldur
+    def _fill_gap(self):
+        try:
+            price = Decimal(self.client.get_symbol_ticker(symbol=self.symbol)['price'])
+        except BinanceAPIException as e:
+            logging.error(f"Binance API hatası: {e}")
+            return
+        except Exception as e:
+            logging.error(f"Hata: {e}")
+            return
+        self._publish(price, from_stream=False)
+
+    def _watch(self):
+        backoff = 1
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._stopped, 1):
+                    return
+                broken = self._error or time.monotonic() - self._last_message > self.reconnect_after
+            if not broken:
+                backoff = 1
+                continue
+
+            logging.warning(f"Fiyat akışı kesildi ({self.symbol}), yeniden bağlanılıyor...")
+            print(f"Fiyat akışı kesildi ({self.symbol}), yeniden bağlanılıyor...")
+            self._close_socket()
+            try:
+                self._open_socket()
+                self._fill_gap()
+                logging.info(f"Fiyat akışı yeniden bağlandı: {self.symbol}")
+            except Exception as e:
+                logging.error(f"Fiyat akışına bağlanılamadı: {e}")
+                with self._cond:
+                    self._error = True
+                    if self._cond.wait_for(lambda: self._stopped, backoff):
+                        return
+                backoff = min(backoff * 2, self.max_backoff)
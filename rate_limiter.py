@@ -0,0 +1,314 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+from binance.exceptions import BinanceAPIException
+
+# Öncelik sırası: emir gönderme/iptal > hesap/emir durumu > bilgi amaçlı istekler
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_INFO = 2
+
+# Spot REST uç noktalarının istek ağırlıkları: (ağırlık, emir sayısı, öncelik)
+REQUEST_COSTS = {
+    'ping': (1, 0, PRIORITY_INFO),
+    'get_server_time': (1, 0, PRIORITY_INFO),
+    'get_exchange_info': (20, 0, PRIORITY_INFO),
+    'get_symbol_info': (20, 0, PRIORITY_INFO),
+    'get_recent_trades': (25, 0, PRIORITY_INFO),
+    'get_aggregate_trades': (4, 0, PRIORITY_INFO),
+    'get_klines': (2, 0, PRIORITY_INFO),
+    'get_avg_price': (2, 0, PRIORITY_INFO),
+    'get_account': (20, 0, PRIORITY_ACCOUNT),
+    'get_asset_balance': (20, 0, PRIORITY_ACCOUNT),
+    'get_order': (4, 0, PRIORITY_ACCOUNT),
+    'get_all_orders': (20, 0, PRIORITY_ACCOUNT),
+    'stream_get_listen_key': (2, 0, PRIORITY_ACCOUNT),
+    'stream_keepalive': (2, 0, PRIORITY_ACCOUNT),
+    'stream_close': (2, 0, PRIORITY_ACCOUNT),
+    'create_order': (1, 1, PRIORITY_ORDER),
+    'order_limit': (1, 1, PRIORITY_ORDER),
+    'order_limit_buy': (1, 1, PRIORITY_ORDER),
+    'order_limit_sell': (1, 1, PRIORITY_ORDER),
+    'order_market': (1, 1, PRIORITY_ORDER),
+    'order_market_buy': (1, 1, PRIORITY_ORDER),
+    'order_market_sell': (1, 1, PRIORITY_ORDER),
+    'create_oco_order': (1, 2, PRIORITY_ORDER),
+    'order_oco_buy': (1, 2, PRIORITY_ORDER),
+    'order_oco_sell': (1, 2, PRIORITY_ORDER),
+    'cancel_order': (1, 0, PRIORITY_ORDER),
+    'cancel_replace_order': (1, 1, PRIORITY_ORDER),
+    # İstemcide yalnızca order/amend/keepPriority için kullanılır; emir sayısına eklenmez
+    '_put': (4, 0, PRIORITY_ORDER),
+}
+# Ağırlığı parametreye göre değişen uç noktalar için varsayılan yoksa bu kullanılır
+DEFAULT_COST = (1, 0, PRIORITY_INFO)
+# Vekil istemcilerin (zamanlayıcı, metrikler, uç nokta havuzu) sardığı REST yöntemleri
+WRAPPED_PREFIXES = ('get_', 'order_', 'create_', 'cancel_', 'stream_', 'ping', '_put')
+# İmzalı istekte zaman damgası hatası; saat farkı yeniden ölçülüp bir kez tekrar denenir
+TIMESTAMP_ERROR_CODE = -1021
+# Öncelik sırası başında olmayan bekleyenlerin yeniden kontrol aralığı (saniye)
+POLL_INTERVAL = 0.05
+
+def _order_book_weight(limit):
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+def request_cost(method, params):
+    if method == 'get_order_book':
+        return _order_book_weight(int(params.get('limit', 100))), 0, PRIORITY_INFO
+    if method in ('get_symbol_ticker', 'get_orderbook_ticker'):
+        return (2 if 'symbol' in params else 4), 0, PRIORITY_INFO
+    if method == 'get_ticker':
+        return (2 if 'symbol' in params else 80), 0, PRIORITY_INFO
+    if method == 'get_open_orders':
+        return (6 if 'symbol' in params else 80), 0, PRIORITY_ACCOUNT
+    if method == 'get_my_trades':
+        return (5 if 'orderId' in params else 20), 0, PRIORITY_ACCOUNT
+    return REQUEST_COSTS.get(method, DEFAULT_COST)
+
+def retry_after(response):
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    def __init__(self, name, capacity, interval):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / interval
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # `reserve` kadar jeton daha düşük öncelikli isteklere kapalıdır
+    def wait_time(self, amount, reserve=0):
+        missing = min(amount + reserve, self.capacity) - self.tokens
+        return 0 if missing <= 0 else missing / self.rate
+
+    def consume(self, amount):
+        self.tokens -= amount
+
+    # Sunucunun bildirdiği kullanım yerel tahminden yüksekse ona uy
+    def sync_used(self, used):
+        self.tokens = min(self.tokens, self.capacity - used)
+
+
+# Binance istek ağırlığı ve emir sayısı limitlerini yerelde izler. Her limit için bir jeton
+# kovası tutulur, yanıt başlıklarındaki X-MBX-USED-WEIGHT / X-MBX-ORDER-COUNT değerleriyle
+# düzeltilir. Bekleyen istekler öncelik sırasıyla geçer; bilgi amaçlı istekler kapasitenin
+# bir kısmını emirler için boş bırakır. 429/418 yanıtlarında Retry-After kadar tüm istekler durur.
+class WeightScheduler:
+    def __init__(self, weight_limit=6000, order_limit=50, daily_order_limit=160000,
+                 headroom=0.9, reserve_fraction=0.2):
+        self.weight = TokenBucket('REQUEST_WEIGHT', weight_limit * headroom, 60)
+        self.orders = TokenBucket('ORDERS', order_limit * headroom, 10)
+        self.daily_orders = TokenBucket('ORDERS_1D', daily_order_limit * headroom, 86400)
+        self.reserve_fraction = reserve_fraction
+        self._header_buckets = {
+            'x-mbx-used-weight-1m': self.weight,
+            'x-mbx-order-count-10s': self.orders,
+            'x-mbx-order-count-1d': self.daily_orders,
+        }
+        self.blocked_until = 0.0
+        self.used_weight = 0
+        self._backoff = 1
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _wait_time(self, weight, orders, priority, now):
+        wait = max(0.0, self.blocked_until - now)
+        for bucket in (self.weight, self.orders, self.daily_orders):
+            bucket.refill(now)
+        reserve = self.weight.capacity * self.reserve_fraction * priority / PRIORITY_INFO
+        wait = max(wait, self.weight.wait_time(weight, reserve))
+        if orders:
+            wait = max(wait, self.orders.wait_time(orders), self.daily_orders.wait_time(orders))
+        return wait
+
+    # Kilit tutulurken çağrılır; 0 dönerse istek geçebilir
+    def _try_take(self, ticket, weight, orders):
+        if self._queue[0] is not ticket:
+            return POLL_INTERVAL
+        wait = self._wait_time(weight, orders, ticket[0], time.monotonic())
+        if wait > 0:
+            return wait
+        heapq.heappop(self._queue)
+        self.weight.consume(weight)
+        if orders:
+            self.orders.consume(orders)
+            self.daily_orders.consume(orders)
+        self._cond.notify_all()
+        return 0
+
+    def acquire(self, weight, orders=0, priority=PRIORITY_INFO):
+        with self._cond:
+            ticket = [priority, next(self._seq)]
+            heapq.heappush(self._queue, ticket)
+            self._cond.notify_all()
+            while True:
+                wait = self._try_take(ticket, weight, orders)
+                if wait == 0:
+                    return
+                self._cond.wait(wait)
+
+    # Beklemeden geçebiliyorsa ağırlığı düşüp True döner (ör. hedge edilen kopya okuma isteği).
+    # Kuyruktaki isteklerin önüne geçmez; bilgi isteklerinin ayrılmış payına dokunmaz.
+    def try_acquire(self, weight, priority=PRIORITY_INFO):
+        with self._cond:
+            if self._queue or self._wait_time(weight, 0, priority, time.monotonic()) > 0:
+                return False
+            self.weight.consume(weight)
+            return True
+
+    async def acquire_async(self, weight, orders=0, priority=PRIORITY_INFO):
+        with self._cond:
+            ticket = [priority, next(self._seq)]
+            heapq.heappush(self._queue, ticket)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_take(ticket, weight, orders)
+                if wait == 0:
+                    return
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+            raise
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        with self._cond:
+            for name, bucket in self._header_buckets.items():
+                value = headers.get(name)
+                if value is None:
+                    continue
+                used = int(value)
+                bucket.refill(time.monotonic())
+                bucket.sync_used(used)
+                if bucket is self.weight:
+                    self.used_weight = used
+
+    def on_success(self):
+        self._backoff = 1
+
+    def on_rate_limited(self, status_code, retry_after_seconds=None):
+        with self._cond:
+            if retry_after_seconds is None:
+                retry_after_seconds = self._backoff
+                self._backoff = min(self._backoff * 2, 120)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after_seconds)
+            self.weight.tokens = min(self.weight.tokens, 0)
+            self._cond.notify_all()
+        logging.warning(f"İstek limiti aşıldı (HTTP {status_code}), {retry_after_seconds} saniye bekleniyor.")
+        print(f"İstek limiti aşıldı (HTTP {status_code}), {retry_after_seconds} saniye bekleniyor.")
+
+    def blocked_for(self):
+        return max(0.0, self.blocked_until - time.monotonic())
+
+def is_rate_limited(e):
+    return e.status_code in (418, 429) or e.code == -1003
+
+
+# python-binance Client'ı saran vekil: her REST çağrısı zamanlayıcıdan geçer.
+# Nitelik atamaları (API_URL, timestamp_offset vb.) asıl istemciye yönlendirilir.
+class ScheduledClient:
+    def __init__(self, client, scheduler, max_retries=2):
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, 'scheduler', scheduler)
+        object.__setattr__(self, 'max_retries', max_retries)
+        object.__setattr__(self, 'clock', None)
+
+    # clock_sync.ClockSync bağlanırsa -1021 hatasında saat farkı yenilenip istek tekrarlanır
+    def attach_clock(self, clock):
+        object.__setattr__(self, 'clock', clock)
+
+    def __setattr__(self, name, value):
+        setattr(self._client, name, value)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not name.startswith(WRAPPED_PREFIXES):
+            return attr
+
+        def call(*args, **params):
+            weight, orders, priority = request_cost(name, params)
+            attempt = 0
+            clock_retried = False
+            while True:
+                self.scheduler.acquire(weight, orders, priority)
+                try:
+                    result = attr(*args, **params)
+                except BinanceAPIException as e:
+                    self.scheduler.update_from_headers(getattr(e.response, 'headers', None))
+                    if e.code == TIMESTAMP_ERROR_CODE and self.clock is not None and not clock_retried:
+                        clock_retried = True
+                        self.clock.on_api_error(e)
+                        continue
+                    if not is_rate_limited(e):
+                        raise
+                    self.scheduler.on_rate_limited(e.status_code, retry_after(e.response))
+                    # 418 IP yasağıdır, tekrar denemek yasağı uzatır
+                    if e.status_code == 418 or attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    continue
+                self.scheduler.update_from_headers(getattr(self._client.response, 'headers', None))
+                self.scheduler.on_success()
+                return result
+        return call
+
+
+class AsyncScheduledClient(ScheduledClient):
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not name.startswith(WRAPPED_PREFIXES):
+            return attr
+
+        async def call(*args, **params):
+            weight, orders, priority = request_cost(name, params)
+            attempt = 0
+            clock_retried = False
+            while True:
+                await self.scheduler.acquire_async(weight, orders, priority)
+                try:
+                    result = await attr(*args, **params)
+                except BinanceAPIException as e:
+                    self.scheduler.update_from_headers(getattr(e.response, 'headers', None))
+                    if e.code == TIMESTAMP_ERROR_CODE and self.clock is not None and not clock_retried:
+                        clock_retried = True
+                        await self.clock.sync_async()
+                        continue
+                    if not is_rate_limited(e):
+                        raise
+                    self.scheduler.on_rate_limited(e.status_code, retry_after(e.response))
+                    if e.status_code == 418 or attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    continue
+                # Eşzamanlı isteklerde response başka bir isteğe ait olabilir; kovalar yalnızca
+                # daha yüksek kullanım bildirildiğinde düzeltildiği için bu güvenlidir
+                self.scheduler.update_from_headers(getattr(self._client.response, 'headers', None))
+                self.scheduler.on_success()
+                return result
+        return call
@@ -0,0 +1,205 @@
+import hmac
+import json
+import time
+import hashlib
+import threading
+import http.client
+from urllib.parse import urlencode, urlsplit
+
+API_URL = 'https://api.binance.com/api'
+API_VERSION = 'v3'
+RECV_WINDOW = 5000
+# Sunucu saatiyle fark recvWindow'u aşınca dönen hata kodu; saat bir kez eşitlenip tekrar denenir
+TIMESTAMP_ERROR = -1021
+INVALID_SYMBOL = -1121
+
+class RestAPIException(Exception):
+    def __init__(self, status_code, code, message, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.response = response
+
+    def __str__(self):
+        return f"APIError(code={self.code}): {self.message}"
+
+
+class RestResponse:
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+# Botun kullandığı uçlarla sınırlı, yalnızca standart kütüphaneyle yazılmış imzalı REST istemcisi.
+# Yöntem adları ve parametreleri python-binance Client ile aynıdır; başlangıçta binance paketinin
+# (async istemci, dateparser vb.) içe aktarma maliyeti olmadan ilk emre kadar gelmek için kullanılır.
+# Her iş parçacığının uç nokta başına kalıcı (keep-alive) bir bağlantısı vardır. Emir istekleri
+# bağlantı hatasında tekrar gönderilmez; okuma istekleri kopan bağlantıda bir kez yeniden denenir.
+class RestClient:
+    def __init__(self, api_key=None, api_secret=None, api_url=API_URL, timeout=10, recv_window=RECV_WINDOW):
+        self.API_KEY = api_key
+        self.API_SECRET = api_secret
+        self.API_URL = api_url.rstrip('/')
+        self.timeout = timeout
+        self.recv_window = recv_window
+        self.timestamp_offset = 0
+        self.response = None
+        self._local = threading.local()
+
+    def _connections(self):
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        parts = urlsplit(self.API_URL)
+        return connections, (parts.scheme, parts.netloc), parts.path
+
+    def _connection(self):
+        connections, key, base_path = self._connections()
+        connection = connections.get(key)
+        if connection is None:
+            scheme, netloc = key
+            connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            connection = connections[key] = connection_class(netloc, timeout=self.timeout)
+        return connection, base_path
+
+    # Yarıda kalan istekten sonra bağlantı yeniden kullanılamaz (CannotSendRequest/ResponseNotReady)
+    def _drop_connection(self):
+        connections, key, _ = self._connections()
+        connection = connections.pop(key, None)
+        if connection is not None:
+            connection.close()
+
+    def _send(self, method, path, query, headers):
+        retry = method == 'GET'
+        while True:
+            connection, base_path = self._connection()
+            try:
+                connection.request(method, f"{base_path}/{API_VERSION}/{path}?{query}", headers=headers)
+                response = connection.getresponse()
+                return response.status, response.headers, response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self._drop_connection()
+                if not retry:
+                    raise
+                retry = False
+            except BaseException:
+                self._drop_connection()
+                raise
+
+    def _request(self, method, path, signed=False, api_key=False, **params):
+        params = {name: value for name, value in params.items() if value is not None}
+        headers = {}
+        if signed or api_key:
+            headers['X-MBX-APIKEY'] = self.API_KEY
+        for attempt in range(2):
+            query = params
+            if signed:
+                query = dict(params, recvWindow=params.get('recvWindow', self.recv_window),
+                             timestamp=int(time.time() * 1000 + self.timestamp_offset))
+            query = urlencode(query)
+            if signed:
+                signature = hmac.new(self.API_SECRET.encode('utf-8'), query.encode('utf-8'), hashlib.sha256).hexdigest()
+                query = f"{query}&signature={signature}"
+            status, response_headers, body = self._send(method, path, query, headers)
+            self.response = RestResponse(status, response_headers, body)
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise RestAPIException(status, 0, f"Geçersiz yanıt: {body[:200]!r}", self.response)
+            if status < 400:
+                return data
+            error = RestAPIException(status, data.get('code', 0), data.get('msg', ''), self.response)
+            if not (signed and error.code == TIMESTAMP_ERROR and attempt == 0):
+                raise error
+            self.sync_time()
+
+    # Tek örnekle saat farkı; gidiş-dönüş süresinin yarısı kadar düzeltilir
+    def sync_time(self):
+        t0 = time.time()
+        server_ms = self.get_server_time()['serverTime']
+        t1 = time.time()
+        self.timestamp_offset = int(server_ms - (t0 + t1) / 2 * 1000)
+        return self.timestamp_offset
+
+    def ping(self):
+        return self._request('GET', 'ping')
+
+    def get_server_time(self):
+        return self._request('GET', 'time')
+
+    def get_exchange_info(self, **params):
+        return self._request('GET', 'exchangeInfo', **params)
+
+    def get_symbol_info(self, symbol):
+        try:
+            info = self.get_exchange_info(symbol=symbol.upper())
+        except RestAPIException as e:
+            if e.code == INVALID_SYMBOL:
+                return None
+            raise
+        return info['symbols'][0] if info.get('symbols') else None
+
+    def get_symbol_ticker(self, **params):
+        return self._request('GET', 'ticker/price', **params)
+
+    def get_orderbook_ticker(self, **params):
+        return self._request('GET', 'ticker/bookTicker', **params)
+
+    def get_avg_price(self, **params):
+        return self._request('GET', 'avgPrice', **params)
+
+    def get_order_book(self, **params):
+        return self._request('GET', 'depth', **params)
+
+    def get_klines(self, **params):
+        return self._request('GET', 'klines', **params)
+
+    def get_account(self, **params):
+        return self._request('GET', 'account', signed=True, **params)
+
+    def get_order(self, **params):
+        return self._request('GET', 'order', signed=True, **params)
+
+    def get_open_orders(self, **params):
+        return self._request('GET', 'openOrders', signed=True, **params)
+
+    def get_all_orders(self, **params):
+        return self._request('GET', 'allOrders', signed=True, **params)
+
+    def get_my_trades(self, **params):
+        return self._request('GET', 'myTrades', signed=True, **params)
+
+    def create_order(self, **params):
+        return self._request('POST', 'order', signed=True, **params)
+
+    def order_market_buy(self, **params):
+        return self.create_order(side='BUY', type='MARKET', **params)
+
+    def order_market_sell(self, **params):
+        return self.create_order(side='SELL', type='MARKET', **params)
+
+    def order_limit_buy(self, timeInForce='GTC', **params):
+        return self.create_order(side='BUY', type='LIMIT', timeInForce=timeInForce, **params)
+
+    def order_limit_sell(self, timeInForce='GTC', **params):
+        return self.create_order(side='SELL', type='LIMIT', timeInForce=timeInForce, **params)
+
+    def cancel_order(self, **params):
+        return self._request('DELETE', 'order', signed=True, **params)
+
+    def create_oco_order(self, **params):
+        return self._request('POST', 'orderList/oco', signed=True, **params)
+
+    def cancel_replace_order(self, **params):
+        return self._request('POST', 'order/cancelReplace', signed=True, **params)
+
+    def stream_get_listen_key(self):
+        return self._request('POST', 'userDataStream', api_key=True)['listenKey']
+
+    def stream_keepalive(self, listenKey):
+        return self._request('PUT', 'userDataStream', api_key=True, listenKey=listenKey)
+
+    def stream_close(self, listenKey):
+        return self._request('DELETE', 'userDataStream', api_key=True, listenKey=listenKey)
@@ -0,0 +1,142 @@
+from decimal import Decimal
+from instrument import floor_to_step
+
+# Kar/zarar ile çıkış sonrası yeniden alım, satış fiyatının bu katından limit emirle yapılır
+TP_REENTRY_FACTOR = Decimal('0.997')
+SL_REENTRY_FACTOR = Decimal('0.98')
+# Üst üste bu kadar zarardan sonra bot durur
+MAX_LOSS_COUNT = 5
+# Dolmayan limit emirleri bu süre sonunda iptal edilir (saniye)
+LIMIT_FILL_TIMEOUT = 15 * 60
+
+def exit_levels(entry_price, profit_percentage, loss_percentage, tick_size):
+    take_profit_price = entry_price * (Decimal('1') + profit_percentage / Decimal('100'))
+    stop_loss_price = entry_price * (Decimal('1') - loss_percentage / Decimal('100'))
+    return floor_to_step(take_profit_price, tick_size), floor_to_step(stop_loss_price, tick_size)
+
+def reentry_price(sell_price, factor, tick_size):
+    return floor_to_step(sell_price * factor, tick_size)
+
+# Çıkış seviyesi modları: SABIT girişte bir kez hesaplanır; IZSUREN ve ATR her tikte güncellenir
+EXIT_MODES = ('SABIT', 'IZSUREN', 'ATR')
+NO_TARGET = Decimal('Infinity')
+
+# Seviyeler float gölgeleriyle takip edilir; Decimal'e yalnızca seviye en az bir adım değişince çevrilir,
+# böylece tik başına maliyet birkaç float karşılaştırmasıdır.
+class FixedExit:
+    def __init__(self, entry_price, profit_percentage, loss_percentage, tick_size):
+        self.entry_price = entry_price
+        self.tick_size = tick_size
+        self.take_profit_price, self.stop_loss_price = exit_levels(entry_price, profit_percentage,
+                                                                   loss_percentage, tick_size)
+        self._tick = float(tick_size)
+        self._stop = float(self.stop_loss_price)
+
+    # Seviyeler değiştiyse True
+    def update(self, price):
+        return False
+
+    # Zarar durdurma girişin üstüne çıktıysa tetiklenmesi karla çıkış demektir
+    def locks_profit(self):
+        return self.stop_loss_price > self.entry_price
+
+    # Yeniden başlatmada günlükteki seviyelere dönülür
+    def restore(self, take_profit_price, stop_loss_price):
+        self.take_profit_price = take_profit_price
+        self.stop_loss_price = stop_loss_price
+        self._stop = float(stop_loss_price)
+
+    def _raise_stop(self, stop):
+        if stop < self._stop + self._tick:
+            return False
+        self.stop_loss_price = floor_to_step(Decimal(repr(stop)), self.tick_size)
+        self._stop = float(self.stop_loss_price)
+        return True
+
+
+# Kar hedefinde satılmaz: hedef görülünce zarar durdurma en yüksek fiyatın `trail_percentage` altına
+# çekilir ve yalnızca yukarı taşınır; fiyat bu seviyeye dönünce satılır.
+class TrailingExit(FixedExit):
+    def __init__(self, entry_price, profit_percentage, loss_percentage, tick_size, trail_percentage=None):
+        super().__init__(entry_price, profit_percentage, loss_percentage, tick_size)
+        self.trail = float(trail_percentage if trail_percentage is not None else loss_percentage) / 100
+        self.active = False
+        self._activation = float(self.take_profit_price)
+
+    def update(self, price):
+        price = float(price)
+        if not self.active:
+            if price < self._activation:
+                return False
+            self.active = True
+            self.take_profit_price = NO_TARGET
+            self._raise_stop(price * (1 - self.trail))
+            return True
+        return self._raise_stop(price * (1 - self.trail))
+
+    def restore(self, take_profit_price, stop_loss_price):
+        super().restore(take_profit_price, stop_loss_price)
+        self.active = take_profit_price == NO_TARGET
+
+
+# Oynaklığa göre ölçeklenen seviyeler: kar hedefi giriş + kar katı × ATR, zarar durdurma en yüksek
+# fiyat − zarar katı × ATR (yalnızca yukarı). ATR henüz hesaplanmadıysa yüzdeli seviyeler kullanılır.
+class ATRExit(FixedExit):
+    def __init__(self, entry_price, profit_percentage, loss_percentage, tick_size, indicators,
+                 profit_multiple, loss_multiple):
+        super().__init__(entry_price, profit_percentage, loss_percentage, tick_size)
+        self.indicators = indicators
+        self.profit_multiple = float(profit_multiple)
+        self.loss_multiple = float(loss_multiple)
+        self.high = float(entry_price)
+        self._entry = float(entry_price)
+        self._atr = None
+        self._take_profit = float(self.take_profit_price)
+        self._restored = False
+        if indicators.atr.value is not None:
+            self._apply_atr(indicators.atr.value)
+
+    # Geri yüklenen zarar durdurma ilk ATR değeriyle aşağı çekilmez
+    def restore(self, take_profit_price, stop_loss_price):
+        super().restore(take_profit_price, stop_loss_price)
+        self._take_profit = float(take_profit_price)
+        self._restored = True
+
+    def _apply_atr(self, atr):
+        first = self._atr is None
+        self._atr = atr
+        take_profit = self._entry + self.profit_multiple * atr
+        changed = False
+        if abs(take_profit - self._take_profit) >= self._tick:
+            self.take_profit_price = floor_to_step(Decimal(repr(take_profit)), self.tick_size)
+            self._take_profit = float(self.take_profit_price)
+            changed = True
+        stop = self.high - self.loss_multiple * atr
+        if first and not self._restored:
+            # İlk ATR değeri yüzdeli zarar durdurmanın yerini alır (aşağı da inebilir)
+            self.stop_loss_price = floor_to_step(Decimal(repr(max(stop, self._tick))), self.tick_size)
+            self._stop = float(self.stop_loss_price)
+            return True
+        return self._raise_stop(stop) or changed
+
+    def update(self, price):
+        price = float(price)
+        atr = self.indicators.atr.value
+        if price > self.high:
+            self.high = price
+        elif atr == self._atr:
+            return False
+        if atr is None:
+            return False
+        if atr != self._atr:
+            return self._apply_atr(atr)
+        return self._raise_stop(self.high - self.loss_multiple * atr)
+
+def make_exit(mode, entry_price, profit_percentage, loss_percentage, tick_size, indicators=None,
+              profit_multiple=None, loss_multiple=None):
+    if mode == 'IZSUREN':
+        return TrailingExit(entry_price, profit_percentage, loss_percentage, tick_size)
+    if mode == 'ATR':
+        return ATRExit(entry_price, profit_percentage, loss_percentage, tick_size, indicators,
+                       profit_multiple, loss_multiple)
+    return FixedExit(entry_price, profit_percentage, loss_percentage, tick_size)
@@ -0,0 +1,346 @@
+import os
+import json
+import time
+import queue
+import signal
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from binance import AsyncClient, BinanceSocketManager
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+from engine import Engine, MarketDataMux, PriceFeed
+from exchange_info import SymbolRegistry
+from log_pipeline import setup_logging
+from price_bus import PriceBus
+
+# Çok sembollü motoru çekirdek başına bir işçi sürece böler. Tek bir piyasa verisi süreci tüm
+# sembollerin bookTicker akışını okuyup son fiyatları paylaşımlı bellekteki veriyoluna yazar;
+# işçiler fiyatı buradan kopyasız okur, her biri kendi payındaki semboller için engine.Engine
+# çalıştırır. Çöken süreçler artan beklemeyle yeniden başlatılır; kısa sürede çok kez çöken
+# işçinin sembolleri çalışan işçilere dağıtılır. Yeniden başlatılan ya da taşınan semboller yeni
+# girişle değil, önceki çalışmanın açık emirleri ve pozisyonu toparlanarak devam eder.
+#
+#   python supervisor.py strateji.json --workers 4
+
+# spawn: işçiler ebeveynin iş parçacıklarını ve olay döngüsünü devralmaz
+START_METHOD = 'spawn'
+# Veriyolu bu aralıkla taranır (saniye)
+BUS_POLL_INTERVAL = 0.005
+# Yeniden başlatmalar arasındaki en uzun bekleme (saniye)
+MAX_RESTART_DELAY = 60
+
+
+# İşçi süreçte PriceFeed'leri veriyolundan besler; yalnızca sıra numarası değişen semboller yayınlanır.
+# Sonradan abone olunan semboller bir sonraki taramada okunmaya başlar.
+class BusMarketData:
+    def __init__(self, bus, poll_interval=BUS_POLL_INTERVAL):
+        self.bus = bus
+        self.poll_interval = poll_interval
+        self.feeds = {}
+        self._seqs = {}
+
+    def subscribe(self, symbol):
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            if symbol not in self.bus.index:
+                raise KeyError(f"Fiyat veriyolunda olmayan sembol: {symbol}")
+            feed = self.feeds[symbol] = PriceFeed(symbol)
+        return feed
+
+    def poll(self):
+        for symbol, feed in list(self.feeds.items()):
+            index = self.bus.index[symbol]
+            if self.bus.sequence(index) == self._seqs.get(symbol, 0):
+                continue
+            result = self.bus.read(index)
+            if result is None:
+                continue
+            seq, price, updated = result
+            self._seqs[symbol] = seq
+            feed.publish(price)
+            # Gecikme ölçümü tikin veriyoluna yazıldığı andan başlasın (monotonic saat süreçler arası ortak)
+            feed.updated = updated
+
+    async def run(self):
+        while True:
+            self.poll()
+            await asyncio.sleep(self.poll_interval)
+
+
+# MarketDataMux'un PriceFeed yerine beslediği, fiyatı veriyolundaki yuvaya yazan nesne
+class BusWriter:
+    def __init__(self, bus, index):
+        self.bus = bus
+        self.index = index
+
+    def publish(self, price):
+        self.bus.publish(self.index, price)
+
+
+# Piyasa verisi süreci için MarketDataMux'un motordan beklediği iki şey: soket yöneticisi ve REST çağrısı
+class IngestSource:
+    def __init__(self, client):
+        self.client = client
+        self.bsm = BinanceSocketManager(client)
+
+    async def call(self, method, **params):
+        return await getattr(self.client, method)(**params)
+
+
+async def _ingest_main(bus_name, reconnect_delay):
+    bus = PriceBus.attach(bus_name)
+    client = await AsyncClient.create()
+    try:
+        mux = MarketDataMux(IngestSource(client), reconnect_delay)
+        mux.feeds = {symbol: BusWriter(bus, i) for i, symbol in enumerate(bus.symbols)}
+        logging.info(f"Piyasa verisi süreci başladı: {len(bus.symbols)} sembol")
+        await mux.run()
+    finally:
+        await client.close_connection()
+        bus.close()
+
+def run_ingest(bus_name, reconnect_delay=5):
+    setup_logging(log_file='trading_bot.ingest.log', event_file=None, console=False)
+    try:
+        asyncio.run(_ingest_main(bus_name, reconnect_delay))
+    except KeyboardInterrupt:
+        pass
+
+
+# Gözetmenden gelen komutlar: ('add', strateji) çalışırken sembol ekler, ('stop',) işçiyi durdurur
+async def _read_inbox(engine, inbox, run_task):
+    while True:
+        try:
+            command = inbox.get_nowait()
+        except queue.Empty:
+            await asyncio.sleep(1)
+            continue
+        if command[0] == 'add':
+            engine.add_strategy(command[1])
+            logging.info(f"İşçiye sembol eklendi: {command[1]['symbol']}")
+        elif command[0] == 'stop':
+            run_task.cancel()
+            return
+
+async def _worker_main(config, strategies, bus_name, inbox, api_key, api_secret):
+    bus = PriceBus.attach(bus_name)
+    client = await AsyncClient.create(api_key, api_secret)
+    try:
+        engine = Engine(client, {**config, 'strategies': strategies}, market_data=BusMarketData(bus))
+        run_task = asyncio.create_task(engine.run())
+        inbox_task = asyncio.create_task(_read_inbox(engine, inbox, run_task))
+        try:
+            await run_task
+        except asyncio.CancelledError:
+            logging.info("İşçi durduruldu.")
+        finally:
+            inbox_task.cancel()
+    finally:
+        await client.close_connection()
+        bus.close()
+
+def run_worker(index, config, strategies, bus_name, inbox, api_key, api_secret):
+    setup_logging(log_file=f"trading_bot.worker{index}.log", event_file=f"trading_events.worker{index}.jsonl")
+    try:
+        asyncio.run(_worker_main(config, strategies, bus_name, inbox, api_key, api_secret))
+    except KeyboardInterrupt:
+        pass
+
+
+# Stratejiler sembol adına göre sıralanıp işçilere sırayla dağıtılır
+def shard_strategies(strategies, workers):
+    ordered = sorted(strategies, key=lambda s: s['symbol'].upper())
+    return [ordered[i::workers] for i in range(workers)]
+
+# İşçiler hesabın istek ağırlığı ve emir limitlerini paylaşır; her birine eşit pay verilir
+def worker_config(config, index, workers):
+    worker = dict(config)
+    worker['weight_limit'] = max(1, config.get('weight_limit', 6000) // workers)
+    worker['order_limit'] = max(1, config.get('order_limit', 50) // workers)
+    worker['metrics_textfile'] = f"trading_bot.worker{index}.prom"
+    if config.get('metrics_port'):
+        worker['metrics_port'] = config['metrics_port'] + index
+    return worker
+
+
+# Çöken işçinin pozisyonu ve bekleyen emirleri olabilir; strateji yeniden girmeden önce bunları toparlar
+def recovering(strategy):
+    return {**strategy, 'recover': True}
+
+
+class ProcessSlot:
+    def __init__(self, name, strategies=None):
+        self.name = name
+        self.strategies = list(strategies or [])
+        self.process = None
+        self.inbox = None
+        self.crashes = []
+        self.restart_at = None
+        self.finished = False
+        self.retired = False
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def active(self):
+        return not self.finished and not self.retired
+
+
+class Supervisor:
+    def __init__(self, config, api_key, api_secret, workers=None, max_restarts=5, restart_window=300,
+                 poll_interval=1):
+        self.config = config
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.poll_interval = poll_interval
+        self.ctx = multiprocessing.get_context(START_METHOD)
+
+        strategies = config['strategies']
+        workers = workers or config.get('workers') or max(1, (os.cpu_count() or 2) - 1)
+        self.worker_count = max(1, min(workers, len(strategies)))
+        self.symbols = sorted({s['symbol'].upper() for s in strategies})
+        self.bus = None
+        self.ingest = ProcessSlot('piyasa-verisi')
+        self.slots = [ProcessSlot(f"işçi-{i}", shard)
+                      for i, shard in enumerate(shard_strategies(strategies, self.worker_count))]
+
+    def _start_ingest(self):
+        self.ingest.process = self.ctx.Process(target=run_ingest, args=(self.bus.name,), name='ingest', daemon=True)
+        self.ingest.process.start()
+        self.ingest.restart_at = None
+
+    def _start_worker(self, index):
+        slot = self.slots[index]
+        slot.inbox = self.ctx.Queue()
+        slot.process = self.ctx.Process(target=run_worker, name=f"worker-{index}", daemon=True,
+                                        args=(index, worker_config(self.config, index, self.worker_count),
+                                              slot.strategies, self.bus.name, slot.inbox,
+                                              self.api_key, self.api_secret))
+        slot.process.start()
+        slot.restart_at = None
+        symbols = ', '.join(s['symbol'].upper() for s in slot.strategies)
+        logging.info(f"{slot.name} başlatıldı (pid {slot.process.pid}): {symbols}")
+        print(f"{slot.name} başlatıldı: {symbols}")
+
+    # Süreç bittiyse: 0 kodu stratejilerin tamamlandığı anlamına gelir, diğerleri çökme sayılır.
+    # Çökmeler artan beklemeyle yeniden başlatılır; pencere içinde sınır aşılırsa True döner.
+    def _check(self, slot):
+        if slot.process is None or slot.process.exitcode is None:
+            return False
+        code = slot.process.exitcode
+        slot.process = None
+        if code == 0 and slot is not self.ingest:
+            slot.finished = True
+            logging.info(f"{slot.name} tüm stratejilerini tamamladı.")
+            return False
+        now = time.monotonic()
+        slot.crashes = [t for t in slot.crashes if now - t < self.restart_window] + [now]
+        if len(slot.crashes) > self.max_restarts and slot is not self.ingest:
+            return True
+        if slot is not self.ingest:
+            slot.strategies = [recovering(strategy) for strategy in slot.strategies]
+        delay = min(MAX_RESTART_DELAY, 2 ** (len(slot.crashes) - 1))
+        slot.restart_at = now + delay
+        logging.error(f"{slot.name} çıkış kodu {code} ile durdu, {delay} sn sonra yeniden başlatılacak.")
+        print(f"{slot.name} çıkış kodu {code} ile durdu, {delay} sn sonra yeniden başlatılacak.")
+        return False
+
+    # Sürekli çöken işçi emekliye ayrılır; sembolleri en az yüklü çalışan işçilere komutla eklenir
+    def _rebalance(self, slot):
+        slot.retired = True
+        targets = [s for s in self.slots if s.active() and s.alive()]
+        if not targets:
+            logging.error(f"{slot.name} emekliye ayrıldı, sembollerini alacak çalışan işçi yok.")
+            print(f"{slot.name} emekliye ayrıldı, sembollerini alacak çalışan işçi yok.")
+            return
+        for strategy in map(recovering, slot.strategies):
+            target = min(targets, key=lambda s: len(s.strategies))
+            target.strategies.append(strategy)
+            target.inbox.put(('add', strategy))
+            logging.warning(f"{strategy['symbol']} {slot.name} -> {target.name} taşındı.")
+            print(f"{strategy['symbol']} {slot.name} -> {target.name} taşındı.")
+        slot.strategies = []
+
+    def _prepare_symbols(self):
+        # exchangeInfo önbelleği bir kez yenilenir; işçiler diskteki önbellekten okur
+        registry = SymbolRegistry(Client(self.api_key, self.api_secret, ping=False), refresh_interval=0).start()
+        missing = [symbol for symbol in self.symbols if registry.get(symbol) is None]
+        if missing:
+            raise ValueError(f"Symbol bilgisi bulunamadı: {', '.join(missing)}")
+
+    def run(self):
+        self._prepare_symbols()
+        self.bus = PriceBus.create(self.symbols)
+        try:
+            self._start_ingest()
+            for index in range(len(self.slots)):
+                self._start_worker(index)
+            while any(slot.active() for slot in self.slots):
+                time.sleep(self.poll_interval)
+                now = time.monotonic()
+                self._check(self.ingest)
+                if self.ingest.process is None and self.ingest.restart_at <= now:
+                    self._start_ingest()
+                for index, slot in enumerate(self.slots):
+                    if not slot.active():
+                        continue
+                    if self._check(slot):
+                        self._rebalance(slot)
+                    elif slot.process is None and slot.restart_at is not None and slot.restart_at <= now:
+                        self._start_worker(index)
+            logging.info("Tüm işçiler tamamlandı.")
+            print("Tüm işçiler tamamlandı.")
+        finally:
+            self.stop()
+
+    def stop(self, timeout=10):
+        for slot in self.slots:
+            if slot.alive():
+                slot.inbox.put(('stop',))
+        deadline = time.monotonic() + timeout
+        for slot in [*self.slots, self.ingest]:
+            if slot is self.ingest and slot.alive():
+                slot.process.terminate()
+            if slot.process is not None:
+                slot.process.join(max(0.0, deadline - time.monotonic()))
+                if slot.process.is_alive():
+                    slot.process.terminate()
+                    slot.process.join()
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def main():
+    parser = argparse.ArgumentParser(description="Sembolleri çekirdek başına işçi süreçlere bölerek çalıştırır")
+    parser.add_argument('config', help="Strateji yapılandırması (JSON, engine.py ile aynı biçim)")
+    parser.add_argument('--workers', type=int, default=None, help="İşçi süreç sayısı (varsayılan: çekirdek - 1)")
+    parser.add_argument('--max-restarts', type=int, default=5, help="Pencere içinde izin verilen çökme sayısı")
+    parser.add_argument('--restart-window', type=int, default=300, help="Çökme penceresi (saniye)")
+    args = parser.parse_args()
+
+    setup_logging()
+    with open(args.config, encoding='utf-8') as f:
+        config = json.load(f)
+    api_key = os.environ.get('BINANCE_API_KEY') or input("API Anahtarınızı Girin: ")
+    api_secret = os.environ.get('BINANCE_API_SECRET') or input("API Gizli Anahtarınızı Girin: ")
+    supervisor = Supervisor(config, api_key, api_secret, args.workers, args.max_restarts, args.restart_window)
+    # SIGTERM'de de işçiler düzgün durdurulsun
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        print("Gözetmen durduruldu.")
+    except (BinanceAPIException, ValueError) as e:
+        logging.error(f"Gözetmen başlatılamadı: {e}")
+        print(f"Gözetmen başlatılamadı: {e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import csv
+import json
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from backtest import run_backtest, load_klines_csv, load_aggtrades_csv
+from market_data import open_store, MARKET_DATA_ROOT
+from strategy import LIMIT_FILL_TIMEOUT
+
+GRID_KEYS = ('profit_percentage', 'loss_percentage', 'allocation_percentage', 'tp_reentry_factor', 'sl_reentry_factor')
+DEFAULT_GRID = {
+    'profit_percentage': ['0.3'],
+    'loss_percentage': ['1'],
+    'allocation_percentage': ['100'],
+    'tp_reentry_factor': ['0.997'],
+    'sl_reentry_factor': ['0.98'],
+}
+# Her görevde birden fazla ızgara noktası çalıştırılır, süreçler arası mesaj sayısı azalır
+POINTS_PER_TASK = 8
+
+STORE_COLUMNS = {
+    'klines': {'prices': 'close', 'highs': 'high', 'lows': 'low', 'opens': 'open', 'timestamps': 'time'},
+    'aggtrades': {'prices': 'price', 'timestamps': 'time'},
+}
+
+# Fiyat dizileri bir kez .npy olarak yazılır; işçi süreçler bunları mmap ile açar ve
+# işletim sisteminin sayfa önbelleğini paylaşır. Görevlerle birlikte dizi taşınmaz.
+# Yerel piyasa verisi deposundaki (market_data) sütunlar zaten ham dosya olduğundan
+# doğrudan memmap edilir.
+def prepare_arrays(symbols, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = {}
+    for symbol, spec in symbols.items():
+        if 'dataset' in spec:
+            store = open_store(symbol, spec['dataset'], spec.get('store', MARKET_DATA_ROOT))
+            paths[symbol] = {c: (store.column_path(name), store.schema[name], store.count)
+                             for c, name in STORE_COLUMNS[store.kind].items()}
+            continue
+        columns = ('prices', 'highs', 'lows', 'opens', 'timestamps') if spec.get('kind', 'klines') == 'klines' else ('prices', 'timestamps')
+        symbol_paths = {c: os.path.join(cache_dir, f"{symbol}.{c}.npy") for c in columns}
+        source_mtime = os.path.getmtime(spec['csv'])
+        if not all(os.path.exists(p) and os.path.getmtime(p) >= source_mtime for p in symbol_paths.values()):
+            data = load_klines_csv(spec['csv']) if spec.get('kind', 'klines') == 'klines' else load_aggtrades_csv(spec['csv'])
+            for column, path in symbol_paths.items():
+                np.save(path, np.ascontiguousarray(data[column]))
+        paths[symbol] = symbol_paths
+    return paths
+
+_ARRAY_PATHS = {}
+_ARRAYS = {}
+
+def _init_worker(array_paths):
+    _ARRAY_PATHS.update(array_paths)
+
+def _open_array(source):
+    if isinstance(source, tuple):
+        path, dtype, count = source
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+    return np.load(source, mmap_mode='r')
+
+def _arrays(symbol):
+    arrays = _ARRAYS.get(symbol)
+    if arrays is None:
+        arrays = _ARRAYS[symbol] = {c: _open_array(source) for c, source in _ARRAY_PATHS[symbol].items()}
+    return arrays
+
+def _run_points(symbol, spec, points, settings):
+    arrays = _arrays(symbol)
+    rows = []
+    for point in points:
+        result = run_backtest(
+            arrays['prices'], point['profit_percentage'], point['loss_percentage'],
+            spec['step_size'], spec['tick_size'],
+            allocation_percentage=point['allocation_percentage'],
+            tp_reentry_factor=point['tp_reentry_factor'],
+            sl_reentry_factor=point['sl_reentry_factor'],
+            min_qty=spec.get('min_qty', '0'), min_notional=spec.get('min_notional', '10'),
+            initial_balance=settings.get('initial_balance', 1000),
+            taker_fee=settings.get('taker_fee', '0.001'), maker_fee=settings.get('maker_fee', '0.001'),
+            highs=arrays.get('highs'), lows=arrays.get('lows'), opens=arrays.get('opens'),
+            # fill_timeout saniye verilir, zaman damgaları milisaniyedir
+            timestamps=arrays.get('timestamps'),
+            fill_timeout=float(settings.get('fill_timeout', LIMIT_FILL_TIMEOUT)) * 1000,
+        )
+        rows.append(dict(point, symbol=symbol,
+                         pnl=float(result.pnl), pnl_percentage=float(result.pnl_percentage),
+                         max_drawdown=result.max_drawdown, trade_count=result.trade_count,
+                         wins=result.wins, losses=result.losses, fees=float(result.fees),
+                         stop_reason=result.stop_reason))
+    return rows
+
+def point_key(symbol, point):
+    return json.dumps([symbol] + [str(point[k]) for k in GRID_KEYS])
+
+def grid_points(grid):
+    values = [[str(v) for v in grid.get(k, DEFAULT_GRID[k])] for k in GRID_KEYS]
+    for combo in itertools.product(*values):
+        yield dict(zip(GRID_KEYS, combo))
+
+def load_done(results_path):
+    done = {}
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Yarıda kesilmiş son satır
+                continue
+            done[point_key(row['symbol'], row)] = row
+    return done
+
+def rank(rows):
+    return sorted(rows, key=lambda r: (-r['pnl'], r['max_drawdown'], -r['trade_count']))
+
+# Semboller x ızgara noktalarını tüm çekirdeklere dağıtır. Biten her nokta sonuç dosyasına
+# hemen eklenir; yarıda kalan tarama aynı komutla devam ettirildiğinde bu noktalar atlanır.
+def run_sweep(config, out_dir, workers=None):
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, 'results.jsonl')
+    symbols = config['symbols']
+    array_paths = prepare_arrays(symbols, os.path.join(out_dir, 'arrays'))
+    done = load_done(results_path)
+
+    pending = {}
+    for symbol in symbols:
+        for point in grid_points(config.get('grid', {})):
+            if point_key(symbol, point) not in done:
+                pending.setdefault(symbol, []).append(point)
+    total = sum(len(p) for p in pending.values())
+    print(f"Tamamlanmış nokta: {len(done)}, kalan: {total}")
+
+    rows = list(done.values())
+    with open(results_path, 'a', encoding='utf-8') as results, \
+            ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(array_paths,)) as pool:
+        futures = []
+        for symbol, points in pending.items():
+            for i in range(0, len(points), POINTS_PER_TASK):
+                futures.append(pool.submit(_run_points, symbol, symbols[symbol], points[i:i + POINTS_PER_TASK], config))
+        finished = 0
+        for future in as_completed(futures):
+            for row in future.result():
+                results.write(json.dumps(row) + '\n')
+                rows.append(row)
+                finished += 1
+            results.flush()
+            print(f"İlerleme: {finished}/{total}", end='\r')
+    print()
+
+    ranked = rank(rows)
+    table_path = os.path.join(out_dir, 'ranking.csv')
+    columns = ['symbol', *GRID_KEYS, 'pnl', 'pnl_percentage', 'max_drawdown', 'trade_count', 'wins', 'losses', 'fees', 'stop_reason']
+    with open(table_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(ranked)
+    return ranked
+
+def main():
+    parser = argparse.ArgumentParser(description="Kar/zarar/alım yüzdesi ızgarası üzerinde paralel geçmiş veri testi")
+    parser.add_argument('config', help="Tarama yapılandırması (JSON)")
+    parser.add_argument('--out', default='sweep_results', help="Sonuç ve önbellek klasörü")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.config, encoding='utf-8') as f:
+        config = json.load(f)
+    ranked = run_sweep(config, args.out, args.workers)
+
+    for row in ranked[:args.top]:
+        print(f"{row['symbol']} kar={row['profit_percentage']} zarar={row['loss_percentage']} "
+              f"alım={row['allocation_percentage']} tp_giriş={row['tp_reentry_factor']} sl_giriş={row['sl_reentry_factor']} "
+              f"-> Kar/Zarar: {row['pnl']:.4f}, Düşüş: %{row['max_drawdown'] * 100:.2f}, İşlem: {row['trade_count']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import unittest
+from decimal import Decimal
+from mock_exchange import MockExchange, make_symbol
+
+SYMBOL = 'BTCUSDT'
+
+# Sahte borsa sunucu açılmadan, handle_request üzerinden doğrudan sürülür; fiyat yalnızca
+# step()/set_price() ile ilerler
+def make_exchange(prices=(100.0,) * 10, balances=None, **kwargs):
+    spec = make_symbol(SYMBOL, '0.01', '0.00001', min_notional='5')
+    return MockExchange([spec], {SYMBOL: list(prices)}, balances=balances or {'USDT': Decimal('1000')},
+                        tick_interval=0, **kwargs)
+
+
+class MockExchangeTest(unittest.TestCase):
+    def request(self, exchange, method, route, **params):
+        status, body, _ = exchange.handle_request(method, f"/api/v3/{route}", params)
+        self.assertEqual(status, 200, body)
+        return body
+
+    def balance(self, exchange, asset):
+        account = self.request(exchange, 'GET', 'account')
+        entry = next((b for b in account['balances'] if b['asset'] == asset), None)
+        if entry is None:
+            return Decimal('0'), Decimal('0')
+        return Decimal(entry['free']), Decimal(entry['locked'])
+
+    def market_buy(self, exchange, quantity):
+        return self.request(exchange, 'POST', 'order', symbol=SYMBOL, side='BUY', type='MARKET',
+                            quantity=quantity, newOrderRespType='FULL')
+
+    def test_market_buy_fills_and_charges_base_fee(self):
+        exchange = make_exchange(depth_notional=Decimal('200'))
+        order = self.market_buy(exchange, '5.00000')
+
+        self.assertEqual(order['status'], 'FILLED')
+        self.assertEqual(Decimal(order['executedQty']), Decimal('5'))
+        # 200 USDT'lik seviyeler: 500 USDT'lik alım defterde üç seviye yürür
+        self.assertEqual(len(order['fills']), 3)
+        quote = sum(Decimal(f['price']) * Decimal(f['qty']) for f in order['fills'])
+        self.assertEqual(Decimal(order['cummulativeQuoteQty']), quote)
+        self.assertTrue(all(f['commissionAsset'] == 'BTC' for f in order['fills']))
+
+        usdt, _ = self.balance(exchange, 'USDT')
+        btc, _ = self.balance(exchange, 'BTC')
+        self.assertEqual(usdt, Decimal('1000') - quote)
+        self.assertEqual(btc, Decimal('5') - sum(Decimal(f['commission']) for f in order['fills']))
+
+    def test_oco_take_profit_fill_expires_stop_leg(self):
+        exchange = make_exchange()
+        self.market_buy(exchange, '1.00000')
+        quantity = '0.99900'
+        oco = self.request(exchange, 'POST', 'orderList/oco', symbol=SYMBOL, side='SELL', quantity=quantity,
+                           aboveType='LIMIT_MAKER', abovePrice='101.00', belowType='STOP_LOSS_LIMIT',
+                           belowStopPrice='99.00', belowPrice='98.90', belowTimeInForce='GTC')
+        legs = {report['type']: report['orderId'] for report in oco['orderReports']}
+        _, locked = self.balance(exchange, 'BTC')
+        self.assertEqual(locked, Decimal(quantity))
+
+        exchange.set_price(SYMBOL, '101.50')
+
+        take_profit = self.request(exchange, 'GET', 'order', symbol=SYMBOL, orderId=legs['LIMIT_MAKER'])
+        stop_loss = self.request(exchange, 'GET', 'order', symbol=SYMBOL, orderId=legs['STOP_LOSS_LIMIT'])
+        self.assertEqual(take_profit['status'], 'FILLED')
+        self.assertEqual(stop_loss['status'], 'EXPIRED')
+        self.assertEqual(Decimal(stop_loss['executedQty']), Decimal('0'))
+        _, locked = self.balance(exchange, 'BTC')
+        self.assertEqual(locked, Decimal('0'))
+
+    def test_oco_stop_fill_expires_take_profit_leg(self):
+        exchange = make_exchange()
+        self.market_buy(exchange, '1.00000')
+        oco = self.request(exchange, 'POST', 'orderList/oco', symbol=SYMBOL, side='SELL', quantity='0.99900',
+                           aboveType='LIMIT_MAKER', abovePrice='101.00', belowType='STOP_LOSS_LIMIT',
+                           belowStopPrice='99.00', belowPrice='98.90', belowTimeInForce='GTC')
+        legs = {report['type']: report['orderId'] for report in oco['orderReports']}
+
+        # Tetik fiyatına inince stop bacağı çalışır, limit fiyatının altında dolar
+        exchange.set_price(SYMBOL, '99.00')
+        exchange.set_price(SYMBOL, '98.80')
+
+        stop_loss = self.request(exchange, 'GET', 'order', symbol=SYMBOL, orderId=legs['STOP_LOSS_LIMIT'])
+        take_profit = self.request(exchange, 'GET', 'order', symbol=SYMBOL, orderId=legs['LIMIT_MAKER'])
+        self.assertEqual(stop_loss['status'], 'FILLED')
+        self.assertTrue(stop_loss['isWorking'])
+        self.assertEqual(take_profit['status'], 'EXPIRED')
+
+    def test_unfilled_limit_stays_open_until_cancelled(self):
+        exchange = make_exchange(prices=[100.0, 100.2, 100.1, 100.3, 100.2])
+        order = self.request(exchange, 'POST', 'order', symbol=SYMBOL, side='BUY', type='LIMIT', timeInForce='GTC',
+                             quantity='1.00000', price='99.00')
+        self.assertEqual(order['status'], 'NEW')
+        self.assertEqual(self.balance(exchange, 'USDT'), (Decimal('901'), Decimal('99')))
+
+        # Dolum süresi boyunca fiyat emre hiç inmez
+        while exchange.step():
+            pass
+        order = self.request(exchange, 'GET', 'order', symbol=SYMBOL, orderId=order['orderId'])
+        self.assertEqual(order['status'], 'NEW')
+        self.assertEqual(Decimal(order['executedQty']), Decimal('0'))
+
+        cancelled = self.request(exchange, 'DELETE', 'order', symbol=SYMBOL, orderId=order['orderId'])
+        self.assertEqual(cancelled['status'], 'CANCELED')
+        self.assertEqual(self.balance(exchange, 'USDT'), (Decimal('1000'), Decimal('0')))
+        self.assertEqual(self.request(exchange, 'GET', 'openOrders', symbol=SYMBOL), [])
+
+        # İptal edilmiş emir yeniden iptal edilemez
+        status, body, _ = exchange.handle_request('DELETE', '/api/v3/order',
+                                                  {'symbol': SYMBOL, 'orderId': order['orderId']})
+        self.assertEqual((status, body['code']), (400, -2011))
+
+    def test_partially_filled_limit_cancel_keeps_fill(self):
+        exchange = make_exchange(partial_fill=0.5)
+        order = self.request(exchange, 'POST', 'order', symbol=SYMBOL, side='BUY', type='LIMIT', timeInForce='GTC',
+                             quantity='1.00000', price='99.00')
+
+        exchange.set_price(SYMBOL, '98.50')
+        order = self.request(exchange, 'GET', 'order', symbol=SYMBOL, orderId=order['orderId'])
+        self.assertEqual(order['status'], 'PARTIALLY_FILLED')
+        self.assertEqual(Decimal(order['executedQty']), Decimal('0.5'))
+
+        cancelled = self.request(exchange, 'DELETE', 'order', symbol=SYMBOL, orderId=order['orderId'])
+        self.assertEqual(cancelled['status'], 'CANCELED')
+        self.assertEqual(Decimal(cancelled['executedQty']), Decimal('0.5'))
+        self.assertEqual(self.balance(exchange, 'USDT'), (Decimal('1000') - Decimal('49.5'), Decimal('0')))
+
+
+if __name__ == '__main__':
+    unittest.main()
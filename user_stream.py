@@ -0,0 +1,176 @@
+import time
+import asyncio
+import logging
+import threading
+from decimal import Decimal
+from fills import FINAL_ORDER_STATUSES
+
+# Kullanıcı veri akışı olaylarını türüne göre abonelere dağıtır; soketi alt sınıflar açar
+class UserEventDispatcher:
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, event_type, handler):
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def _on_message(self, msg):
+        event_type = msg.get('e')
+        if event_type == 'error':
+            logging.warning(f"Kullanıcı veri akışı hatası: {msg.get('m')}")
+        for handler in self._handlers.get(event_type, ()):
+            try:
+                handler(msg)
+            except Exception as e:
+                logging.error(f"Kullanıcı olayı işlenemedi ({event_type}): {e}")
+
+
+# Kullanıcı veri akışını (listenKey) tek bir sokette açar
+class UserDataStream(UserEventDispatcher):
+    def __init__(self, twm):
+        super().__init__()
+        self.twm = twm
+        self._stream_name = None
+
+    def start(self):
+        self._stream_name = self.twm.start_user_socket(callback=self._on_message)
+        return self
+
+    def stop(self):
+        if self._stream_name is not None:
+            self.twm.stop_socket(self._stream_name)
+            self._stream_name = None
+
+
+class Fill:
+    __slots__ = ('trade_id', 'price', 'qty', 'commission', 'commission_asset')
+
+    def __init__(self, trade_id, price, qty, commission, commission_asset):
+        self.trade_id = trade_id
+        self.price = price
+        self.qty = qty
+        self.commission = commission
+        self.commission_asset = commission_asset
+
+
+class OrderState:
+    def __init__(self, order_id):
+        self.order_id = order_id
+        self.status = None
+        self.executed_qty = Decimal('0')
+        self.fills = []
+        self.updated = time.monotonic()
+        self.done = threading.Event()
+
+
+# executionReport olaylarından emir durumlarını takip eder; bekleyen kodu emir
+# sonuçlandığı anda uyandırır. Emir yanıtı dönmeden gelen olaylar da saklanır.
+class FillTracker:
+    def __init__(self, user_stream, max_orders=1000):
+        self.max_orders = max_orders
+        self._orders = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        user_stream.subscribe('executionReport', self._on_execution_report)
+
+    def _state(self, order_id):
+        state = self._orders.get(order_id)
+        if state is None:
+            state = self._orders[order_id] = OrderState(order_id)
+        return state
+
+    def _on_execution_report(self, msg):
+        with self._lock:
+            state = self._state(msg['i'])
+            if msg['x'] == 'TRADE':
+                state.fills.append(Fill(msg['t'], Decimal(msg['L']), Decimal(msg['l']), Decimal(msg['n']), msg['N']))
+            state.status = msg['X']
+            state.executed_qty = Decimal(msg['z'])
+            state.updated = time.monotonic()
+            if state.status in FINAL_ORDER_STATUSES:
+                state.done.set()
+            if len(self._orders) > self.max_orders:
+                self._prune()
+            self._changed.notify_all()
+
+    # Kimsenin beklemediği, sonuçlanmış eski emirleri at
+    def _prune(self):
+        finished = sorted((s.updated, order_id) for order_id, s in self._orders.items() if s.done.is_set())
+        for _, order_id in finished[:len(self._orders) - self.max_orders]:
+            del self._orders[order_id]
+
+    # Emir sonuçlanana kadar bekler; zaman aşımında None döner
+    def wait(self, order_id, timeout=None):
+        with self._lock:
+            state = self._state(order_id)
+        if not state.done.wait(timeout):
+            return None
+        return state
+
+    # Verilen emirlerden (örn. OCO bacakları) herhangi biri sonuçlanana kadar bekler;
+    # sonuçlanmış olanları döner, zaman aşımında boş liste
+    def wait_any(self, order_ids, timeout=None):
+        with self._changed:
+            states = [self._state(order_id) for order_id in order_ids]
+            self._changed.wait_for(lambda: any(s.done.is_set() for s in states), timeout)
+            return [s for s in states if s.done.is_set()]
+
+    def snapshot(self, order_id):
+        with self._lock:
+            return self._orders.get(order_id)
+
+    def forget(self, order_id):
+        with self._lock:
+            self._orders.pop(order_id, None)
+
+
+# asyncio motoru için: aynı olay dağıtımı, soket BinanceSocketManager ile okunur. Akış run()
+# görevi olarak çalışır, görev iptal edilince kapanır.
+class AsyncUserDataStream(UserEventDispatcher):
+    def __init__(self, bsm, reconnect_delay=5):
+        super().__init__()
+        self.bsm = bsm
+        self.reconnect_delay = reconnect_delay
+
+    async def run(self):
+        while True:
+            try:
+                async with self.bsm.user_socket() as stream:
+                    while True:
+                        self._on_message(await stream.recv())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Kullanıcı veri akışı koptu, yeniden bağlanılıyor: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+
+
+class AsyncFillTracker(FillTracker):
+    def __init__(self, user_stream, max_orders=1000):
+        super().__init__(user_stream, max_orders)
+        self._waiters = {}
+
+    def _on_execution_report(self, msg):
+        super()._on_execution_report(msg)
+        state = self.snapshot(msg['i'])
+        if state is not None and state.done.is_set():
+            for waiter in self._waiters.pop(msg['i'], ()):
+                if not waiter.done():
+                    waiter.set_result(state)
+
+    async def wait_async(self, order_id, timeout=None):
+        with self._lock:
+            state = self._state(order_id)
+        if state.done.is_set():
+            return state
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(order_id, []).append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(order_id)
+            if waiters and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[order_id]